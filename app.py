@@ -1,33 +1,76 @@
 from __future__ import annotations
 
 import os
+from typing import Any, Dict
 
-from dotenv import load_dotenv
 from flask import Flask, render_template
 
 from backend.api import api_bp
-from backend.db import close_db
-from backend.voyage import close_client
+from backend.http_cache import init_http_cache
+from backend.warmup import health_bp, start_warm_up
 from utils.logger import get_logger
+from utils.settings import load_env
+
+
+def load_config() -> Dict[str, Any]:
+    """Application settings from the environment, shared by the WSGI and ASGI entry points."""
+    load_env()
+    return {
+        "MONGO_URI": os.getenv("MONGODB_URI"),
+        "DB_NAME": os.getenv("DB_NAME"),
+        "PRODUCT_COLLECTION": os.getenv("PRODUCT_DETAIL_COLLECTION", "product_detail"),
+        "VOYAGE_API_KEY": os.getenv("VOYAGE_API_KEY"),
+        "EMBEDDING_PROVIDER": os.getenv("EMBEDDING_PROVIDER", "voyage"),
+        "EMBEDDING_DIMENSIONS": int(os.getenv("EMBEDDING_DIMENSIONS", "1024")),
+        "VOYAGE_TEXT_MODEL": os.getenv("VOYAGE_TEXT_MODEL", "voyage-3.5"),
+        "VECTOR_INDEX_NAME": os.getenv("VECTOR_INDEX_NAME") or os.getenv("ATLAS_SEARCH_INDEX"),
+        "ATLAS_SEARCH_INDEX": os.getenv("ATLAS_SEARCH_INDEX"),
+        "FULL_TEXT_INDEX_NAME": os.getenv("FULL_TEXT_INDEX_NAME", "full-text-search"),
+        "SEARCH_PROJECTION_PROFILE": os.getenv("SEARCH_PROJECTION_PROFILE", "full"),
+        "LOCAL_INDEX_PATH": os.getenv("LOCAL_INDEX_PATH"),
+        "LOCAL_INDEX_SIMILARITY": os.getenv("VECTOR_INDEX_SIMILARITY", "cosine"),
+        "CANDIDATE_POLICY_PATH": os.getenv("CANDIDATE_POLICY_PATH"),
+        "PARTITION_FANOUT": os.getenv("PARTITION_FANOUT", "true").lower() != "false",
+        "SEARCH_CONFIG_TTL": float(os.getenv("SEARCH_CONFIG_TTL", "30")),
+        "SEARCH_TIMEOUT_MS": float(os.getenv("SEARCH_TIMEOUT_MS", "3000")),
+        "EMBED_TIMEOUT_MS": float(os.getenv("EMBED_TIMEOUT_MS", "1500")),
+        "EMBED_BREAKER_THRESHOLD": int(os.getenv("EMBED_BREAKER_THRESHOLD", "5")),
+        "EMBED_BREAKER_RESET_SECONDS": float(os.getenv("EMBED_BREAKER_RESET_SECONDS", "30")),
+        "ADMISSION_EMBEDDING_LIMIT": int(os.getenv("ADMISSION_EMBEDDING_LIMIT", "8")),
+        "ADMISSION_FULLTEXT_LIMIT": int(os.getenv("ADMISSION_FULLTEXT_LIMIT", "16")),
+        "ADMISSION_QUEUE_SIZE": int(os.getenv("ADMISSION_QUEUE_SIZE", "16")),
+        "ADMISSION_QUEUE_TIMEOUT_MS": float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "250")),
+        "ADMISSION_LATENCY_TARGET_MS": float(os.getenv("ADMISSION_LATENCY_TARGET_MS", "1000")),
+        "PRODUCT_SIMILAR_COLLECTION": os.getenv("PRODUCT_SIMILAR_COLLECTION", "product_similar"),
+        "SEARCH_PAGE_POOL": int(os.getenv("SEARCH_PAGE_POOL", "200")),
+        "SEARCH_PAGE_TTL": float(os.getenv("SEARCH_PAGE_TTL", "120")),
+        "SEARCH_STREAM_MAX_LIMIT": int(os.getenv("SEARCH_STREAM_MAX_LIMIT", "1000")),
+        "SEARCH_STREAM_TIMEOUT_MS": float(os.getenv("SEARCH_STREAM_TIMEOUT_MS", "30000")),
+        "SEARCH_STREAM_BATCH_SIZE": int(os.getenv("SEARCH_STREAM_BATCH_SIZE", "100")),
+        "FACET_POOL_SIZE": int(os.getenv("FACET_POOL_SIZE", "200")),
+        "FACET_PRICE_BOUNDARIES": [
+            float(bound) for bound in os.getenv("FACET_PRICE_BOUNDARIES", "0,10,20,30,50,100").split(",") if bound.strip()
+        ],
+        "SEARCH_CURSOR_SECRET": os.getenv("SEARCH_CURSOR_SECRET"),
+        "SEARCH_CURSOR_MAX_AGE": float(os.getenv("SEARCH_CURSOR_MAX_AGE", "3600")),
+        "AUTOCOMPLETE_SOURCE": os.getenv("AUTOCOMPLETE_SOURCE", "local").lower(),
+        "AUTOCOMPLETE_MIN_CHARS": int(os.getenv("AUTOCOMPLETE_MIN_CHARS", "2")),
+        "AUTOCOMPLETE_REFRESH_SECONDS": float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "60")),
+        "AUTOCOMPLETE_REBUILD_SECONDS": float(os.getenv("AUTOCOMPLETE_REBUILD_SECONDS", "3600")),
+        "COMPRESSION_MIN_BYTES": int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+        "SEARCH_RECORD_PATH": os.getenv("SEARCH_RECORD_PATH"),
+        "LOG_DIR": os.getenv("LOG_DIR", "logs"),
+    }
 
 
 def create_app() -> Flask:
-    load_dotenv()
     app = Flask(
         __name__,
         template_folder="frontend/templates",
         static_folder="frontend/static",
     )
 
-    app.config["MONGO_URI"] = os.getenv("MONGODB_URI")
-    app.config["DB_NAME"] = os.getenv("DB_NAME")
-    app.config["PRODUCT_COLLECTION"] = os.getenv("PRODUCT_DETAIL_COLLECTION", "product_detail")
-    app.config["VOYAGE_API_KEY"] = os.getenv("VOYAGE_API_KEY")
-    app.config["VOYAGE_TEXT_MODEL"] = os.getenv("VOYAGE_TEXT_MODEL", "voyage-3.5")
-    app.config["VECTOR_INDEX_NAME"] = os.getenv("VECTOR_INDEX_NAME") or os.getenv("ATLAS_SEARCH_INDEX")
-    app.config["ATLAS_SEARCH_INDEX"] = os.getenv("ATLAS_SEARCH_INDEX")
-    app.config["FULL_TEXT_INDEX_NAME"] = os.getenv("FULL_TEXT_INDEX_NAME", "full-text-search")
-    app.config["LOG_DIR"] = os.getenv("LOG_DIR", "logs")
+    app.config.update(load_config())
 
     logger = get_logger("app")
     app.logger.handlers = []
@@ -38,8 +81,8 @@ def create_app() -> Flask:
     app.config["APP_LOGGER"] = logger
 
     app.register_blueprint(api_bp)
-    app.teardown_appcontext(close_db)
-    app.teardown_appcontext(close_client)
+    app.register_blueprint(health_bp)
+    init_http_cache(app)
 
     @app.route("/")
     def index():
@@ -51,4 +94,7 @@ def create_app() -> Flask:
 if __name__ == "__main__":
     flask_app = create_app()
     flask_app.logger.info("Starting Food Finder web application.")
+    # Only the reloader child serves requests; the watcher process skips warm-up.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warm_up(flask_app)
     flask_app.run(debug=True)
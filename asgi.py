@@ -0,0 +1,486 @@
+"""Asyncio entry point for the search API: ``uvicorn asgi:app``.
+
+Serves ``POST /api/search`` and ``GET /api/restaurants`` with the same
+request and response format as the Flask app, but on a single event loop:
+MongoDB goes through pymongo's ``AsyncMongoClient`` and embeddings through
+Voyage's ``AsyncClient``, so a worker is not tied up while waiting on either.
+The web UI is still served by ``app.py``, and so are pagination cursors,
+facets and NDJSON streaming: payloads asking for them get a 400 here.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import AsyncMongoClient
+from pymongo.errors import ExecutionTimeout
+
+from app import load_config
+from backend.admission import AsyncConcurrencyLimiter, admission_pool, build_limiter
+from backend.api import (
+    SearchRequest,
+    build_filter_components,
+    build_projection,
+    build_search_pipeline,
+    build_text_stage,
+    build_vector_stage,
+    degrade_to_fulltext,
+    fuse_results,
+    parse_search_request,
+    result_score,
+    sanitize_result,
+    search_budget_ms,
+)
+from backend.candidates import candidates_for_request
+from backend.http_cache import choose_encoding, compress, etag_for
+from backend.local_index import find_projection, order_by_hits
+from backend.partitions import SearchTarget, build_default_target, route_targets
+from backend.recorder import append_record
+from backend.resilience import CircuitBreaker, Deadline, embed_timeout_ms
+from utils.candidates import load_policy
+from utils.embeddings import create_embedding_client, extract_embeddings
+from utils.local_index import LocalVectorIndex
+from utils.logger import get_logger
+from utils.search_config import SEARCH_CONFIG_COLLECTION, indexes_config_id, partitions_config_id
+
+logger = get_logger("asgi")
+
+Response = Tuple[int, Any]
+
+# /api/search options only the Flask app implements.
+FLASK_ONLY_OPTIONS = ("paginate", "cursor", "facets", "stream")
+
+
+class EmbeddingError(RuntimeError):
+    """Wraps embedding provider failures."""
+
+
+class EmbeddingUnavailable(RuntimeError):
+    """The embedding leg cannot be used for this request; ``reason`` goes into ``degradedReason``."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Overloaded(RuntimeError):
+    """The admission queue is full; answered with 429 and ``Retry-After``."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SearchService:
+    """Process-wide clients and caches for the async search path."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.mongo: Optional[AsyncMongoClient] = None
+        self.embedder: Any = None
+        self.policy: Dict[str, Any] = load_policy(config.get("CANDIDATE_POLICY_PATH"))
+        self.local_index: Optional[LocalVectorIndex] = None
+        self.record_path = config.get("SEARCH_RECORD_PATH")
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self.limiters = {
+            pool: build_limiter(config, pool, AsyncConcurrencyLimiter) for pool in ("embedding", "fulltext")
+        }
+        self.embedding_breaker = CircuitBreaker(
+            "embedding", config.get("EMBED_BREAKER_THRESHOLD", 5), config.get("EMBED_BREAKER_RESET_SECONDS", 30.0)
+        )
+
+    async def start(self) -> None:
+        if not self.config.get("MONGO_URI") or not self.config.get("DB_NAME"):
+            raise RuntimeError("MongoDB URI or database name not configured.")
+        self.mongo = AsyncMongoClient(self.config["MONGO_URI"])
+        provider = (self.config.get("EMBEDDING_PROVIDER") or "voyage").lower()
+        if provider == "voyage":
+            if not self.config.get("VOYAGE_API_KEY"):
+                raise RuntimeError("VoyageAI API key not configured.")
+            from voyageai import AsyncClient
+
+            self.embedder = AsyncClient(api_key=self.config["VOYAGE_API_KEY"])
+        else:
+            self.embedder = create_embedding_client(provider, None, self.config.get("EMBEDDING_DIMENSIONS", 1024))
+        if self.config.get("LOCAL_INDEX_PATH"):
+            self.local_index = await asyncio.to_thread(
+                LocalVectorIndex.from_path,
+                self.config["LOCAL_INDEX_PATH"],
+                self.config.get("LOCAL_INDEX_SIMILARITY", "cosine"),
+            )
+            logger.info("Loaded local vector index with %d rows.", len(self.local_index))
+
+    async def close(self) -> None:
+        if self.mongo is not None:
+            await self.mongo.close()
+            self.mongo = None
+
+    @property
+    def db(self):
+        return self.mongo[self.config["DB_NAME"]]
+
+    @property
+    def collection_name(self) -> str:
+        return self.config.get("PRODUCT_COLLECTION")
+
+    async def _cached(self, name: str, load: Callable[[], Awaitable[Any]], default: Any) -> Any:
+        """TTL cache mirroring ``backend.partitions``: keep the last value when a reload fails."""
+        cached = self._cache.get(name)
+        if cached is not None and time.monotonic() - cached[0] < self.config.get("SEARCH_CONFIG_TTL", 30):
+            return cached[1]
+        try:
+            value = await load()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Could not load '%s': %s", name, exc)
+            value = cached[1] if cached else default
+        self._cache[name] = (time.monotonic(), value)
+        return value
+
+    def _config_doc(self, doc_id: str) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        async def load() -> Dict[str, Any]:
+            return await self.db[SEARCH_CONFIG_COLLECTION].find_one({"_id": doc_id}) or {}
+
+        return load
+
+    async def resolve_targets(self, search: SearchRequest) -> List[SearchTarget]:
+        registry, active = await asyncio.gather(
+            self._cached("partition_registry", self._config_doc(partitions_config_id(self.collection_name)), {}),
+            self._cached("active_indexes", self._config_doc(indexes_config_id(self.collection_name)), {}),
+        )
+        return route_targets(
+            registry,
+            {"country": search.country, "restaurant": search.restaurant},
+            build_default_target(self.config, active),
+            self.config.get("PARTITION_FANOUT", True),
+        )
+
+    async def embed(self, text: str) -> List[float]:
+        model = self.config.get("VOYAGE_TEXT_MODEL", "voyage-3.5")
+        try:
+            if inspect.iscoroutinefunction(self.embedder.embed):
+                response = await self.embedder.embed(texts=[text], model=model)
+            else:
+                response = await asyncio.to_thread(self.embedder.embed, texts=[text], model=model)
+            return extract_embeddings(response)[0]
+        except Exception as exc:  # pylint: disable=broad-except
+            raise EmbeddingError(str(exc)) from exc
+
+    async def embed_within(self, text: str, deadline: Deadline) -> List[float]:
+        """:meth:`embed` bounded by the request budget and the embedding circuit breaker."""
+        if not self.embedding_breaker.allow():
+            raise EmbeddingUnavailable("embedding_circuit_open")
+        timeout_ms = embed_timeout_ms(deadline, self.config.get("EMBED_TIMEOUT_MS", 1500))
+        try:
+            vector = await asyncio.wait_for(self.embed(text), timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            self.embedding_breaker.record_failure()
+            raise EmbeddingUnavailable("embedding_timeout") from None
+        except EmbeddingError as exc:
+            logger.warning("Embedding failed: %s", exc)
+            self.embedding_breaker.record_failure()
+            raise EmbeddingUnavailable("embedding_error") from exc
+        self.embedding_breaker.record_success()
+        return vector
+
+    async def restaurants(self) -> List[str]:
+        async def load() -> List[str]:
+            pipeline = [
+                {"$group": {"_id": "$restaurantName"}},
+                {"$match": {"_id": {"$ne": None}}},
+                {"$sort": {"_id": 1}},
+            ]
+            cursor = await self.db[self.collection_name].aggregate(pipeline)
+            return [document["_id"] for document in await cursor.to_list(None)]
+
+        return await self._cached("restaurants", load, [])
+
+    async def _aggregate(
+        self, collection_name: str, pipeline: List[Dict[str, Any]], deadline: Deadline
+    ) -> List[Dict[str, Any]]:
+        cursor = await self.db[collection_name].aggregate(pipeline, maxTimeMS=max(1, int(deadline.remaining_ms())))
+        return await cursor.to_list(None)
+
+    async def _run_target(
+        self,
+        target: SearchTarget,
+        search: SearchRequest,
+        query_vector: Optional[asyncio.Task],
+        filter_doc: Optional[Dict[str, Any]],
+        match_clause: Optional[Dict[str, Any]],
+        deadline: Deadline,
+    ) -> List[Dict[str, Any]]:
+        # Inside a partition its own scope filter matches every document.
+        scoped = {
+            key: value
+            for key, value in {"restaurant": search.restaurant, "country": search.country}.items()
+            if target.partition is None or value != target.partition
+        }
+        num_candidates = candidates_for_request(self.policy, search.limit, search.available, search.max_price, **scoped)
+
+        if search.mode == "fulltext":
+            pipeline = build_search_pipeline(
+                "fulltext",
+                vector_stage=None,
+                text_stage=build_text_stage(target.text_index, search.title),
+                match_clause=match_clause,
+                projection=search.projection,
+                limit=search.limit,
+            )
+            return await self._aggregate(target.collection, pipeline, deadline)
+
+        text_leg: Optional[asyncio.Task] = None
+        # Both hybrid legs bring up to num_candidates results, so fusion sees the same depth on each side.
+        leg_limit = num_candidates if search.mode == "hybrid" else search.limit
+        if search.mode == "hybrid":
+            # The full-text leg does not need the embedding, so it runs while Voyage answers.
+            text_leg = asyncio.ensure_future(
+                self._aggregate(
+                    target.collection,
+                    build_search_pipeline(
+                        "fulltext",
+                        vector_stage=None,
+                        text_stage=build_text_stage(target.text_index, search.title),
+                        match_clause=match_clause,
+                        projection=build_projection("fulltext", search.fields),
+                        limit=leg_limit,
+                    ),
+                    deadline,
+                )
+            )
+        try:
+            vector_stage = build_vector_stage(
+                target.vector_index, await query_vector, leg_limit, num_candidates, filter_doc
+            )
+            projection = search.projection if text_leg is None else build_projection("vector", search.fields)
+            vector_results = await self._aggregate(
+                target.collection,
+                build_search_pipeline(
+                    "vector",
+                    vector_stage=vector_stage,
+                    text_stage=None,
+                    match_clause=None,
+                    projection=projection,
+                    limit=leg_limit,
+                ),
+                deadline,
+            )
+        except BaseException:
+            if text_leg is not None:
+                text_leg.cancel()
+            raise
+        if text_leg is None:
+            return vector_results
+        return fuse_results(vector_results, await text_leg, search.limit, compact=search.profile == "compact")
+
+    async def _search_local(self, search: SearchRequest, query_vector: asyncio.Task) -> List[Dict[str, Any]]:
+        hits, strategy = await asyncio.to_thread(
+            self.local_index.search,
+            await query_vector,
+            search.limit,
+            search.available,
+            search.max_price,
+            search.restaurant,
+        )
+        logger.info("Served vector search from the local index (%s).", strategy)
+        if not hits:
+            return []
+        cursor = self.db[self.collection_name].find(
+            {"_id": {"$in": [hit.id for hit in hits]}}, find_projection(search.projection)
+        )
+        return order_by_hits(hits, await cursor.to_list(None))
+
+    async def search(self, payload: Dict[str, Any]) -> Response:
+        if self.record_path:
+            append_record(self.record_path, payload)
+        unsupported = [option for option in FLASK_ONLY_OPTIONS if payload.get(option)]
+        if unsupported:
+            return 400, {"message": f"Opciones no disponibles en este servicio: {', '.join(unsupported)}."}
+        try:
+            search = parse_search_request(payload, self.config.get("SEARCH_PROJECTION_PROFILE", "full"))
+        except ValueError as exc:
+            return 400, {"message": str(exc)}
+        logger.info(
+            "Search request mode=%s limit=%d profile=%s filters=%s",
+            search.mode,
+            search.limit,
+            search.profile or ",".join(search.fields),
+            search.filters,
+        )
+
+        deadline = Deadline(search_budget_ms(search, self.config.get("SEARCH_TIMEOUT_MS", 3000)))
+        limiter = self.limiters[admission_pool(search.mode)]
+        queue_timeout_ms = min(self.config.get("ADMISSION_QUEUE_TIMEOUT_MS", 250), deadline.remaining_ms())
+        if not await limiter.acquire(queue_timeout_ms):
+            logger.warning(
+                "Shedding %s search: admission pool '%s' is full %s.", search.mode, limiter.name, limiter.snapshot()
+            )
+            raise Overloaded(limiter.retry_after_seconds())
+        started = time.perf_counter()
+        status = 500
+        try:
+            status, body = await self._search_within(search, deadline)
+            return status, body
+        finally:
+            await limiter.release((time.perf_counter() - started) * 1000, overloaded=status == 504)
+
+    async def _search_within(self, search: SearchRequest, deadline: Deadline) -> Response:
+        query_vector: Optional[asyncio.Task] = None
+        if search.mode in {"vector", "hybrid"}:
+            query_vector = asyncio.ensure_future(self.embed_within(search.description, deadline))
+        try:
+            return await self._execute(search, query_vector, deadline)
+        except EmbeddingUnavailable as exc:
+            logger.warning("Embedding unavailable (%s); serving a full-text search instead.", exc.reason)
+            status, body = await self._execute(degrade_to_fulltext(search), None, deadline)
+            if status == 200:
+                body.update(degraded=True, degradedReason=exc.reason)
+            return status, body
+        finally:
+            if query_vector is not None and not query_vector.done():
+                query_vector.cancel()
+
+    async def _execute(
+        self, search: SearchRequest, query_vector: Optional[asyncio.Task], deadline: Deadline
+    ) -> Response:
+        filter_doc, match_clause = build_filter_components(
+            search.available, search.max_price, search.restaurant, search.country
+        )
+        try:
+            if self.local_index is not None and search.mode == "vector" and not search.country:
+                documents = await self._search_local(search, query_vector)
+                return 200, {
+                    "mode": search.mode,
+                    "results": [sanitize_result(doc) for doc in documents],
+                    "degraded": False,
+                }
+
+            targets = await self.resolve_targets(search)
+            if search.mode in {"vector", "hybrid"} and any(not target.vector_index for target in targets):
+                return 500, {"message": "No hay un índice vectorial configurado."}
+
+            result_lists = await asyncio.gather(
+                *(
+                    self._run_target(target, search, query_vector, filter_doc, match_clause, deadline)
+                    for target in targets
+                )
+            )
+        except EmbeddingUnavailable:
+            raise
+        except ExecutionTimeout:
+            logger.warning("Search exceeded its %.0fms budget.", deadline.budget_ms)
+            return 504, {"message": "La búsqueda superó el tiempo límite."}
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Aggregation failed: %s", exc)
+            return 500, {"message": f"No fue posible ejecutar la búsqueda: {exc}"}
+
+        documents = [doc for docs in result_lists for doc in docs]
+        if len(result_lists) > 1:
+            # Partitions share the index definition, so their scores are comparable.
+            documents = sorted(documents, key=result_score, reverse=True)[: search.limit]
+        return 200, {"mode": search.mode, "results": [sanitize_result(doc) for doc in documents], "degraded": False}
+
+
+class SearchApp:
+    """Minimal ASGI application routing the two API endpoints to :class:`SearchService`."""
+
+    def __init__(self):
+        self.service: Optional[SearchService] = None
+        self._start_lock = asyncio.Lock()
+
+    async def _service(self) -> SearchService:
+        # Servers without lifespan support start the service on the first request.
+        if self.service is None:
+            async with self._start_lock:
+                if self.service is None:
+                    service = SearchService(load_config())
+                    await service.start()
+                    self.service = service
+        return self.service
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self._service()
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.exception("Startup failed: %s", exc)
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.service is not None:
+                    await self.service.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_json(receive) -> Any:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        try:
+            return json.loads(b"".join(chunks) or b"null")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+
+    async def _respond(
+        self, scope, send, status: int, body: Any, headers: Sequence[Tuple[bytes, bytes]] = ()
+    ) -> None:
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        request_headers = {name.lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+        response_headers = [(b"content-type", b"application/json"), (b"vary", b"Accept-Encoding"), *headers]
+        if status == 200:
+            etag = f'"{etag_for(data)}"'
+            if scope["method"] == "GET":
+                response_headers.append((b"cache-control", b"no-cache"))
+                if_none_match = request_headers.get(b"if-none-match", "")
+                if etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+                    await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag.encode())]})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+            else:
+                response_headers.append((b"cache-control", b"no-store"))
+            encoding = choose_encoding(request_headers.get(b"accept-encoding", ""))
+            min_bytes = self.service.config.get("COMPRESSION_MIN_BYTES", 1024) if self.service else 1024
+            if encoding and len(data) >= min_bytes:
+                data = compress(data, encoding)
+                response_headers.append((b"content-encoding", encoding.encode()))
+                etag = f"W/{etag}"
+            response_headers.append((b"etag", etag.encode()))
+        response_headers.append((b"content-length", str(len(data)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": data})
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        route = (scope["method"], scope["path"].rstrip("/"))
+        if route == ("POST", "/api/search"):
+            payload = await self._read_json(receive)
+            service = await self._service()
+            try:
+                status, body = await service.search(payload if isinstance(payload, dict) else {})
+            except Overloaded as exc:
+                message = {"message": "El servicio está saturado; intenta de nuevo en unos segundos."}
+                await self._respond(scope, send, 429, message, [(b"retry-after", str(exc.retry_after).encode())])
+                return
+        elif route == ("GET", "/api/restaurants"):
+            service = await self._service()
+            status, body = 200, await service.restaurants()
+        else:
+            status, body = 404, {"message": "Recurso no encontrado."}
+        await self._respond(scope, send, status, body)
+
+
+app = SearchApp()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict
+
+from flask import current_app
+
+from utils.logger import get_logger
+
+# Searches that need an embedding share one limit; full-text searches never
+# touch the embedding provider and get their own.
+EMBEDDING_MODES = {"vector", "hybrid"}
+
+
+def admission_pool(mode: str) -> str:
+    return "embedding" if mode in EMBEDDING_MODES else "fulltext"
+
+
+class _AIMDLimit:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+
+    Each completed request is a latency sample. A sample above
+    ``latency_target_ms`` (or one flagged as overloaded) shrinks the limit by
+    ``backoff``, at most once per observed latency window so a burst of slow
+    responses counts as one signal. Requests that finish while the limit is
+    fully used grow it by ``1 / limit``, roughly one slot per window.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        max_limit: int,
+        max_queue: int,
+        latency_target_ms: float,
+        min_limit: int = 1,
+        backoff: float = 0.9,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.max_queue = max(0, max_queue)
+        self.latency_target_ms = latency_target_ms
+        self.backoff = backoff
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._latency_ms = latency_target_ms / 2
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def _has_slot(self) -> bool:
+        return self._in_flight < self.limit
+
+    def _record(self, latency_ms: float, overloaded: bool) -> None:
+        saturated = self._in_flight + 1 >= self.limit
+        self._latency_ms += 0.2 * (latency_ms - self._latency_ms)
+        now = time.monotonic()
+        if overloaded or latency_ms > self.latency_target_ms:
+            if now - self._last_decrease >= self._latency_ms / 1000:
+                previous = self.limit
+                self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                self._last_decrease = now
+                if self.limit != previous:
+                    get_logger("api").info(
+                        "Admission limit '%s' lowered to %d (latency %.0fms).", self.name, self.limit, latency_ms
+                    )
+        elif saturated:
+            self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+    def retry_after_seconds(self) -> int:
+        """Rough time for the current queue to drain, as a whole number of seconds."""
+        return max(1, math.ceil(self._latency_ms * (self._waiting + 1) / self.limit / 1000))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "inFlight": self._in_flight,
+            "waiting": self._waiting,
+            "latencyMs": round(self._latency_ms, 1),
+        }
+
+
+class ConcurrencyLimiter(_AIMDLimit):
+    """Thread-safe limiter for the Flask app."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout_ms: float) -> bool:
+        """Take a slot, waiting in the bounded queue up to ``timeout_ms``; ``False`` means shed the request."""
+        with self._condition:
+            if self._has_slot():
+                self._in_flight += 1
+                return True
+            if self._waiting >= self.max_queue or timeout_ms <= 0:
+                return False
+            self._waiting += 1
+            try:
+                admitted = self._condition.wait_for(self._has_slot, timeout_ms / 1000)
+            finally:
+                self._waiting -= 1
+            if admitted:
+                self._in_flight += 1
+            return admitted
+
+    def release(self, latency_ms: float, overloaded: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._record(latency_ms, overloaded)
+            self._condition.notify_all()
+
+
+class AsyncConcurrencyLimiter(_AIMDLimit):
+    """Event-loop limiter for the ASGI app; same policy, no threads."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, timeout_ms: float) -> bool:
+        async with self._condition:
+            if self._has_slot():
+                self._in_flight += 1
+                return True
+            if self._waiting >= self.max_queue or timeout_ms <= 0:
+                return False
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._condition.wait_for(self._has_slot), timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+            return True
+
+    async def release(self, latency_ms: float, overloaded: bool = False) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            self._record(latency_ms, overloaded)
+            self._condition.notify_all()
+
+
+def build_limiter(config: Dict[str, Any], pool: str, limiter_class=ConcurrencyLimiter) -> _AIMDLimit:
+    initial = int(config.get(f"ADMISSION_{pool.upper()}_LIMIT", 8 if pool == "embedding" else 16))
+    return limiter_class(
+        pool,
+        initial_limit=initial,
+        max_limit=initial * 4,
+        max_queue=int(config.get("ADMISSION_QUEUE_SIZE", 16)),
+        latency_target_ms=float(config.get("ADMISSION_LATENCY_TARGET_MS", 1000)),
+    )
+
+
+def get_admission_limiter(mode: str) -> ConcurrencyLimiter:
+    limiters = current_app.extensions.setdefault("admission", {})
+    pool = admission_pool(mode)
+    limiter = limiters.get(pool)
+    if limiter is None:
+        limiter = limiters.setdefault(pool, build_limiter(current_app.config, pool))
+    return limiter
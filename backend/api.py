@@ -1,36 +1,91 @@
 from __future__ import annotations
 
 import json
+import math
+import time
+from dataclasses import dataclass, replace
 from typing import Any, Dict, List, Optional, Tuple
 
 from bson import ObjectId, json_util
 from flask import Blueprint, current_app, jsonify, request
-
-from .db import get_collection
+from pymongo.errors import ExecutionTimeout
+
+from .admission import get_admission_limiter
+from .autocomplete import build_autocomplete_pipeline, get_title_index
+from .candidates import candidates_for_request, get_candidate_policy
+from .db import get_collection, get_db
+from .facets import build_facet_stage, count_facets, facet_projection, merge_facets
+from .local_index import find_projection, get_local_index, search_local_index
+from .pagination import (
+    RankedPool,
+    build_pool,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    get_cursor_secret,
+    get_pool_cache,
+    pool_key,
+    pool_projection,
+)
+from .partitions import SearchTarget, default_target, fan_out, resolve_search_targets
+from .recorder import record_search
+from .resilience import Deadline, call_with_timeout, embed_timeout_ms, get_embedding_breaker
+from .streaming import merge_ranked, ndjson_response, wants_stream
 from .voyage import get_client
+from utils.embeddings import extract_embeddings
 from utils.logger import get_logger
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
-
-def extract_embeddings(response) -> List[List[float]]:
-    embeddings = getattr(response, "embeddings", None)
-    if embeddings is None:
-        raise ValueError("Voyage response did not contain embeddings.")
-    vectors: List[List[float]] = []
-    for item in embeddings:
-        if hasattr(item, "embedding"):
-            vectors.append(item.embedding)  # type: ignore[attr-defined]
-        else:
-            vectors.append(item)
-    return vectors
+# Fields that must never leave the database in a search response.
+HEAVY_FIELDS = frozenset({"emb_description", "description_embeddings", "image_embeddings"})
+
+# Top-level fields a client may ask for; any ``product.<field>`` path is also allowed.
+PROJECTABLE_FIELDS = frozenset(
+    {
+        "title",
+        "imageUrl",
+        "restaurantName",
+        "restaurantCode",
+        "countryCode",
+        "areaCode",
+        "areaType",
+        "catalogId",
+        "product",
+    }
+)
+
+PROJECTION_PROFILES: Dict[str, Tuple[str, ...]] = {
+    "full": ("restaurantName", "title", "product"),
+    "card": (
+        "restaurantName",
+        "title",
+        "product.name",
+        "product.description",
+        "product.available",
+        "product.price.amount",
+    ),
+    "compact": (),
+}
+
+SCORE_PROJECTIONS: Dict[str, Dict[str, Any]] = {
+    "vector": {"score": {"$meta": "vectorSearchScore"}},
+    "hybrid": {"scoreDetails": {"$meta": "scoreDetails"}},
+    "fulltext": {"score": {"$meta": "searchScore"}},
+}
 
 
 def build_filter_components(
-    available: Optional[bool], max_price: Optional[float], restaurant: Optional[str]
+    available: Optional[bool],
+    max_price: Optional[float],
+    restaurant: Optional[str],
+    country: Optional[str] = None,
 ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
     conditions: List[Dict[str, Any]] = []
 
+    if country:
+        conditions.append({"countryCode": country})
+
     if available is not None:
         conditions.append({"product.available": available})
 
@@ -50,6 +105,183 @@ def build_filter_components(
     return combined, combined
 
 
+def build_vector_stage(
+    index: str,
+    query_vector: List[float],
+    limit: int,
+    num_candidates: int,
+    filter_doc: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    stage: Dict[str, Any] = {
+        "$vectorSearch": {
+            "index": index,
+            "path": "emb_description",
+            "queryVector": query_vector,
+            "limit": limit,
+            "numCandidates": num_candidates,
+        }
+    }
+    if filter_doc:
+        stage["$vectorSearch"]["filter"] = filter_doc
+    return stage
+
+
+def build_text_stage(index: str, title: str) -> Dict[str, Any]:
+    return {"$search": {"index": index, "text": {"query": title, "path": "title"}}}
+
+
+# Weights of the vector (searchOne) and full-text (searchTwo) legs in hybrid search.
+FUSION_WEIGHTS = {"searchOne": 10, "searchTwo": 1}
+
+
+def build_score_fusion_stage(vector_stage: Dict[str, Any], text_stage: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "$scoreFusion": {
+            "input": {
+                "pipelines": {
+                    "searchOne": [vector_stage],
+                    "searchTwo": [text_stage],
+                },
+                "normalization": "sigmoid",
+            },
+            "combination": {
+                "method": "expression",
+                "expression": {
+                    "$sum": [
+                        {"$multiply": ["$$searchOne", FUSION_WEIGHTS["searchOne"]]},
+                        {"$multiply": ["$$searchTwo", FUSION_WEIGHTS["searchTwo"]]},
+                    ]
+                },
+            },
+            "scoreDetails": True,
+        }
+    }
+
+
+def build_search_pipeline(
+    mode: str,
+    *,
+    vector_stage: Optional[Dict[str, Any]],
+    text_stage: Optional[Dict[str, Any]],
+    match_clause: Optional[Dict[str, Any]],
+    projection: Dict[str, Any],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """Assemble the aggregation for ``mode``.
+
+    Vector filters are applied inside ``$vectorSearch``; hybrid and full-text
+    searches apply ``match_clause`` after the search stage.
+    """
+    if mode == "vector":
+        if vector_stage is None:
+            raise ValueError("Vector search requires a $vectorSearch stage.")
+        return [vector_stage, {"$project": projection}, {"$limit": limit}]
+
+    if text_stage is None:
+        raise ValueError("Hybrid and full-text searches require a $search stage.")
+    if mode == "hybrid":
+        if vector_stage is None:
+            raise ValueError("Hybrid search requires a $vectorSearch stage.")
+        pipeline = [build_score_fusion_stage(vector_stage, text_stage)]
+    else:
+        pipeline = [text_stage]
+    if match_clause:
+        pipeline.append({"$match": match_clause})
+    pipeline.extend([{"$project": projection}, {"$limit": limit}])
+    return pipeline
+
+
+def result_score(document: Dict[str, Any]) -> float:
+    details = document.get("scoreDetails")
+    if isinstance(details, dict) and isinstance(details.get("value"), (int, float)):
+        return float(details["value"])
+    score = document.get("score")
+    return float(score) if isinstance(score, (int, float)) else 0.0
+
+
+def fuse_results(
+    vector_results: List[Dict[str, Any]], text_results: List[Dict[str, Any]], limit: int, compact: bool = False
+) -> List[Dict[str, Any]]:
+    """Client-side equivalent of :func:`build_score_fusion_stage` for legs run as separate queries.
+
+    Each leg's ``score`` is sigmoid-normalised and weighted like
+    ``$scoreFusion``; a document missing from one leg contributes 0 for it.
+    The result carries a ``scoreDetails`` shaped like the server-side one, or
+    just ``score`` for the compact profile.
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for leg, results in (("searchOne", vector_results), ("searchTwo", text_results)):
+        for document in results:
+            entry = fused.setdefault(document["_id"], {"document": document, "legs": {}})
+            entry["legs"][leg] = 1.0 / (1.0 + math.exp(-float(document.get("score") or 0.0)))
+
+    ranked = []
+    for entry in fused.values():
+        value = sum(FUSION_WEIGHTS[leg] * normalized for leg, normalized in entry["legs"].items())
+        document = {key: item for key, item in entry["document"].items() if key != "score"}
+        if compact:
+            document["score"] = value
+            ranked.append(document)
+            continue
+        document["scoreDetails"] = {
+            "value": value,
+            "description": "sigmoid-normalised weighted sum",
+            "details": [
+                {"inputPipelineName": leg, "value": entry["legs"].get(leg, 0.0), "weight": weight}
+                for leg, weight in FUSION_WEIGHTS.items()
+            ],
+        }
+        ranked.append(document)
+    ranked.sort(key=result_score, reverse=True)
+    return ranked[:limit]
+
+
+def resolve_projection_fields(
+    payload: Dict[str, Any], default_profile: str
+) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """Return the profile name and field list requested by ``payload``.
+
+    Explicit ``fields`` win over ``profile``; ``compact: true`` is a shortcut for
+    the compact profile. Raises ``ValueError`` for unknown profiles, fields
+    outside :data:`PROJECTABLE_FIELDS` and paths MongoDB would reject (empty or
+    ``$``-prefixed segments).
+    """
+    fields = payload.get("fields")
+    if fields is not None:
+        if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+            raise ValueError("El campo 'fields' debe ser una lista de rutas.")
+        selected: List[str] = []
+        for field in (field.strip() for field in fields):
+            segments = field.split(".")
+            if any(not segment or segment.startswith("$") for segment in segments):
+                raise ValueError(f"La ruta '{field}' no es válida.")
+            root = segments[0]
+            if root in HEAVY_FIELDS or (root not in PROJECTABLE_FIELDS):
+                raise ValueError(f"El campo '{field}' no se puede proyectar.")
+            if field not in selected:
+                selected.append(field)
+        return None, tuple(selected)
+
+    profile = "compact" if payload.get("compact") else (payload.get("profile") or default_profile)
+    if profile not in PROJECTION_PROFILES:
+        raise ValueError(f"Perfil de proyección no válido: {profile}.")
+    return profile, PROJECTION_PROFILES[profile]
+
+
+def build_projection(mode: str, fields: Tuple[str, ...], compact: bool = False) -> Dict[str, Any]:
+    projection: Dict[str, Any] = {"_id": 1}
+    for field in fields:
+        # A parent path already covers its children and MongoDB rejects both.
+        if any(field.startswith(f"{other}.") for other in fields if other != field):
+            continue
+        projection[field] = 1
+    if compact and mode == "hybrid":
+        projection["score"] = {"$meta": "score"}
+    else:
+        projection.update(SCORE_PROJECTIONS[mode])
+    return projection
+
+
 def sanitize_result(document: Dict[str, Any]) -> Dict[str, Any]:
     result = dict(document)
 
@@ -81,43 +313,84 @@ def sanitize_result(document: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
-@api_bp.route("/restaurants", methods=["GET"])
-def list_restaurants():
-    collection = get_collection()
-    pipeline = [
-        {"$group": {"_id": "$restaurantName"}},
-        {"$match": {"_id": {"$ne": None}}},
-        {"$sort": {"_id": 1}},
-    ]
-    logger = get_logger("api")
-    logger.info("Executing restaurants aggregation: %s", pipeline)
-    restaurants = [doc["_id"] for doc in collection.aggregate(pipeline)]
-    return jsonify(restaurants)
+@dataclass
+class SearchRequest:
+    mode: str
+    description: str
+    title: str
+    limit: int
+    profile: Optional[str]
+    fields: Tuple[str, ...]
+    projection: Dict[str, Any]
+    available: Optional[bool] = None
+    max_price: Optional[float] = None
+    restaurant: Optional[str] = None
+    country: Optional[str] = None
+    timeout_ms: Optional[float] = None
+    # Offset into the ranked pool for paginated searches; ``None`` when not paginating.
+    page_offset: Optional[int] = None
+    facets: bool = False
+    stream: bool = False
+
+    @property
+    def filters(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "max_price": self.max_price,
+            "restaurant": self.restaurant,
+            "country": self.country,
+        }
 
+    @property
+    def query(self) -> Dict[str, Any]:
+        """The payload fields that define the result set, as carried by pagination cursors."""
+        query = {
+            "mode": self.mode,
+            "description": self.description,
+            "title": self.title,
+            "available": self.available,
+            "maxPrice": self.max_price,
+            "restaurant": self.restaurant,
+            "country": self.country,
+        }
+        if self.profile:
+            query["profile"] = self.profile
+        else:
+            query["fields"] = list(self.fields)
+        return {key: value for key, value in query.items() if value not in (None, "")}
 
-@api_bp.route("/search", methods=["POST"])
-def search_products():
-    payload = request.get_json(silent=True) or {}
-    logger = get_logger("api")
+
+def parse_search_request(
+    payload: Dict[str, Any], default_profile: str, max_stream_limit: int = 1000
+) -> SearchRequest:
+    """Validate a ``/api/search`` payload; raises ``ValueError`` with the message for the client.
+
+    Streamed searches may ask for up to ``max_stream_limit`` results instead of 25.
+    """
     mode = (payload.get("mode") or "vector").lower()
     if mode not in {"vector", "hybrid", "fulltext"}:
-        return jsonify({"message": "Modo de búsqueda no válido."}), 400
+        raise ValueError("Modo de búsqueda no válido.")
 
     description = (payload.get("description") or "").strip()
     title_value = (payload.get("title") or "").strip()
 
     if mode in {"vector", "hybrid"} and not description:
-        return jsonify({"message": "La descripción es obligatoria para la búsqueda seleccionada."}), 400
+        raise ValueError("La descripción es obligatoria para la búsqueda seleccionada.")
 
     if mode in {"hybrid", "fulltext"} and not title_value:
-        return jsonify({"message": "El título es obligatorio para la búsqueda seleccionada."}), 400
+        raise ValueError("El título es obligatorio para la búsqueda seleccionada.")
+
+    stream = bool(payload.get("stream"))
+    if stream and payload.get("paginate"):
+        raise ValueError("La transmisión de resultados no se puede combinar con la paginación.")
 
     try:
         limit = int(payload.get("limit", 5))
     except (TypeError, ValueError):
         limit = 5
-    limit = max(1, min(limit, 25))
-    num_candidates = limit * 20
+    limit = max(1, min(limit, max_stream_limit if stream else 25))
+
+    profile, fields = resolve_projection_fields(payload, default_profile)
 
     available = payload.get("available")
     if available is not None:
@@ -128,164 +401,431 @@ def search_products():
         try:
             max_price = float(max_price)
         except (TypeError, ValueError):
-            return jsonify({"message": "El formato del precio máximo no es válido."}), 400
+            raise ValueError("El formato del precio máximo no es válido.") from None
 
     restaurant = payload.get("restaurant")
     if restaurant is not None:
-        restaurant = restaurant.strip()
-        if not restaurant:
-            restaurant = None
+        restaurant = str(restaurant).strip() or None
 
-    logger.info(
-        "Search request mode=%s description_length=%d title_length=%d limit=%d filters=%s",
-        mode,
-        len(description),
-        len(title_value),
-        limit,
-        {"available": available, "max_price": max_price, "restaurant": restaurant},
+    country = payload.get("country")
+    if country is not None:
+        country = str(country).strip().upper() or None
+
+    timeout_ms = payload.get("timeoutMs")
+    if timeout_ms is not None:
+        try:
+            timeout_ms = float(timeout_ms)
+        except (TypeError, ValueError):
+            timeout_ms = -1.0
+        if not timeout_ms > 0:
+            raise ValueError("El campo 'timeoutMs' debe ser un número positivo.")
+
+    return SearchRequest(
+        mode=mode,
+        description=description,
+        title=title_value,
+        limit=limit,
+        profile=profile,
+        fields=fields,
+        projection=build_projection(mode, fields, compact=profile == "compact"),
+        available=available,
+        max_price=max_price,
+        restaurant=restaurant,
+        country=country,
+        timeout_ms=timeout_ms,
+        page_offset=0 if payload.get("paginate") else None,
+        facets=bool(payload.get("facets")),
+        stream=stream,
     )
 
-    query_vector: Optional[List[float]] = None
-    vector_stage: Optional[Dict[str, Any]] = None
-    filter_doc: Optional[Dict[str, Any]] = None
-    match_clause: Optional[Dict[str, Any]] = None
 
-    if mode in {"vector", "hybrid"}:
-        voyage_client = get_client()
-        text_model = current_app.config.get("VOYAGE_TEXT_MODEL", "voyage-3.5")
+def degrade_to_fulltext(search: SearchRequest) -> SearchRequest:
+    """The full-text search served when the embedding leg is unavailable.
+
+    Vector requests have no title, so their description becomes the text query.
+    """
+    return replace(
+        search,
+        mode="fulltext",
+        title=search.title or search.description,
+        projection=build_projection("fulltext", search.fields, compact=search.profile == "compact"),
+    )
+
+
+def search_budget_ms(search: SearchRequest, default_ms: float) -> float:
+    """A client may ask for a tighter budget than the configured one, never a looser one."""
+    return min(search.timeout_ms, default_ms) if search.timeout_ms else default_ms
+
+
+def embed_query(text: str, deadline: Deadline) -> Tuple[Optional[List[float]], Optional[str]]:
+    """Embed ``text`` within the request budget; returns the vector or the reason it is unavailable."""
+    breaker = get_embedding_breaker()
+    if not breaker.allow():
+        return None, "embedding_circuit_open"
+    timeout_ms = embed_timeout_ms(deadline, current_app.config.get("EMBED_TIMEOUT_MS", 1500))
+    try:
+        response = call_with_timeout(
+            get_client().embed,
+            timeout_ms,
+            texts=[text],
+            model=current_app.config.get("VOYAGE_TEXT_MODEL", "voyage-3.5"),
+        )
+        vector = extract_embeddings(response)[0]
+    except TimeoutError:
+        breaker.record_failure()
+        return None, "embedding_timeout"
+    except Exception as exc:  # pylint: disable=broad-except
+        get_logger("api").warning("Embedding failed: %s", exc)
+        breaker.record_failure()
+        return None, "embedding_error"
+    breaker.record_success()
+    return vector, None
+
+
+@api_bp.route("/restaurants", methods=["GET"])
+def list_restaurants():
+    collection = get_collection()
+    pipeline = [
+        {"$group": {"_id": "$restaurantName"}},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$sort": {"_id": 1}},
+    ]
+    logger = get_logger("api")
+    logger.info("Executing restaurants aggregation: %s", pipeline)
+    restaurants = [doc["_id"] for doc in collection.aggregate(pipeline)]
+    return jsonify(restaurants)
 
+
+@api_bp.route("/autocomplete", methods=["GET"])
+def autocomplete_titles():
+    prefix = (request.args.get("q") or "").strip()[:100]
+    try:
+        limit = max(1, min(int(request.args.get("limit", 8)), 20))
+    except ValueError:
+        return jsonify({"message": "El límite debe ser un número entero."}), 400
+    if len(prefix) < current_app.config.get("AUTOCOMPLETE_MIN_CHARS", 2):
+        return jsonify({"query": prefix, "suggestions": []})
+
+    if current_app.config.get("AUTOCOMPLETE_SOURCE", "local") == "atlas":
+        pipeline = build_autocomplete_pipeline(default_target().text_index, prefix, limit)
         try:
-            embedding_response = voyage_client.embed(texts=[description], model=text_model)
-            vectors = extract_embeddings(embedding_response)
-            query_vector = vectors[0]
+            suggestions = [document["_id"] for document in get_collection().aggregate(pipeline)]
         except Exception as exc:  # pylint: disable=broad-except
-            return jsonify({"message": f"No fue posible generar el embedding: {exc}"}), 500
-
-        vector_index = current_app.config.get("VECTOR_INDEX_NAME") or current_app.config.get("ATLAS_SEARCH_INDEX")
-        if not vector_index:
-            return jsonify({"message": "No hay un índice vectorial configurado."}), 500
-
-        vector_stage = {
-            "$vectorSearch": {
-                "index": vector_index,
-                "path": "emb_description",
-                "queryVector": query_vector,
-                "limit": limit,
-                "numCandidates": num_candidates,
+            get_logger("api").exception("Autocomplete aggregation failed: %s", exc)
+            return jsonify({"message": f"No fue posible obtener sugerencias: {exc}"}), 500
+    else:
+        suggestions = get_title_index().complete(prefix, limit)
+
+    response = jsonify({"query": prefix, "suggestions": suggestions})
+    # Suggestions change slowly; repeated keystrokes within a minute are served by the browser.
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@api_bp.route("/products/<product_id>/similar", methods=["GET"])
+def similar_products(product_id: str):
+    """Neighbours precomputed by ``similar.py``: one ``_id`` match plus a ``$lookup`` on the product ``_id``s."""
+    if not ObjectId.is_valid(product_id):
+        return jsonify({"message": "Identificador de producto no válido."}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), 50))
+    except ValueError:
+        return jsonify({"message": "El límite debe ser un número entero."}), 400
+    try:
+        _, fields = resolve_projection_fields(
+            {"profile": request.args.get("profile")}, current_app.config.get("SEARCH_PROJECTION_PROFILE", "full")
+        )
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+
+    pipeline = [
+        {"$match": {"_id": ObjectId(product_id)}},
+        {"$project": {"n": {"$slice": ["$n", limit]}, "s": {"$slice": ["$s", limit]}}},
+        {
+            "$lookup": {
+                "from": current_app.config.get("PRODUCT_COLLECTION"),
+                "localField": "n",
+                "foreignField": "_id",
+                "as": "products",
+                "pipeline": [{"$project": find_projection(build_projection("vector", fields))}],
             }
+        },
+    ]
+    logger = get_logger("api")
+    logger.info("Executing similar products aggregation: %s", pipeline)
+    collection_name = current_app.config.get("PRODUCT_SIMILAR_COLLECTION", "product_similar")
+    document = next(get_db()[collection_name].aggregate(pipeline), None)
+    if document is None:
+        return jsonify({"message": "No hay productos similares para este producto."}), 404
+
+    # $lookup does not keep the order of ``n``; put the products back in neighbour order.
+    products = {product["_id"]: product for product in document["products"]}
+    results = [
+        sanitize_result({**products[neighbour], "score": score})
+        for neighbour, score in zip(document["n"], document["s"])
+        if neighbour in products
+    ]
+    return jsonify({"productId": product_id, "results": results})
+
+
+@api_bp.route("/search", methods=["POST"])
+def search_products():
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        payload = {}
+    logger = get_logger("api")
+    offset = None
+    if payload.get("cursor") is not None:
+        # A cursor replaces the query: it carries the original one and the page offset.
+        try:
+            query, offset, page_size = decode_cursor(get_cursor_secret(), payload["cursor"])
+        except ValueError as exc:
+            return jsonify({"message": str(exc)}), 400
+        payload = {
+            **query,
+            "paginate": True,
+            "limit": payload.get("limit", page_size),
+            "timeoutMs": payload.get("timeoutMs"),
         }
+    elif wants_stream(payload, request.accept_mimetypes):
+        payload = {**payload, "stream": True}
+    record_search(payload)
+    try:
+        search = parse_search_request(
+            payload,
+            current_app.config.get("SEARCH_PROJECTION_PROFILE", "full"),
+            current_app.config.get("SEARCH_STREAM_MAX_LIMIT", 1000),
+        )
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+    if offset is not None:
+        search = replace(search, page_offset=offset)
+    # Streamed exports read far more documents, so they get their own, longer budget.
+    budget_key, default_budget = ("SEARCH_STREAM_TIMEOUT_MS", 30000) if search.stream else ("SEARCH_TIMEOUT_MS", 3000)
+    deadline = Deadline(search_budget_ms(search, current_app.config.get(budget_key, default_budget)))
+
+    limiter = get_admission_limiter(search.mode)
+    queue_timeout_ms = min(current_app.config.get("ADMISSION_QUEUE_TIMEOUT_MS", 250), deadline.remaining_ms())
+    if not limiter.acquire(queue_timeout_ms):
+        retry_after = limiter.retry_after_seconds()
+        logger.warning(
+            "Shedding %s search: admission pool '%s' is full %s.", search.mode, limiter.name, limiter.snapshot()
+        )
+        response = jsonify({"message": "El servicio está saturado; intenta de nuevo en unos segundos."})
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 429
+    started = time.perf_counter()
+    status = 500
+    streaming = False
+    try:
+        response = run_search(search, deadline)
+        status = response[1] if isinstance(response, tuple) else response.status_code
+        streaming = not isinstance(response, tuple) and response.is_streamed
+        if streaming:
+            # The stream still holds its cursor: free the slot once the body is sent, but feed the
+            # limiter the time to the first byte so long exports do not read as overload.
+            latency_ms = (time.perf_counter() - started) * 1000
+            response.call_on_close(lambda: limiter.release(latency_ms, overloaded=False))
+        return response
+    finally:
+        if not streaming:
+            limiter.release((time.perf_counter() - started) * 1000, overloaded=status == 504)
+
+
+def page_response(search: SearchRequest, pool: RankedPool, deadline: Deadline):
+    """Serve one page of a ranked pool with ``_id`` lookups and attach the cursor for the next one."""
+    offset = search.page_offset or 0
+    entries = pool.entries[offset : offset + search.limit]
+    if deadline.expired:
+        return jsonify({"message": "La búsqueda superó el tiempo límite."}), 504
+    try:
+        documents = fetch_page(
+            get_db(), entries, search.projection, max_time_ms=max(1, int(deadline.remaining_ms()))
+        )
+    except ExecutionTimeout:
+        get_logger("api").warning("Page lookup exceeded its %.0fms budget.", deadline.budget_ms)
+        return jsonify({"message": "La búsqueda superó el tiempo límite."}), 504
+    except Exception as exc:  # pylint: disable=broad-except
+        get_logger("api").exception("Page lookup failed: %s", exc)
+        return jsonify({"message": f"No fue posible ejecutar la búsqueda: {exc}"}), 500
+    body: Dict[str, Any] = {
+        "mode": pool.mode,
+        "results": [sanitize_result(document) for document in documents],
+        "degraded": pool.degraded_reason is not None,
+    }
+    if pool.degraded_reason:
+        body["degradedReason"] = pool.degraded_reason
+    next_offset = offset + search.limit
+    body["nextCursor"] = (
+        encode_cursor(
+            get_cursor_secret(),
+            search.query,
+            next_offset,
+            search.limit,
+            current_app.config.get("SEARCH_CURSOR_MAX_AGE", 3600),
+        )
+        if next_offset < len(pool.entries)
+        else None
+    )
+    return jsonify(body)
 
-        filter_doc, match_clause = build_filter_components(available, max_price, restaurant)
-        if filter_doc:
-            vector_stage["$vectorSearch"]["filter"] = filter_doc
-    else:
-        _, match_clause = build_filter_components(available, max_price, restaurant)
 
-    collection = get_collection()
+def run_search(search: SearchRequest, deadline: Deadline):
+    logger = get_logger("api")
+    started = time.perf_counter()
+    paginated = search.page_offset is not None
+    if paginated:
+        # Cursors keep the requested query even if this retrieval degrades to full text.
+        requested = search
+        key = pool_key(search.query)
+        pool = get_pool_cache().get(key)
+        if pool is not None:
+            logger.info("Serving page at offset %d from a cached pool of %d.", search.page_offset, len(pool.entries))
+            return page_response(search, pool, deadline)
+
+    mode, limit, projection = search.mode, search.limit, search.projection
+    available, max_price, restaurant, country = search.available, search.max_price, search.restaurant, search.country
 
-    if mode == "vector":
-        if vector_stage is None:
-            return jsonify({"message": "No se pudo preparar la búsqueda vectorial."}), 500
-        pipeline = [
-            vector_stage,
-            {
-                "$project": {
-                    "_id": 1,
-                    "restaurantName": 1,
-                    "product": 1,
-                    "title": 1,
-                    "score": {"$meta": "vectorSearchScore"},
-                }
-            },
-            {"$limit": limit},
-        ]
-        logger.info("Executing vector pipeline: %s", pipeline)
-    elif mode == "hybrid":
-        if vector_stage is None:
-            return jsonify({"message": "No se pudo preparar la búsqueda híbrida."}), 500
-
-        text_index = current_app.config.get("FULL_TEXT_INDEX_NAME", "full-text-search")
-        score_fusion_stage: Dict[str, Any] = {
-            "$scoreFusion": {
-                "input": {
-                    "pipelines": {
-                        "searchOne": [vector_stage],
-                        "searchTwo": [
-                            {
-                                "$search": {
-                                    "index": text_index,
-                                    "text": {"query": title_value, "path": "title"},
-                                }
-                            }
-                        ],
-                    },
-                    "normalization": "sigmoid",
-                },
-                "combination": {
-                    "method": "expression",
-                    "expression": {
-                        "$sum": [
-                            {"$multiply": ["$$searchOne", 10]},
-                            "$$searchTwo",
-                        ]
-                    },
-                },
-                "scoreDetails": True,
-            }
+    logger.info(
+        "Search request mode=%s description_length=%d title_length=%d limit=%d profile=%s filters=%s",
+        mode,
+        len(search.description),
+        len(search.title),
+        limit,
+        search.profile or ",".join(search.fields),
+        search.filters,
+    )
+
+    query_vector: Optional[List[float]] = None
+    degraded_reason: Optional[str] = None
+    timings: Dict[str, float] = {}
+    if mode in {"vector", "hybrid"}:
+        query_vector, degraded_reason = embed_query(search.description, deadline)
+        timings["embedMs"] = round((time.perf_counter() - started) * 1000, 1)
+        if degraded_reason:
+            logger.warning("Embedding unavailable (%s); serving a full-text search instead.", degraded_reason)
+            search = degrade_to_fulltext(search)
+            mode, projection = search.mode, search.projection
+
+    # Facets count the candidate pool in the same aggregation; pages of a paginated search carry none.
+    faceted = search.facets and not paginated and not search.stream
+    boundaries = current_app.config.get("FACET_PRICE_BOUNDARIES", [0, 10, 20, 30, 50, 100])
+    if paginated:
+        # One retrieval fills the whole pool; every page, this one included, is then read by _id.
+        limit = current_app.config.get("SEARCH_PAGE_POOL", 200)
+        projection = pool_projection(projection)
+    elif faceted:
+        limit = max(limit, current_app.config.get("FACET_POOL_SIZE", 200))
+        projection = facet_projection(search.projection)
+
+    def stream(documents):
+        header: Dict[str, Any] = {"mode": mode, "limit": limit, "degraded": degraded_reason is not None}
+        if degraded_reason:
+            header["degradedReason"] = degraded_reason
+        return ndjson_response(header, documents, sanitize_result, started=started, limit=limit, timings=timings)
+
+    def respond(documents: List[Dict[str, Any]], collections: List[str]):
+        facets = None
+        if faceted:
+            if len(documents) > 1:
+                # Count the merged top of the partitions' pools, the same pool one collection counts.
+                ranked = sorted((doc for docs in documents for doc in docs), key=result_score, reverse=True)
+                documents = [[count_facets(ranked[:limit], search.projection, search.limit, boundaries)]]
+            # Every target returned a single $facet document.
+            raw_facets = [docs[0] if docs else {} for docs in documents]
+            facets = merge_facets(raw_facets, boundaries)
+            documents = [raw.get("results") or [] for raw in raw_facets]
+        if paginated:
+            entries = [entry for name, docs in zip(collections, documents) for entry in build_pool(name, docs)]
+            if len(documents) > 1:
+                entries.sort(key=lambda entry: result_score(entry[2]), reverse=True)
+            pool = RankedPool(entries[:limit], mode, degraded_reason)
+            get_pool_cache().put(key, pool)
+            return page_response(requested, pool, deadline)
+        if len(documents) == 1:
+            results = documents[0]
+        else:
+            # Partitions share the index definition, so their scores are comparable.
+            results = sorted((doc for docs in documents for doc in docs), key=result_score, reverse=True)
+        body: Dict[str, Any] = {
+            "mode": mode,
+            "results": [sanitize_result(doc) for doc in results[: search.limit]],
+            "degraded": degraded_reason is not None,
         }
+        if degraded_reason:
+            body["degradedReason"] = degraded_reason
+        if facets is not None:
+            body["facets"] = facets
+        return jsonify(body)
 
-        pipeline = [score_fusion_stage]
-        if match_clause:
-            pipeline.append({"$match": match_clause})
-        pipeline.extend(
-            [
-                {
-                    "$project": {
-                        "_id": 1,
-                        "restaurantName": 1,
-                        "product": 1,
-                        "title": 1,
-                        "scoreDetails": {"$meta": "scoreDetails"},
-                    }
-                },
-                {"$limit": limit},
-            ]
-        )
-        logger.info("Executing score fusion pipeline: %s", pipeline)
-    else:  # fulltext simple
-        text_index = current_app.config.get("FULL_TEXT_INDEX_NAME", "full-text-search")
-        pipeline = [
-            {
-                "$search": {
-                    "index": text_index,
-                    "text": {"query": title_value, "path": "title"},
-                }
+    local_index = get_local_index() if mode == "vector" and not country else None
+
+    filter_doc, match_clause = build_filter_components(available, max_price, restaurant, country)
+
+    if local_index is not None and query_vector is not None:
+        collection = get_collection()
+        try:
+            documents, strategy = search_local_index(
+                collection, local_index, query_vector, limit, projection, available, max_price, restaurant
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Local vector search failed: %s", exc)
+            return jsonify({"message": f"No fue posible ejecutar la búsqueda: {exc}"}), 500
+        logger.info("Served vector search from the local index (%s).", strategy)
+        if search.stream:
+            return stream(documents)
+        if faceted:
+            documents = [count_facets(documents, search.projection, search.limit, boundaries)]
+        return respond([documents], [collection.name])
+
+    targets = resolve_search_targets({"country": country, "restaurant": restaurant})
+    if mode in {"vector", "hybrid"} and any(not target.vector_index for target in targets):
+        return jsonify({"message": "No hay un índice vectorial configurado."}), 500
+
+    policy = get_candidate_policy()
+    # fan_out runs targets on worker threads, outside the app context.
+    batch_size = current_app.config.get("SEARCH_STREAM_BATCH_SIZE", 100)
+
+    def run_target(collection, target: SearchTarget) -> List[Dict[str, Any]]:
+        vector_stage = None
+        if query_vector is not None:
+            # Inside a partition its own scope filter matches every document.
+            scoped = {
+                key: value
+                for key, value in {"restaurant": restaurant, "country": country}.items()
+                if target.partition is None or value != target.partition
             }
-        ]
-        if match_clause:
-            pipeline.append({"$match": match_clause})
-        pipeline.extend(
-            [
-                {
-                    "$project": {
-                        "_id": 1,
-                        "restaurantName": 1,
-                        "product": 1,
-                        "title": 1,
-                        "score": {"$meta": "searchScore"},
-                    }
-                },
-                {"$limit": limit},
-            ]
+            num_candidates = candidates_for_request(policy, limit, available, max_price, **scoped)
+            vector_stage = build_vector_stage(target.vector_index, query_vector, limit, num_candidates, filter_doc)
+        pipeline = build_search_pipeline(
+            mode,
+            vector_stage=vector_stage,
+            text_stage=build_text_stage(target.text_index, search.title) if mode != "vector" else None,
+            match_clause=match_clause,
+            projection=projection,
+            limit=limit,
         )
-        logger.info("Executing full-text pipeline: %s", pipeline)
-
+        if faceted and len(targets) == 1:
+            pipeline.append(build_facet_stage(search.projection, search.limit, boundaries))
+        logger.info("Executing %s pipeline on '%s': %s", mode, target.collection, pipeline)
+        # maxTimeMS lets the server abandon the query once the request budget is spent.
+        max_time_ms = max(1, int(deadline.remaining_ms()))
+        if search.stream:
+            # The first batch comes back here; the rest is fetched while the response is sent.
+            return collection.aggregate(pipeline, maxTimeMS=max_time_ms, batchSize=batch_size)
+        return list(collection.aggregate(pipeline, maxTimeMS=max_time_ms))
+
+    if deadline.expired:
+        return jsonify({"message": "La búsqueda superó el tiempo límite."}), 504
     try:
-        print(pipeline)
-        cursor = collection.aggregate(pipeline)
-        results = [sanitize_result(doc) for doc in cursor]
+        result_lists = fan_out(targets, run_target)
+    except ExecutionTimeout:
+        logger.warning("Search exceeded its %.0fms budget.", deadline.budget_ms)
+        return jsonify({"message": "La búsqueda superó el tiempo límite."}), 504
     except Exception as exc:  # pylint: disable=broad-except
         logger.exception("Aggregation failed: %s", exc)
         return jsonify({"message": f"No fue posible ejecutar la búsqueda: {exc}"}), 500
 
-    return jsonify({"mode": mode, "results": results})
+    if search.stream:
+        return stream(merge_ranked(result_lists, result_score))
+    return respond(result_lists, [target.collection for target in targets])
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from flask import Flask, current_app
+
+from .db import get_collection
+from utils.autocomplete import TitleIndex
+from utils.logger import get_logger
+
+_build_lock = threading.Lock()
+
+
+def load_title_counts(collection) -> Dict[str, int]:
+    pipeline = [
+        {"$match": {"title": {"$type": "string", "$ne": ""}}},
+        {"$group": {"_id": "$title", "count": {"$sum": 1}}},
+    ]
+    return {document["_id"]: document["count"] for document in collection.aggregate(pipeline)}
+
+
+def build_autocomplete_pipeline(index: str, prefix: str, limit: int) -> List[Dict[str, Any]]:
+    """Atlas alternative to the in-memory index, using the ``autocomplete`` mapping on ``title``."""
+    return [
+        {"$search": {"index": index, "autocomplete": {"query": prefix, "path": "title"}}},
+        {"$group": {"_id": "$title", "score": {"$max": {"$meta": "searchScore"}}}},
+        {"$sort": {"score": -1, "_id": 1}},
+        {"$limit": limit},
+    ]
+
+
+def _refresh(app: Flask, full: bool) -> None:
+    state = app.extensions["title_index"]
+    logger = get_logger("api")
+    try:
+        with app.app_context():
+            collection = get_collection()
+            started_at = datetime.now(timezone.utc)
+            if full:
+                state["index"].rebuild(load_title_counts(collection))
+                state["rebuilt"] = time.monotonic()
+            else:
+                # Changed products only add titles; renamed or deleted ones leave with the next rebuild.
+                changed = collection.find({"syncedAt": {"$gt": state["watermark"]}}, {"title": 1})
+                added = state["index"].add(document.get("title") for document in changed)
+                if added:
+                    logger.info("Added %d new titles to the autocomplete index.", added)
+            state["watermark"] = started_at
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("Autocomplete refresh failed: %s", exc)
+    finally:
+        state["refreshed"] = time.monotonic()
+        state["refreshing"] = False
+
+
+def get_title_index() -> TitleIndex:
+    """The process-wide title index, built on first use and refreshed in the background afterwards.
+
+    Every ``AUTOCOMPLETE_REFRESH_SECONDS`` titles of products synced since the
+    last refresh are added; every ``AUTOCOMPLETE_REBUILD_SECONDS`` the index is
+    rebuilt from a ``$group`` over all titles.
+    """
+    app = current_app._get_current_object()
+    state = app.extensions.get("title_index")
+    if state is None:
+        with _build_lock:
+            state = app.extensions.get("title_index")
+            if state is None:
+                started = time.perf_counter()
+                started_at = datetime.now(timezone.utc)
+                index = TitleIndex(load_title_counts(get_collection()))
+                get_logger("api").info(
+                    "Built autocomplete index with %d titles in %.0fms.",
+                    len(index),
+                    (time.perf_counter() - started) * 1000,
+                )
+                now = time.monotonic()
+                state = {
+                    "index": index,
+                    "watermark": started_at,
+                    "refreshed": now,
+                    "rebuilt": now,
+                    "refreshing": False,
+                }
+                app.extensions["title_index"] = state
+        return state["index"]
+
+    now = time.monotonic()
+    if not state["refreshing"] and now - state["refreshed"] >= app.config.get("AUTOCOMPLETE_REFRESH_SECONDS", 60):
+        with _build_lock:
+            if state["refreshing"]:
+                return state["index"]
+            state["refreshing"] = True
+        full = now - state["rebuilt"] >= app.config.get("AUTOCOMPLETE_REBUILD_SECONDS", 3600)
+        threading.Thread(target=_refresh, args=(app, full), name="autocomplete-refresh", daemon=True).start()
+    return state["index"]
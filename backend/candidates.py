@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+from utils.candidates import estimate_selectivity, load_policy, num_candidates_for
+from utils.logger import get_logger
+
+_load_lock = threading.Lock()
+
+
+def get_candidate_policy() -> Dict[str, Any]:
+    """Return the policy from ``CANDIDATE_POLICY_PATH`` (or the default), read once per process."""
+    policy = current_app.extensions.get("candidate_policy")
+    if policy is None:
+        with _load_lock:
+            policy = current_app.extensions.get("candidate_policy")
+            if policy is None:
+                path = current_app.config.get("CANDIDATE_POLICY_PATH")
+                policy = load_policy(path)
+                current_app.extensions["candidate_policy"] = policy
+                if path:
+                    get_logger("api").info("Loaded candidate policy '%s' (%d rules).", path, len(policy["rules"]))
+    return policy
+
+
+def candidates_for_request(
+    policy: Dict[str, Any],
+    limit: int,
+    available: Optional[bool] = None,
+    max_price: Optional[float] = None,
+    restaurant: Optional[str] = None,
+    country: Optional[str] = None,
+) -> int:
+    """Pure helper so it can run in fan-out threads; resolve ``policy`` in the request thread."""
+    selectivity = estimate_selectivity(
+        policy.get("selectivity") or {},
+        available=available,
+        max_price=max_price,
+        restaurant=restaurant,
+        country=country,
+    )
+    return num_candidates_for(policy, limit, selectivity)
@@ -1,19 +1,39 @@
 from __future__ import annotations
 
-from flask import current_app, g
+import os
+import threading
+
+from flask import current_app
 from pymongo import MongoClient
 
+_client_lock = threading.Lock()
+
+
+def get_mongo_client() -> MongoClient:
+    """Return this process's MongoClient, creating it on first use.
+
+    The client (and its connection pool) is shared by every request thread.
+    It is keyed by pid so a worker forked from a process that already had a
+    client opens its own instead of reusing inherited sockets.
+    """
+    state = current_app.extensions.get("mongo_client")
+    if state is None or state[0] != os.getpid():
+        with _client_lock:
+            state = current_app.extensions.get("mongo_client")
+            if state is None or state[0] != os.getpid():
+                mongo_uri = current_app.config.get("MONGO_URI")
+                if not mongo_uri:
+                    raise RuntimeError("MongoDB URI not configured on the Flask application.")
+                state = (os.getpid(), MongoClient(mongo_uri))
+                current_app.extensions["mongo_client"] = state
+    return state[1]
+
 
 def get_db():
-    if "mongo_client" not in g:
-        mongo_uri = current_app.config.get("MONGO_URI")
-        if not mongo_uri:
-            raise RuntimeError("MongoDB URI not configured on the Flask application.")
-        g.mongo_client = MongoClient(mongo_uri)
     db_name = current_app.config.get("DB_NAME")
     if not db_name:
         raise RuntimeError("Database name not configured on the Flask application.")
-    return g.mongo_client[db_name]
+    return get_mongo_client()[db_name]
 
 
 def get_collection(name: str | None = None):
@@ -23,7 +43,8 @@ def get_collection(name: str | None = None):
     return get_db()[collection_name]
 
 
-def close_db(_=None):
-    mongo_client = g.pop("mongo_client", None)
-    if mongo_client is not None:
-        mongo_client.close()
+def close_db(app) -> None:
+    """Close the process's client; called when a worker shuts down."""
+    state = app.extensions.pop("mongo_client", None)
+    if state is not None and state[0] == os.getpid():
+        state[1].close()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Fields the facet branches read; they are projected even when the client did not ask for them.
+FACET_FIELDS = ("restaurantName", "product.available", "product.price.amount")
+OTHER_BUCKET = "other"
+
+
+def facet_projection(projection: Dict[str, Any]) -> Dict[str, Any]:
+    """``projection`` plus :data:`FACET_FIELDS`, without paths already covered by a projected parent."""
+    paths = [key for key, value in projection.items() if key != "_id" and not isinstance(value, dict)]
+    paths += [field for field in FACET_FIELDS if field not in paths]
+    combined: Dict[str, Any] = {"_id": 1}
+    for path in paths:
+        if any(path.startswith(f"{other}.") for other in paths if other != path):
+            continue
+        combined[path] = 1
+    combined.update({key: value for key, value in projection.items() if isinstance(value, dict)})
+    return combined
+
+
+def build_facet_stage(projection: Dict[str, Any], limit: int, boundaries: Sequence[float]) -> Dict[str, Any]:
+    """One ``$facet`` over the candidate pool: the top ``limit`` results plus the facet counts.
+
+    It runs after the ``$project`` of :func:`facet_projection`, so scores are
+    already plain fields and the results branch keeps just the requested ones.
+    """
+    return {
+        "$facet": {
+            "results": [{"$limit": limit}, {"$project": {key: 1 for key in projection}}],
+            # Plain $group branches; partitions are summed and sorted by merge_facets anyway.
+            "restaurants": [{"$group": {"_id": "$restaurantName", "count": {"$sum": 1}}}],
+            "availability": [{"$group": {"_id": "$product.available", "count": {"$sum": 1}}}],
+            "price": [
+                {
+                    "$bucket": {
+                        "groupBy": "$product.price.amount",
+                        "boundaries": list(boundaries),
+                        "default": OTHER_BUCKET,
+                        "output": {"count": {"$sum": 1}},
+                    }
+                }
+            ],
+            "pool": [{"$count": "count"}],
+        }
+    }
+
+
+def _price_bucket(price: Any, boundaries: Sequence[float]) -> Any:
+    if not isinstance(price, (int, float)) or isinstance(price, bool):
+        return OTHER_BUCKET
+    position = bisect_right(boundaries, price)
+    if position == 0 or position == len(boundaries):
+        return OTHER_BUCKET
+    return boundaries[position - 1]
+
+
+def _project(document: Dict[str, Any], paths: Iterable[str]) -> Dict[str, Any]:
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        source, target = document, projected
+        parts = path.split(".")
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return projected
+
+
+def count_facets(
+    documents: List[Dict[str, Any]], projection: Dict[str, Any], limit: int, boundaries: Sequence[float]
+) -> Dict[str, Any]:
+    """Python equivalent of :func:`build_facet_stage` for pools ranked outside MongoDB (the local index)."""
+    counts: Dict[str, Dict[Any, int]] = {"restaurants": {}, "availability": {}, "price": {}}
+    for document in documents:
+        product = document.get("product") if isinstance(document.get("product"), dict) else {}
+        price = product.get("price") if isinstance(product.get("price"), dict) else {}
+        for facet, value in (
+            ("restaurants", document.get("restaurantName")),
+            ("availability", product.get("available")),
+            ("price", _price_bucket(price.get("amount"), boundaries)),
+        ):
+            counts[facet][value] = counts[facet].get(value, 0) + 1
+    raw: Dict[str, Any] = {
+        facet: [{"_id": value, "count": count} for value, count in values.items()] for facet, values in counts.items()
+    }
+    raw["results"] = [_project(document, projection) for document in documents[:limit]]
+    raw["pool"] = [{"count": len(documents)}] if documents else []
+    return raw
+
+
+def merge_facets(raw_facets: Iterable[Dict[str, Any]], boundaries: Sequence[float]) -> Dict[str, Any]:
+    """Sum ``$facet`` outputs (one per partition) into the response shape."""
+    totals: Dict[str, Dict[Any, int]] = {"restaurants": {}, "availability": {}, "price": {}}
+    pool = 0
+    for raw in raw_facets:
+        for facet, values in totals.items():
+            for bucket in raw.get(facet) or []:
+                values[bucket["_id"]] = values.get(bucket["_id"], 0) + bucket["count"]
+        pool += sum(entry["count"] for entry in raw.get("pool") or [])
+
+    upper_bounds: Dict[Any, Optional[float]] = dict(zip(boundaries[:-1], boundaries[1:]))
+    price = [
+        {"min": lower, "max": upper_bounds[lower], "count": totals["price"].get(lower, 0)}
+        for lower in boundaries[:-1]
+    ]
+    if totals["price"].get(OTHER_BUCKET):
+        price.append({"min": None, "max": None, "count": totals["price"][OTHER_BUCKET]})
+    return {
+        "pool": pool,
+        "restaurants": [
+            {"value": name, "count": count}
+            for name, count in sorted(totals["restaurants"].items(), key=lambda item: (-item[1], str(item[0])))
+        ],
+        "availability": [
+            {"value": value, "count": count}
+            for value, count in sorted(totals["availability"].items(), key=lambda item: -item[1])
+        ],
+        "price": price,
+    }
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, Response, request
+
+try:  # Brotli is optional; gzip covers every client without it.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset(
+    {"application/json", "application/javascript", "text/javascript", "text/css", "text/html", "text/plain"}
+)
+# Fingerprinted URLs never change content, so browsers may keep them for a year.
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+_fingerprints: Dict[str, Tuple[float, str]] = {}
+
+
+def etag_for(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred content coding the client accepts: ``br`` when available, else ``gzip``."""
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if part.strip() and not part.replace(" ", "").endswith(";q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def static_fingerprint(static_folder: str, filename: str) -> Optional[str]:
+    """Short content hash of a static file, recomputed only when its mtime changes."""
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _fingerprints.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as handle:
+            cached = (mtime, hashlib.md5(handle.read()).hexdigest()[:12])
+        _fingerprints[path] = cached
+    return cached[1]
+
+
+def _add_static_fingerprint(app: Flask, endpoint: str, values: Dict[str, str]) -> None:
+    if endpoint == "static" and "filename" in values and "v" not in values:
+        fingerprint = static_fingerprint(app.static_folder, values["filename"])
+        if fingerprint:
+            values["v"] = fingerprint
+
+
+def _cache_headers(app: Flask, response: Response) -> None:
+    if request.endpoint == "static":
+        version = request.args.get("v")
+        fingerprint = static_fingerprint(app.static_folder, request.view_args.get("filename", ""))
+        # An unversioned or stale URL is revalidated with its ETag on every use.
+        if version and version == fingerprint:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+    elif request.method in {"GET", "HEAD"} and response.mimetype == "application/json" and response.status_code == 200:
+        response.add_etag()
+        response.headers.setdefault("Cache-Control", "no-cache")
+        response.make_conditional(request)
+    elif request.endpoint == "api.search_products" and response.status_code == 200:
+        # Searches are POSTs and never answered with 304, but the ETag lets
+        # clients tell whether a repeated query changed. Hashing a streamed
+        # body would buffer it, so NDJSON streams go without one.
+        if not response.is_streamed:
+            response.add_etag()
+        response.headers["Cache-Control"] = "no-store"
+
+
+def _compress_response(app: Flask, response: Response) -> None:
+    if (
+        response.status_code != 200
+        # Files from send_file are direct-passthrough iterators and can be read whole.
+        or (response.is_streamed and not response.direct_passthrough)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < app.config.get("COMPRESSION_MIN_BYTES", 1024):
+        return
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The encoded body differs byte for byte, so its validator must not be strong.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def init_http_cache(app: Flask) -> None:
+    """Fingerprint static URLs, add validators and caching headers, and compress large responses."""
+    app.url_defaults(lambda endpoint, values: _add_static_fingerprint(app, endpoint, values))
+
+    @app.after_request
+    def http_cache(response: Response) -> Response:
+        _cache_headers(app, response)
+        _compress_response(app, response)
+        return response
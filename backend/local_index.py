@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from utils.local_index import LocalVectorIndex, SearchHit
+
+_load_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalVectorIndex]:
+    """Return the process-wide local index, mapping the snapshot on first use."""
+    path = current_app.config.get("LOCAL_INDEX_PATH")
+    if not path:
+        return None
+    index = current_app.extensions.get("local_index")
+    if index is None:
+        with _load_lock:
+            index = current_app.extensions.get("local_index")
+            if index is None:
+                # numpy comes in with the index, so workers without LOCAL_INDEX_PATH never import it.
+                from utils.local_index import LocalVectorIndex
+
+                index = LocalVectorIndex.from_path(path, current_app.config.get("LOCAL_INDEX_SIMILARITY", "cosine"))
+                current_app.extensions["local_index"] = index
+                get_logger("api").info("Loaded local vector index '%s' with %d rows.", path, len(index))
+    return index
+
+
+def search_local_index(
+    collection,
+    index: LocalVectorIndex,
+    query_vector: List[float],
+    limit: int,
+    projection: Dict[str, Any],
+    available: Optional[bool],
+    max_price: Optional[float],
+    restaurant: Optional[str],
+) -> Tuple[List[Dict[str, Any]], str]:
+    """Rank with the local index, then fetch only the winning documents by ``_id``.
+
+    Returns the documents and the strategy the index used to rank them.
+    """
+    hits, strategy = index.search(query_vector, limit, available=available, max_price=max_price, restaurant=restaurant)
+    if not hits:
+        return [], strategy
+
+    documents = collection.find({"_id": {"$in": [hit.id for hit in hits]}}, find_projection(projection))
+    return order_by_hits(hits, documents), strategy
+
+
+def find_projection(projection: Dict[str, Any]) -> Dict[str, Any]:
+    # $meta projections only exist inside search pipelines; the score comes from the index.
+    return {key: value for key, value in projection.items() if not isinstance(value, dict)}
+
+
+def order_by_hits(hits: List[SearchHit], documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_id = {document["_id"]: document for document in documents}
+    results: List[Dict[str, Any]] = []
+    for hit in hits:
+        document = by_id.get(hit.id)
+        if document is None:
+            continue  # removed since the snapshot was taken
+        document["score"] = hit.score
+        results.append(document)
+    return results
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from utils.logger import get_logger
+
+INVALID_CURSOR = "El cursor no es válido o expiró."
+
+
+@dataclass
+class RankedPool:
+    """Ranked ``(collection, _id, score fields)`` entries retrieved once for a paginated query."""
+
+    entries: List[Tuple[str, Any, Dict[str, Any]]]
+    mode: str
+    degraded_reason: Optional[str] = None
+    created: float = field(default_factory=time.monotonic)
+
+
+class RankedPoolCache:
+    """Small thread-safe LRU of :class:`RankedPool` objects that expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 120.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._pools: "OrderedDict[str, RankedPool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[RankedPool]:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return None
+            if time.monotonic() - pool.created > self.ttl:
+                del self._pools[key]
+                return None
+            self._pools.move_to_end(key)
+            return pool
+
+    def put(self, key: str, pool: RankedPool) -> None:
+        with self._lock:
+            self._pools[key] = pool
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_entries:
+                self._pools.popitem(last=False)
+
+
+def pool_key(query: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(query, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode_cursor(secret: bytes, query: Dict[str, Any], offset: int, limit: int, max_age: float) -> str:
+    """Signed token for the page starting at ``offset``; it carries the whole query so any worker can resume."""
+    state = {"q": query, "o": offset, "n": limit, "e": int(time.time() + max_age)}
+    body = _b64encode(json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    signature = _b64encode(hmac.new(secret, body.encode("ascii"), hashlib.sha256).digest())
+    return f"{body}.{signature}"
+
+
+def decode_cursor(secret: bytes, token: Any) -> Tuple[Dict[str, Any], int, int]:
+    """Return ``(query, offset, limit)`` from a token; raises ``ValueError`` for forged or expired ones."""
+    if not isinstance(token, str) or token.count(".") != 1:
+        raise ValueError(INVALID_CURSOR)
+    body, signature = token.split(".")
+    expected = _b64encode(hmac.new(secret, body.encode("ascii", "replace"), hashlib.sha256).digest())
+    if not hmac.compare_digest(signature, expected):
+        raise ValueError(INVALID_CURSOR)
+    try:
+        state = json.loads(_b64decode(body))
+        query, offset, limit, expires = state["q"], int(state["o"]), int(state["n"]), float(state["e"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError(INVALID_CURSOR) from None
+    if expires < time.time() or not isinstance(query, dict) or offset < 0:
+        raise ValueError(INVALID_CURSOR)
+    return query, offset, limit
+
+
+def pool_projection(projection: Dict[str, Any]) -> Dict[str, Any]:
+    """Only ``_id`` and the score fields: the pool query transfers ids, not documents."""
+    return {"_id": 1, **{key: value for key, value in projection.items() if isinstance(value, dict)}}
+
+
+def build_pool(collection_name: str, documents: List[Dict[str, Any]]) -> List[Tuple[str, Any, Dict[str, Any]]]:
+    return [
+        (collection_name, document["_id"], {key: value for key, value in document.items() if key != "_id"})
+        for document in documents
+    ]
+
+
+def fetch_page(
+    db, entries: List[Tuple[str, Any, Dict[str, Any]]], projection: Dict[str, Any], max_time_ms: int = 0
+) -> List[Dict[str, Any]]:
+    """Load one page of pooled ids with plain ``_id`` lookups and keep the pool order and scores."""
+    fields = {key: value for key, value in projection.items() if not isinstance(value, dict)}
+    by_collection: Dict[str, List[Any]] = {}
+    for collection_name, document_id, _ in entries:
+        by_collection.setdefault(collection_name, []).append(document_id)
+    found: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+    for collection_name, ids in by_collection.items():
+        cursor = db[collection_name].find({"_id": {"$in": ids}}, fields)
+        if max_time_ms:
+            cursor = cursor.max_time_ms(max_time_ms)
+        for document in cursor:
+            found[(collection_name, document["_id"])] = document
+    page = []
+    for collection_name, document_id, scores in entries:
+        document = found.get((collection_name, document_id))
+        if document is not None:  # deleted since the pool was retrieved
+            page.append({**document, **scores})
+    return page
+
+
+def get_cursor_secret() -> bytes:
+    secret = current_app.extensions.get("cursor_secret")
+    if secret is None:
+        configured = current_app.config.get("SEARCH_CURSOR_SECRET")
+        if configured:
+            secret = configured.encode("utf-8")
+        else:
+            get_logger("api").warning(
+                "SEARCH_CURSOR_SECRET is not set; cursors are signed with a per-process key "
+                "and only work on the worker that issued them."
+            )
+            secret = os.urandom(32)
+        secret = current_app.extensions.setdefault("cursor_secret", secret)
+    return secret
+
+
+def get_pool_cache() -> RankedPoolCache:
+    cache = current_app.extensions.get("ranked_pools")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "ranked_pools", RankedPoolCache(ttl=current_app.config.get("SEARCH_PAGE_TTL", 120))
+        )
+    return cache
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app
+
+from .db import get_db
+from utils.logger import get_logger
+from utils.search_config import PARTITION_FIELDS, load_active_indexes, load_partitions
+
+_fanout_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search-fanout")
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    """One collection and the search indexes to query on it."""
+
+    collection: str
+    vector_index: Optional[str]
+    text_index: str
+    partition: Optional[str] = None
+
+
+def _cached_config(name: str, loader: Callable[[Any, str], Dict[str, Any]]) -> Dict[str, Any]:
+    """Read a ``search_config`` document at most once per ``SEARCH_CONFIG_TTL`` seconds.
+
+    On read errors the last known value is kept so a config outage does not
+    take searches down.
+    """
+    cached = current_app.extensions.get(name)
+    ttl = current_app.config.get("SEARCH_CONFIG_TTL", 30)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    try:
+        value = loader(get_db(), current_app.config.get("PRODUCT_COLLECTION"))
+    except Exception as exc:  # pylint: disable=broad-except
+        get_logger("api").warning("Could not load search config '%s': %s", name, exc)
+        value = cached[1] if cached else {}
+    current_app.extensions[name] = (time.monotonic(), value)
+    return value
+
+
+def get_partition_registry() -> Dict[str, Any]:
+    """Partition registry written by ``indexes.py --partition-by``."""
+    return _cached_config("partition_registry", load_partitions)
+
+
+def get_active_indexes() -> Dict[str, Any]:
+    """Index names switched in by ``indexes.py --blue-green``."""
+    return _cached_config("active_indexes", load_active_indexes)
+
+
+def build_default_target(config, active: Dict[str, Any]) -> SearchTarget:
+    """The global collection, using blue/green index names when present and env config otherwise."""
+    return SearchTarget(
+        collection=config.get("PRODUCT_COLLECTION"),
+        vector_index=active.get("vector") or config.get("VECTOR_INDEX_NAME") or config.get("ATLAS_SEARCH_INDEX"),
+        text_index=active.get("text") or config.get("FULL_TEXT_INDEX_NAME", "full-text-search"),
+    )
+
+
+def default_target() -> SearchTarget:
+    return build_default_target(current_app.config, get_active_indexes())
+
+
+def route_targets(
+    registry: Dict[str, Any], scope: Dict[str, Optional[str]], default: SearchTarget, fanout: bool = True
+) -> List[SearchTarget]:
+    """Route a search to its partition, fan out when unscoped, or use ``default``.
+
+    ``scope`` maps payload keys (``country``, ``restaurant``) to their values.
+    An empty list means the scope names a partition that does not exist. A
+    fan-out includes the catch-all partition of documents without a value.
+    """
+    partitions: Dict[str, Dict[str, str]] = registry.get("partitions") or {}
+    if not partitions:
+        return [default]
+
+    def to_target(value: Optional[str], entry: Dict[str, str]) -> SearchTarget:
+        return SearchTarget(entry["collection"], entry.get("vectorIndex"), entry["textIndex"], value)
+
+    scope_value = scope.get(PARTITION_FIELDS.get(registry.get("field"), ""))
+    if scope_value:
+        entry = partitions.get(scope_value)
+        return [to_target(scope_value, entry)] if entry else []
+
+    if not fanout:
+        return [default]
+    targets = [to_target(value, entry) for value, entry in sorted(partitions.items())]
+    if registry.get("unassigned"):
+        targets.append(to_target(None, registry["unassigned"]))
+    return targets
+
+
+def resolve_search_targets(scope: Dict[str, Optional[str]]) -> List[SearchTarget]:
+    return route_targets(
+        get_partition_registry(), scope, default_target(), current_app.config.get("PARTITION_FANOUT", True)
+    )
+
+
+def fan_out(targets: List[SearchTarget], run: Callable[[Any, SearchTarget], List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+    """Run ``run(collection, target)`` for every target concurrently.
+
+    Collections are resolved in the request thread because ``get_db`` depends
+    on the application context.
+    """
+    db = get_db()
+    if len(targets) == 1:
+        return [run(db[targets[0].collection], targets[0])]
+    futures = [_fanout_executor.submit(run, db[target.collection], target) for target in targets]
+    return [future.result() for future in futures]
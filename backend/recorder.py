@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict
+
+from flask import current_app
+
+from utils.logger import get_logger
+
+# Only the search parameters are kept; anything else a client sends is dropped.
+RECORDED_FIELDS = (
+    "mode",
+    "description",
+    "title",
+    "limit",
+    "available",
+    "maxPrice",
+    "restaurant",
+    "country",
+    "profile",
+    "fields",
+    "timeoutMs",
+    "paginate",
+    "facets",
+    "stream",
+)
+MAX_TEXT_LENGTH = 500
+
+_write_lock = threading.Lock()
+
+
+def sanitize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    body: Dict[str, Any] = {}
+    for key in RECORDED_FIELDS:
+        value = payload.get(key)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value[:MAX_TEXT_LENGTH]
+        elif isinstance(value, list):
+            value = [item for item in value if isinstance(item, str)]
+        elif not isinstance(value, (bool, int, float)):
+            continue
+        body[key] = value
+    return body
+
+
+def append_record(path: str, payload: Dict[str, Any]) -> None:
+    """Append a sanitized ``/api/search`` payload as a ``{request_id, title, body}`` JSONL line."""
+    body = sanitize_payload(payload)
+    line = json.dumps(
+        {
+            "request_id": uuid.uuid4().hex,
+            "title": f"{str(body.get('mode') or 'vector').lower()} search",
+            "body": body,
+        },
+        ensure_ascii=False,
+    )
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+    except OSError as exc:
+        get_logger("api").warning("Could not record search payload: %s", exc)
+
+
+def record_search(payload: Dict[str, Any]) -> None:
+    path = current_app.config.get("SEARCH_RECORD_PATH")
+    if path:
+        append_record(path, payload)
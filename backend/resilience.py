@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+from flask import current_app
+
+from utils.logger import get_logger
+
+# Embedding calls run here so the request thread can stop waiting at its deadline.
+# A timed-out call keeps its thread until the provider answers; the breaker
+# below stops new calls from piling up behind it.
+_call_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline-call")
+
+
+class Deadline:
+    """A request's latency budget, started when the request arrives."""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self._expires = time.monotonic() + budget_ms / 1000
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self._expires - time.monotonic()) * 1000)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    :meth:`allow` refuses calls for ``reset_seconds``; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                get_logger("api").info("Circuit '%s' closed.", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            trial_failed = self._trial_in_flight
+            self._trial_in_flight = False
+            if trial_failed or self._failures >= self.failure_threshold:
+                if self._opened_at is None or trial_failed:
+                    get_logger("api").warning(
+                        "Circuit '%s' opened after %d consecutive failures.", self.name, self._failures
+                    )
+                self._opened_at = time.monotonic()
+
+
+def embed_timeout_ms(deadline: Deadline, cap_ms: float) -> float:
+    """Timeout for the embedding call: at most half of what is left, so a full-text fallback still fits."""
+    return min(deadline.remaining_ms() / 2, cap_ms)
+
+
+def call_with_timeout(function: Callable[..., Any], timeout_ms: float, *args: Any, **kwargs: Any) -> Any:
+    """Run ``function`` and raise :class:`TimeoutError` if it has not returned within ``timeout_ms``."""
+    if timeout_ms <= 0:
+        raise TimeoutError("No time left in the request budget.")
+    future = _call_executor.submit(function, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout_ms / 1000)
+    except FutureTimeout:
+        future.cancel()
+        raise TimeoutError(f"Call did not finish within {timeout_ms:.0f}ms.") from None
+
+
+def get_embedding_breaker() -> CircuitBreaker:
+    breaker = current_app.extensions.get("embedding_breaker")
+    if breaker is None:
+        breaker = current_app.extensions.setdefault(
+            "embedding_breaker",
+            CircuitBreaker(
+                "embedding",
+                current_app.config.get("EMBED_BREAKER_THRESHOLD", 5),
+                current_app.config.get("EMBED_BREAKER_RESET_SECONDS", 30.0),
+            ),
+        )
+    return breaker
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import heapq
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from flask import Response, current_app, stream_with_context
+from pymongo.errors import ExecutionTimeout
+
+from utils.logger import get_logger
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def wants_stream(payload: Dict[str, Any], accept_mimetypes) -> bool:
+    """``"stream": true`` in the payload or an ``Accept`` that prefers NDJSON over JSON."""
+    if payload.get("stream"):
+        return True
+    return accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def merge_ranked(
+    sources: List[Iterable[Dict[str, Any]]], score: Callable[[Dict[str, Any]], float]
+) -> Iterator[Dict[str, Any]]:
+    """Lazily interleave per-partition cursors, each already sorted by descending score.
+
+    Closing the returned generator closes every source cursor.
+    """
+    try:
+        if len(sources) == 1:
+            yield from sources[0]
+        else:
+            yield from heapq.merge(*sources, key=lambda document: -score(document))
+    finally:
+        for source in sources:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def ndjson_response(
+    header: Dict[str, Any],
+    documents: Iterable[Dict[str, Any]],
+    transform: Callable[[Dict[str, Any]], Dict[str, Any]],
+    *,
+    started: float,
+    limit: int,
+    timings: Optional[Dict[str, float]] = None,
+) -> Response:
+    """Stream ``documents`` as NDJSON while they come off the cursor.
+
+    The body is a ``header`` record, one ``result`` record per document and a
+    ``trailer`` with the count and timings (milliseconds since ``started``).
+    Errors after the first byte cannot change the status code, so they are
+    reported in the trailer's ``error``.
+    """
+    dumps = current_app.json.dumps
+
+    def generate() -> Iterator[str]:
+        count = 0
+        first_result_ms = None
+        error = None
+        yield dumps({"type": "header", **header}) + "\n"
+        try:
+            for document in documents:
+                if count >= limit:
+                    break
+                if first_result_ms is None:
+                    first_result_ms = _elapsed_ms(started)
+                yield dumps({"type": "result", "result": transform(document)}) + "\n"
+                count += 1
+        except ExecutionTimeout:
+            get_logger("api").warning("Streamed search exceeded its budget after %d results.", count)
+            error = "La búsqueda superó el tiempo límite."
+        except Exception as exc:  # pylint: disable=broad-except
+            get_logger("api").exception("Streamed search failed after %d results: %s", count, exc)
+            error = f"No fue posible completar la búsqueda: {exc}"
+        finally:
+            close = getattr(documents, "close", None)
+            if close is not None:
+                close()
+        trailer: Dict[str, Any] = {
+            "type": "trailer",
+            "count": count,
+            "timings": {**(timings or {}), "firstResultMs": first_result_ms, "totalMs": _elapsed_ms(started)},
+        }
+        if error:
+            trailer["error"] = error
+        yield dumps(trailer) + "\n"
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    # Keep proxies from buffering the stream and so delaying the first record.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -1,19 +1,37 @@
 from __future__ import annotations
 
-from flask import current_app, g
-from voyageai import Client
+import os
+import threading
 
+from flask import current_app
 
-def get_client() -> Client:
-    if "voyage_client" not in g:
-        api_key = current_app.config.get("VOYAGE_API_KEY")
-        if not api_key:
-            raise RuntimeError("VoyageAI API key not configured on the Flask application.")
-        g.voyage_client = Client(api_key=api_key)
-    return g.voyage_client
+from utils.embeddings import EmbeddingProvider, create_embedding_client
 
+_client_lock = threading.Lock()
 
-def close_client(_=None):
-    client = g.pop("voyage_client", None)
-    if client and hasattr(client, "close"):
-        client.close()
+
+def get_client() -> EmbeddingProvider:
+    """Return this process's embedding client, created on first use (see :func:`backend.db.get_mongo_client`)."""
+    state = current_app.extensions.get("embedding_client")
+    if state is None or state[0] != os.getpid():
+        with _client_lock:
+            state = current_app.extensions.get("embedding_client")
+            if state is None or state[0] != os.getpid():
+                provider = current_app.config.get("EMBEDDING_PROVIDER", "voyage")
+                api_key = current_app.config.get("VOYAGE_API_KEY")
+                if provider == "voyage" and not api_key:
+                    raise RuntimeError("VoyageAI API key not configured on the Flask application.")
+                client = create_embedding_client(
+                    provider,
+                    api_key=api_key,
+                    dimensions=current_app.config.get("EMBEDDING_DIMENSIONS", 1024),
+                )
+                state = (os.getpid(), client)
+                current_app.extensions["embedding_client"] = state
+    return state[1]
+
+
+def close_client(app) -> None:
+    state = app.extensions.pop("embedding_client", None)
+    if state is not None and state[0] == os.getpid() and hasattr(state[1], "close"):
+        state[1].close()
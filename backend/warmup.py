@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict
+
+from flask import Blueprint, Flask, current_app, jsonify
+
+from .autocomplete import get_title_index
+from .candidates import get_candidate_policy
+from .db import close_db, get_collection, get_db
+from .local_index import get_local_index
+from .partitions import get_active_indexes, get_partition_registry
+from .voyage import close_client, get_client
+from utils.logger import get_logger
+
+health_bp = Blueprint("health", __name__)
+
+
+def _ping_mongo() -> None:
+    get_db().command("ping")
+
+
+def _embed_probe() -> None:
+    get_client().embed(texts=["warm-up"], model=current_app.config.get("VOYAGE_TEXT_MODEL", "voyage-3.5"))
+
+
+def _prime_search_config() -> None:
+    get_partition_registry()
+    get_active_indexes()
+    get_candidate_policy()
+
+
+def _prime_autocomplete() -> None:
+    if current_app.config.get("AUTOCOMPLETE_SOURCE", "local") == "local":
+        get_title_index()
+
+
+def _touch_collection() -> None:
+    # Pulls the collection metadata and a first page into the connection pool.
+    get_collection().find_one({}, {"_id": 1})
+
+
+WARMUP_STEPS = (
+    ("mongo", _ping_mongo),
+    ("embedding", _embed_probe),
+    ("searchConfig", _prime_search_config),
+    ("localIndex", get_local_index),
+    ("autocomplete", _prime_autocomplete),
+    ("collection", _touch_collection),
+)
+
+
+def warm_up(app: Flask) -> bool:
+    """Run every warm-up step in this process and mark the app ready when all succeed.
+
+    Step timings and the first error are kept in ``app.extensions["warmup"]``
+    for ``/ready``.
+    """
+    logger = get_logger("app")
+    state: Dict[str, Any] = {"ready": False, "steps": {}}
+    started = time.perf_counter()
+    with app.app_context():
+        for name, step in WARMUP_STEPS:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Warm-up step '%s' failed: %s", name, exc)
+                state["error"] = f"{name}: {exc}"
+                app.extensions["warmup"] = state
+                return False
+            state["steps"][name] = round((time.perf_counter() - step_started) * 1000, 1)
+    state["ready"] = True
+    state["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+    app.extensions["warmup"] = state
+    logger.info("Warm-up finished in %.1fms: %s", state["durationMs"], state["steps"])
+    return True
+
+
+def start_warm_up(app: Flask, retry_seconds: float = 5.0) -> None:
+    """Warm up inline once; on failure keep retrying in a daemon thread so the worker still boots.
+
+    Until a retry succeeds ``/ready`` answers 503 and requests pay the
+    cold-start cost themselves.
+    """
+    if warm_up(app):
+        return
+
+    def retry() -> None:
+        delay = retry_seconds
+        while True:
+            time.sleep(delay)
+            if warm_up(app):
+                return
+            delay = min(delay * 2, 60.0)
+
+    threading.Thread(target=retry, name="warm-up", daemon=True).start()
+
+
+def shutdown(app: Flask) -> None:
+    close_client(app)
+    close_db(app)
+
+
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    state = current_app.extensions.get("warmup") or {"ready": False}
+    return jsonify(state), 200 if state.get("ready") else 503
+
+
+@health_bp.route("/live", methods=["GET"])
+def live():
+    return jsonify({"status": "ok"})
@@ -0,0 +1,293 @@
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import sys
+from datetime import datetime, timezone
+from types import ModuleType, SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from bson import ObjectId
+
+from utils.benchmark import compare_results, load_results, measure, measure_import, save_results
+from utils.embeddings import EmbeddingResult, extract_embeddings
+from utils.logger import get_logger
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DIMENSIONS = 1024
+# Cold-import budgets in milliseconds, from ``python -X importtime``. The app pays for
+# Flask and pymongo; the CLI scripts defer pymongo, numpy and voyageai until they run.
+IMPORT_BUDGETS_MS = {
+    "app": 450,
+    "indexes.py": 60,
+    "embed.py": 120,
+    "transform-seed.py": 120,
+    "local-test.py": 60,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Offline micro-benchmarks of the search and ingestion hot paths, with JSON baselines."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and write a JSON result file.")
+    run_parser.add_argument("--filter", help="Only run benchmarks whose name contains this text.")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed samples per benchmark (default: 5).")
+    run_parser.add_argument(
+        "--min-time", type=float, default=0.05, help="Minimum seconds per sample; sets the loop count (default: 0.05)."
+    )
+    run_parser.add_argument(
+        "--output", help="Result file (default: benchmarks/<timestamp>.json). Keep one as the baseline."
+    )
+    run_parser.add_argument("--baseline", help="Compare against this result file once the run finishes.")
+    run_parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Relative slowdown flagged as a regression (default: 0.10)."
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files; exits 1 on regressions.")
+    compare_parser.add_argument("baseline", help="Result file to compare against.")
+    compare_parser.add_argument("current", help="Result file of the change under test.")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Relative slowdown flagged as a regression (default: 0.10)."
+    )
+    return parser.parse_args()
+
+
+def load_script(filename: str) -> ModuleType:
+    """Import a root script by path; hyphenated names such as ``transform-seed.py`` are not importable."""
+    name = os.path.splitext(filename)[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StaticEmbeddingClient:
+    """Fake provider returning precomputed vectors, so embedding benchmarks time only our code."""
+
+    def __init__(self, dimensions: int = DIMENSIONS):
+        self._vector = [0.001 * (position % 97) for position in range(dimensions)]
+
+    def embed(self, texts: List[str], model: str = None, **kwargs: Any) -> EmbeddingResult:
+        return EmbeddingResult(embeddings=[list(self._vector) for _ in texts])
+
+
+class MemoryCollection:
+    """The slice of the pymongo collection API the benchmarked write paths use, backed by a dict."""
+
+    def __init__(self, documents: List[Dict[str, Any]] = ()):
+        self.documents = {document["_id"]: dict(document) for document in documents}
+
+    def find(self, query: Dict[str, Any] = None, projection: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        return list(self.documents.values())
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> None:
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"]})
+        document.update(update.get("$set", {}))
+        for key in update.get("$unset", {}):
+            document.pop(key, None)
+
+
+def silent_logger() -> logging.Logger:
+    logger = logging.getLogger("benchmark.silent")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def sample_product(index: int) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(),
+        "title": f"Pollo a la brasa {index}",
+        "restaurantName": f"Restaurante {index % 20}",
+        "countryCode": "PE",
+        "product": {
+            "_id": str(ObjectId()),
+            "name": f"Pollo a la brasa {index}",
+            "description": "Un cuarto de pollo a la brasa con papas fritas, ensalada y cremas de la casa.",
+            "available": index % 3 != 0,
+            "price": {"amount": 10.0 + index % 40, "currency": "PEN"},
+        },
+    }
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    """Benchmark name -> zero-argument callable; inputs are built once, outside the timed calls."""
+    from backend.api import (
+        build_filter_components,
+        build_search_pipeline,
+        build_text_stage,
+        build_vector_stage,
+        parse_search_request,
+        sanitize_result,
+    )
+
+    embed = load_script("embed.py")
+    transform_seed = load_script("transform-seed.py")
+
+    query_vector = StaticEmbeddingClient().embed(["consulta"]).embeddings[0]
+
+    def construct_pipeline(payload: Dict[str, Any]) -> Callable[[], Any]:
+        def run() -> Any:
+            search = parse_search_request(payload, "full")
+            filter_doc, match_clause = build_filter_components(**search.filters)
+            vector_stage = (
+                build_vector_stage("vector_index", query_vector, search.limit, search.limit * 20, filter_doc)
+                if search.mode != "fulltext"
+                else None
+            )
+            return build_search_pipeline(
+                search.mode,
+                vector_stage=vector_stage,
+                text_stage=build_text_stage("text_index", search.title) if search.mode != "vector" else None,
+                match_clause=match_clause,
+                projection=search.projection,
+                limit=search.limit,
+            )
+
+        return run
+
+    filters = {"available": True, "maxPrice": 25, "restaurant": "Restaurante 3", "country": "pe"}
+    cases: Dict[str, Callable[[], Any]] = {
+        "filters/none": lambda: build_filter_components(None, None, None),
+        "filters/all": lambda: build_filter_components(True, 25.0, "Restaurante 3", "PE"),
+        "pipeline/vector": construct_pipeline({"mode": "vector", "description": "pollo con papas", **filters}),
+        "pipeline/hybrid": construct_pipeline(
+            {"mode": "hybrid", "description": "pollo con papas", "title": "pollo", **filters}
+        ),
+        "pipeline/fulltext": construct_pipeline({"mode": "fulltext", "title": "pollo", "profile": "compact"}),
+    }
+
+    base = sample_product(1)
+    results = {
+        "vector": {**base, "score": 0.9132},
+        "fulltext": {**base, "score": 7.25},
+        "hybrid": {
+            **base,
+            "scoreDetails": {
+                "value": 0.0325,
+                "details": [{"inputPipelineName": "searchOne", "value": 0.9, "weight": 0.5}],
+            },
+        },
+    }
+    for mode, document in results.items():
+        cases[f"sanitize/{mode}"] = lambda document=document: sanitize_result(document)
+
+    vectors = StaticEmbeddingClient().embed(["texto"] * 16)
+    voyage_like = SimpleNamespace(embeddings=[SimpleNamespace(embedding=vector) for vector in vectors.embeddings])
+    cases["extract_embeddings/lists-16"] = lambda: extract_embeddings(vectors)
+    cases["extract_embeddings/objects-16"] = lambda: extract_embeddings(voyage_like)
+
+    products = [sample_product(index) for index in range(64)]
+    logger = silent_logger()
+    options = {"batch_size": 16, "dry_run": False, "text_model": "voyage-3.5"}
+    client = StaticEmbeddingClient()
+    cases["embed/collect-64"] = lambda: embed.collect_documents(products, skip_existing=True)
+    cases["embed/batch-write-64"] = lambda: embed.embed_documents(
+        MemoryCollection(products), client, embed.collect_documents(products, False), options, logger
+    )
+
+    catalog = {
+        "_id": ObjectId(),
+        "restaurantName": "Restaurante 1",
+        "description_embeddings": [0.0] * DIMENSIONS,
+        "products": [product["product"] for product in products[:20]],
+    }
+    cases["transform/build_product_document-20"] = lambda: list(transform_seed.iter_product_documents(catalog))
+    return cases
+
+
+def run_import_benchmarks(names: List[str], repeat: int, logger) -> Dict[str, Dict[str, Any]]:
+    """Time each target's imports in fresh interpreters; scripts are run with ``runpy`` under a non-main name."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for target in names:
+        if target.endswith(".py"):
+            statement = f"runpy.run_path({os.path.join(ROOT, target)!r}, run_name='__benchmark__')"
+            result = measure_import(statement, setup="import runpy", repeat=repeat, cwd=ROOT)
+        else:
+            result = measure_import(f"import {target}", repeat=repeat, cwd=ROOT)
+        result["budgetUs"] = IMPORT_BUDGETS_MS[target] * 1000
+        results[f"import/{target}"] = result
+        logger.info(
+            "%-40s %10.1fms      (budget %dms)",
+            f"import/{target}",
+            result["medianUs"] / 1000,
+            IMPORT_BUDGETS_MS[target],
+        )
+    return results
+
+
+def log_comparison(rows: List[Dict[str, Any]], threshold: float, logger) -> int:
+    regressions = 0
+    for row in rows:
+        if "change" not in row:
+            logger.info("%-40s %s", row["name"], row["status"])
+            continue
+        logger.info(
+            "%-40s %10.2fus -> %10.2fus  %+7.1f%%  %s",
+            row["name"],
+            row["baselineUs"],
+            row["currentUs"],
+            row["change"] * 100,
+            row["status"],
+        )
+        regressions += row["status"] == "regression"
+    if regressions:
+        logger.warning("%d benchmark(s) regressed by more than %.0f%%.", regressions, threshold * 100)
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+    logger = get_logger("benchmark")
+
+    if args.command == "compare":
+        rows = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+        sys.exit(1 if log_comparison(rows, args.threshold, logger) else 0)
+
+    cases = build_cases()
+    selected = {name: fn for name, fn in cases.items() if not args.filter or args.filter in name}
+    imports = [target for target in IMPORT_BUDGETS_MS if not args.filter or args.filter in f"import/{target}"]
+    if not selected and not imports:
+        raise ValueError(f"No benchmark matches '{args.filter}'.")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, fn in selected.items():
+        results[name] = measure(fn, repeat=args.repeat, min_time=args.min_time)
+        logger.info(
+            "%-40s %10.2fus/op  (±%.2f, %d loops x %d)",
+            name,
+            results[name]["medianUs"],
+            results[name]["stdevUs"],
+            results[name]["loops"],
+            results[name]["repeat"],
+        )
+    results.update(run_import_benchmarks(imports, args.repeat, logger))
+    over_budget = [name for name, result in results.items() if result["medianUs"] > result.get("budgetUs", math.inf)]
+    for name in over_budget:
+        logger.warning(
+            "%s takes %.1fms, over its %.0fms budget.",
+            name,
+            results[name]["medianUs"] / 1000,
+            results[name]["budgetUs"] / 1000,
+        )
+
+    output = args.output or os.path.join(
+        "benchmarks", f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    save_results(output, results)
+    logger.info("Wrote %d benchmark results to '%s'.", len(results), output)
+
+    regressions = 0
+    if args.baseline:
+        rows = compare_results(load_results(args.baseline), results, args.threshold)
+        regressions = log_comparison(rows, args.threshold, logger)
+    sys.exit(1 if regressions or over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
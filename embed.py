@@ -1,16 +1,17 @@
 import argparse
 import os
-from typing import Dict, List, Tuple
-
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from voyageai import Client
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from utils.embeddings import create_embedding_client, extract_embeddings
 from utils.logger import get_logger
+from utils.partition import compute_id_ranges, run_partitioned
+from utils.settings import connect, load_env, load_settings
+from utils.sync import description_hash
 
 
 def parse_args() -> argparse.Namespace:
-    load_dotenv()
+    load_env()
     parser = argparse.ArgumentParser(
         description="Embed product descriptions in the product_detail collection using VoyageAI."
     )
@@ -35,56 +36,25 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Skip documents that already contain an emb_description field.",
     )
+    parser.add_argument(
+        "--stale-only",
+        action="store_true",
+        help="Only embed documents flagged with embeddingStale by transform-seed.py --incremental.",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Preview updates without writing to MongoDB.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the collection into _id ranges and embed each in its own process (default: 1).",
+    )
     return parser.parse_args()
 
 
-def load_settings() -> Dict[str, str]:
-    load_dotenv()
-    mongo_uri = os.getenv("MONGODB_URI")
-    db_name = os.getenv("DB_NAME")
-    api_key = os.getenv("VOYAGE_API_KEY")
-    text_model = os.getenv("VOYAGE_TEXT_MODEL", "voyage-3.5")
-
-    missing = [
-        name
-        for name, value in [
-            ("MONGODB_URI", mongo_uri),
-            ("DB_NAME", db_name),
-            ("VOYAGE_API_KEY", api_key),
-        ]
-        if not value
-    ]
-    if missing:
-        raise RuntimeError(
-            f"Missing required environment variables: {', '.join(missing)}"
-        )
-
-    return {
-        "mongo_uri": mongo_uri,
-        "db_name": db_name,
-        "api_key": api_key,
-        "text_model": text_model,
-    }
-
-
-def extract_embeddings(response) -> List[List[float]]:
-    embeddings = getattr(response, "embeddings", None)
-    if embeddings is None:
-        raise ValueError("Voyage response did not contain embeddings.")
-    vectors: List[List[float]] = []
-    for item in embeddings:
-        if hasattr(item, "embedding"):
-            vectors.append(item.embedding)  # type: ignore[attr-defined]
-        else:
-            vectors.append(item)
-    return vectors
-
-
 def batched(iterable: List[Tuple[Dict, str]], size: int) -> List[List[Tuple[Dict, str]]]:
     return [iterable[i : i + size] for i in range(0, len(iterable), size)]
 
@@ -92,7 +62,7 @@ def batched(iterable: List[Tuple[Dict, str]], size: int) -> List[List[Tuple[Dict
 def collect_documents(cursor, skip_existing: bool) -> List[Tuple[Dict, str]]:
     collected: List[Tuple[Dict, str]] = []
     for document in cursor:
-        if skip_existing and "emb_description" in document:
+        if skip_existing and "emb_description" in document and not document.get("embeddingStale"):
             continue
         description = (
             document.get("product", {}).get("description")
@@ -104,18 +74,106 @@ def collect_documents(cursor, skip_existing: bool) -> List[Tuple[Dict, str]]:
     return collected
 
 
+def embed_documents(
+    collection,
+    voyage_client,
+    documents: List[Tuple[Dict, str]],
+    options: Dict[str, Any],
+    logger,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    processed = 0
+    for batch in batched(documents, options["batch_size"]):
+        ids = [doc["_id"] for doc, _ in batch]
+        descriptions = [text for _, text in batch]
+        if options["dry_run"]:
+            logger.info(
+                "[DRY-RUN] Would embed and update documents: %s",
+                ", ".join(str(_id) for _id in ids),
+            )
+            processed += len(batch)
+            if progress:
+                progress(len(batch))
+            continue
+
+        response = voyage_client.embed(texts=descriptions, model=options["text_model"])
+        embeddings = extract_embeddings(response)
+        embedded_at = datetime.now(timezone.utc)
+
+        for (doc, text), vector in zip(batch, embeddings):
+            collection.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "emb_description": vector,
+                        "embeddingHash": description_hash(text),
+                        "embeddedAt": embedded_at,
+                    },
+                    "$unset": {"embeddingStale": ""},
+                },
+            )
+
+        processed += len(batch)
+        if progress:
+            progress(len(batch))
+        logger.info(
+            "Embedded and updated %d/%d documents.", processed, len(documents)
+        )
+    return processed
+
+
+def embed_partition(index: int, query: Dict[str, Any], options: Dict[str, Any], progress) -> Dict[str, int]:
+    """Worker entry point for ``--workers``: embed one ``_id`` range with its own clients."""
+    logger = get_logger("embed")
+    voyage_client = create_embedding_client(options["provider"], options["api_key"], options["dimensions"])
+    mongo_client = connect(options)
+    try:
+        collection = mongo_client[options["db_name"]][options["collection"]]
+        documents = collect_documents(collection.find(query), options["skip_existing"])
+        logger.info("[worker %d] Embedding %d documents in range %s.", index, len(documents), query)
+        return {"processed": embed_documents(collection, voyage_client, documents, options, logger, progress.put)}
+    finally:
+        mongo_client.close()
+
+
 def main() -> None:
     args = parse_args()
-    settings = load_settings()
+    settings = load_settings(embedding=True)
 
     logger = get_logger("embed")
 
-    voyage_client = Client(api_key=settings["api_key"])
-    mongo_client = MongoClient(settings["mongo_uri"])
+    if args.workers > 1 and args.limit:
+        raise ValueError("--limit cannot be combined with --workers.")
+
+    options: Dict[str, Any] = {
+        **settings,
+        "collection": args.collection,
+        "batch_size": args.batch_size,
+        "skip_existing": args.skip_existing,
+        "dry_run": args.dry_run,
+    }
+    base_query: Dict[str, Any] = {"embeddingStale": True} if args.stale_only else {}
+
+    mongo_client = connect(settings)
 
     try:
         collection = mongo_client[settings["db_name"]][args.collection]
-        cursor = collection.find({})
+
+        if args.workers > 1:
+            ranges = compute_id_ranges(collection, args.workers, base_query)
+            logger.info(
+                "Embedding '%s' with %d workers (batch size=%d, dry_run=%s).",
+                args.collection,
+                len(ranges),
+                args.batch_size,
+                args.dry_run,
+            )
+            totals = run_partitioned(embed_partition, ranges, options, logger, "embed")
+            logger.info("Workers embedded descriptions for %d documents.", totals.get("processed", 0))
+            return
+
+        voyage_client = create_embedding_client(settings["provider"], settings["api_key"], settings["dimensions"])
+        cursor = collection.find(base_query)
         if args.limit:
             cursor = cursor.limit(args.limit)
 
@@ -131,31 +189,7 @@ def main() -> None:
             args.dry_run,
         )
 
-        processed = 0
-        for batch in batched(documents, args.batch_size):
-            ids = [doc["_id"] for doc, _ in batch]
-            descriptions = [text for _, text in batch]
-            if args.dry_run:
-                logger.info(
-                    "[DRY-RUN] Would embed and update documents: %s",
-                    ", ".join(str(_id) for _id in ids),
-                )
-                processed += len(batch)
-                continue
-
-            response = voyage_client.embed(texts=descriptions, model=settings["text_model"])
-            embeddings = extract_embeddings(response)
-
-            for (doc, _), vector in zip(batch, embeddings):
-                collection.update_one(
-                    {"_id": doc["_id"]},
-                    {"$set": {"emb_description": vector}},
-                )
-
-            processed += len(batch)
-            logger.info(
-                "Embedded and updated %d/%d documents.", processed, len(documents)
-            )
+        processed = embed_documents(collection, voyage_client, documents, options, logger)
 
         if args.dry_run:
             logger.info("[DRY-RUN] Finished simulation for %d documents.", processed)
@@ -0,0 +1,278 @@
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from backend.api import build_filter_components, build_vector_stage
+from utils.candidates import (
+    MAX_NUM_CANDIDATES,
+    POLICY_VERSION,
+    collect_selectivity_stats,
+    estimate_selectivity,
+    save_policy,
+)
+from utils.embeddings import create_embedding_client, extract_embeddings
+from utils.local_index import LocalVectorIndex
+from utils.logger import get_logger
+from utils.metrics import percentile
+from utils.search_config import load_active_indexes
+from utils.settings import connect, load_settings
+
+# Upper bounds of the selectivity buckets that get their own numCandidates multiplier.
+SELECTIVITY_BUCKETS = (0.01, 0.05, 0.2, 0.5, 1.0)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure recall@k and latency of $vectorSearch across numCandidates and filter "
+        "selectivity, and write the numCandidates policy used by the API."
+    )
+    parser.add_argument("--queries", help="Text file with one query per line (default: sample product names).")
+    parser.add_argument("--sample", type=int, default=50, help="Product names to sample when --queries is not given.")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 25], help="Result limits to evaluate.")
+    parser.add_argument(
+        "--multipliers",
+        type=float,
+        nargs="+",
+        default=[2, 5, 10, 20, 40, 80],
+        help="numCandidates multipliers of k to sweep.",
+    )
+    parser.add_argument(
+        "--ground-truth",
+        choices=["exact", "local"],
+        default="exact",
+        help="'exact' runs $vectorSearch with exact: true; 'local' scores a snapshot with the local index.",
+    )
+    parser.add_argument("--snapshot", help="Snapshot directory for --ground-truth local.")
+    parser.add_argument(
+        "--per-field",
+        type=int,
+        default=2,
+        help="Restaurants and countries to evaluate as filters (most and least common).",
+    )
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Recall@k each bucket must reach.")
+    parser.add_argument("--output", default="candidate-policy.json", help="Where to write the tuned policy.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for query sampling.")
+    args = parser.parse_args()
+    if args.ground_truth == "local" and not args.snapshot:
+        parser.error("--ground-truth local requires --snapshot.")
+    return args
+
+
+def load_queries(args: argparse.Namespace, collection) -> List[str]:
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as handle:
+            return [line.strip() for line in handle if line.strip()]
+    names = sorted({name for name in collection.distinct("product.name") if isinstance(name, str) and name.strip()})
+    return random.Random(args.seed).sample(names, min(args.sample, len(names)))
+
+
+def embed_queries(client, model: str, queries: List[str], batch_size: int = 64) -> List[List[float]]:
+    vectors: List[List[float]] = []
+    for start in range(0, len(queries), batch_size):
+        vectors.extend(extract_embeddings(client.embed(texts=queries[start : start + batch_size], model=model)))
+    return vectors
+
+
+def build_scenarios(stats: Dict[str, Any], per_field: int, with_country: bool) -> List[Dict[str, Any]]:
+    """Filter combinations from unfiltered down to rare restaurants, mirroring the API filters."""
+    scenarios: List[Dict[str, Any]] = [{"name": "none", "filters": {}}, {"name": "available", "filters": {"available": True}}]
+    quantiles = stats.get("priceQuantiles") or []
+    if quantiles:
+        for share in (0.5, 0.1):
+            max_price = quantiles[round(share * (len(quantiles) - 1))]
+            scenarios.append({"name": f"price<{max_price:g}", "filters": {"max_price": max_price}})
+
+    fields = [("restaurant", stats.get("restaurants") or {})]
+    if with_country:
+        fields.append(("country", stats.get("countries") or {}))
+    for key, shares in fields:
+        ranked = sorted(shares, key=shares.get, reverse=True)
+        for value in dict.fromkeys(ranked[:per_field] + ranked[-per_field:]):
+            scenarios.append({"name": f"{key}={value}", "filters": {key: value}})
+        if ranked:
+            scenarios.append({"name": f"available+{key}={ranked[-1]}", "filters": {"available": True, key: ranked[-1]}})
+
+    for scenario in scenarios:
+        scenario["estimatedSelectivity"] = estimate_selectivity(stats, **scenario["filters"])
+    return scenarios
+
+
+def filter_components(filters: Dict[str, Any]):
+    return build_filter_components(
+        filters.get("available"), filters.get("max_price"), filters.get("restaurant"), filters.get("country")
+    )
+
+
+def exact_ids(collection, index_name: str, query_vector: List[float], k: int, filter_doc) -> List[Any]:
+    stage = build_vector_stage(index_name, query_vector, k, 0, filter_doc)
+    del stage["$vectorSearch"]["numCandidates"]
+    stage["$vectorSearch"]["exact"] = True
+    return [document["_id"] for document in collection.aggregate([stage, {"$project": {"_id": 1}}])]
+
+
+def approximate_ids(collection, index_name: str, query_vector: List[float], k: int, num_candidates: int, filter_doc):
+    stage = build_vector_stage(index_name, query_vector, k, num_candidates, filter_doc)
+    started = time.perf_counter()
+    ids = [document["_id"] for document in collection.aggregate([stage, {"$project": {"_id": 1}}])]
+    return ids, (time.perf_counter() - started) * 1000
+
+
+def evaluate(
+    collection,
+    index_name: str,
+    vectors: List[List[float]],
+    scenarios: List[Dict[str, Any]],
+    args: argparse.Namespace,
+    local_index: Optional[LocalVectorIndex],
+    logger,
+) -> List[Dict[str, Any]]:
+    total = collection.estimated_document_count() or 1
+    max_k = max(args.k)
+    rows: List[Dict[str, Any]] = []
+    for scenario in scenarios:
+        filters = scenario["filters"]
+        filter_doc, match_clause = filter_components(filters)
+        selectivity = collection.count_documents(match_clause or {}) / total
+
+        truths = []
+        for vector in vectors:
+            if local_index is not None:
+                hits, _ = local_index.search(
+                    vector, max_k, filters.get("available"), filters.get("max_price"), filters.get("restaurant")
+                )
+                truths.append([hit.id for hit in hits])
+            else:
+                truths.append(exact_ids(collection, index_name, vector, max_k, filter_doc))
+
+        for k in args.k:
+            for multiplier in sorted(args.multipliers):
+                num_candidates = min(max(round(k * multiplier), k), MAX_NUM_CANDIDATES)
+                recalls, latencies = [], []
+                for vector, truth in zip(vectors, truths):
+                    expected = set(truth[:k])
+                    ids, elapsed_ms = approximate_ids(collection, index_name, vector, k, num_candidates, filter_doc)
+                    latencies.append(elapsed_ms)
+                    recalls.append(len(expected.intersection(ids)) / len(expected) if expected else 1.0)
+                row = {
+                    "scenario": scenario["name"],
+                    "selectivity": selectivity,
+                    "estimatedSelectivity": scenario["estimatedSelectivity"],
+                    "k": k,
+                    "multiplier": multiplier,
+                    "numCandidates": num_candidates,
+                    "recall": sum(recalls) / len(recalls) if recalls else 1.0,
+                    "p50Ms": percentile(latencies, 50),
+                    "p95Ms": percentile(latencies, 95),
+                }
+                rows.append(row)
+                logger.info(
+                    "%-28s sel=%.4f k=%-3d numCandidates=%-5d recall=%.3f p50=%.1fms p95=%.1fms",
+                    row["scenario"],
+                    selectivity,
+                    k,
+                    num_candidates,
+                    row["recall"],
+                    row["p50Ms"],
+                    row["p95Ms"],
+                )
+    return rows
+
+
+def derive_rules(rows: List[Dict[str, Any]], target_recall: float) -> List[Dict[str, Any]]:
+    """Smallest multiplier per selectivity bucket whose worst (scenario, k) recall reaches the target.
+
+    Buckets without measurements inherit from the nearest more selective
+    measured bucket (buckets below the first measured one copy it).
+    """
+    multipliers: List[Optional[float]] = []
+    lower = 0.0
+    for upper in SELECTIVITY_BUCKETS:
+        bucket = [row for row in rows if lower < row["selectivity"] <= upper]
+        lower = upper
+        if not bucket:
+            multipliers.append(None)
+            continue
+        chosen = max(row["multiplier"] for row in bucket)
+        for multiplier in sorted({row["multiplier"] for row in bucket}):
+            worst = min(row["recall"] for row in bucket if row["multiplier"] == multiplier)
+            if worst >= target_recall:
+                chosen = multiplier
+                break
+        multipliers.append(chosen)
+
+    measured = [value for value in multipliers if value is not None]
+    if not measured:
+        return []
+    previous = measured[0]
+    rules = []
+    for upper, multiplier in zip(SELECTIVITY_BUCKETS, multipliers):
+        previous = multiplier if multiplier is not None else previous
+        rules.append({"maxSelectivity": upper, "multiplier": previous})
+    return rules
+
+
+def main() -> None:
+    args = parse_args()
+    settings = load_settings(collection=True, embedding=True)
+    index_name = os.getenv("VECTOR_INDEX_NAME") or os.getenv("ATLAS_SEARCH_INDEX") or "products_vector_index"
+    similarity = os.getenv("VECTOR_INDEX_SIMILARITY", "cosine")
+    logger = get_logger("evaluate-candidates")
+
+    embedding_client = create_embedding_client(settings["provider"], settings["api_key"], settings["dimensions"])
+    mongo_client = connect(settings)
+    try:
+        db = mongo_client[settings["db_name"]]
+        collection = db[settings["collection_name"]]
+        index_name = load_active_indexes(db, collection.name).get("vector") or index_name
+        local_index = (
+            LocalVectorIndex.from_path(args.snapshot, similarity) if args.ground_truth == "local" else None
+        )
+
+        stats = collect_selectivity_stats(collection)
+        # The snapshot has no countryCode column, so country filters need exact $vectorSearch.
+        scenarios = build_scenarios(stats, args.per_field, with_country=local_index is None)
+        queries = load_queries(args, collection)
+        if not queries:
+            raise RuntimeError("No queries to evaluate.")
+        logger.info(
+            "Evaluating %d queries x %d filter scenarios on index '%s' (ground truth: %s).",
+            len(queries),
+            len(scenarios),
+            index_name,
+            args.ground_truth,
+        )
+        vectors = embed_queries(embedding_client, settings["text_model"], queries)
+
+        rows = evaluate(collection, index_name, vectors, scenarios, args, local_index, logger)
+        rules = derive_rules(rows, args.target_recall)
+        if not rules:
+            raise RuntimeError("No measurements were collected; the policy was not written.")
+
+        save_policy(
+            args.output,
+            {
+                "version": POLICY_VERSION,
+                "generatedAt": datetime.now(timezone.utc).isoformat(),
+                "index": index_name,
+                "groundTruth": args.ground_truth,
+                "queries": len(queries),
+                "targetRecall": args.target_recall,
+                "minimum": 0,
+                "maximum": MAX_NUM_CANDIDATES,
+                "rules": rules,
+                "selectivity": stats,
+                "measurements": rows,
+            },
+        )
+        for rule in rules:
+            logger.info("selectivity <= %.2f -> numCandidates = limit * %g", rule["maxSelectivity"], rule["multiplier"])
+        logger.info("Wrote candidate policy to '%s'.", args.output)
+    finally:
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    main()
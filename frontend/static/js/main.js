@@ -6,10 +6,13 @@ document.addEventListener("DOMContentLoaded", () => {
   const restaurantSelect = document.getElementById("restaurantSelect");
   const searchForm = document.getElementById("searchForm");
   const titleInput = document.getElementById("titleInput");
+  const titleSuggestions = document.getElementById("titleSuggestions");
   const descriptionInput = document.getElementById("descriptionInput");
   const searchModeRadios = document.querySelectorAll('input[name="searchMode"]');
   const resultsSection = document.getElementById("results");
   const resultsList = document.getElementById("resultsList");
+  const facetSummary = document.getElementById("facetSummary");
+  const facetsCheckbox = document.getElementById("facetsCheckbox");
 
   let priceEnabled = false;
 
@@ -57,6 +60,73 @@ document.addEventListener("DOMContentLoaded", () => {
       });
   }
 
+  if (titleInput && titleSuggestions) {
+    let debounceTimer = null;
+    let pendingRequest = null;
+
+    const clearSuggestions = () => {
+      titleSuggestions.innerHTML = "";
+    };
+
+    const fetchSuggestions = (prefix) => {
+      // Only the latest keystroke matters; drop the request still in flight.
+      if (pendingRequest) {
+        pendingRequest.abort();
+      }
+      pendingRequest = new AbortController();
+
+      fetch(`/api/autocomplete?q=${encodeURIComponent(prefix)}&limit=8`, {
+        signal: pendingRequest.signal,
+      })
+        .then((response) => (response.ok ? response.json() : { suggestions: [] }))
+        .then((data) => {
+          clearSuggestions();
+          (data.suggestions ?? []).forEach((suggestion) => {
+            const option = document.createElement("option");
+            option.value = suggestion;
+            titleSuggestions.appendChild(option);
+          });
+        })
+        .catch((error) => {
+          if (error.name !== "AbortError") {
+            console.error(error);
+          }
+        });
+    };
+
+    titleInput.addEventListener("input", () => {
+      const prefix = titleInput.value.trim();
+      clearTimeout(debounceTimer);
+      if (prefix.length < 2) {
+        if (pendingRequest) {
+          pendingRequest.abort();
+        }
+        clearSuggestions();
+        return;
+      }
+      debounceTimer = setTimeout(() => fetchSuggestions(prefix), 150);
+    });
+  }
+
+  const renderFacets = (facets) => {
+    if (!facetSummary) {
+      return;
+    }
+    if (!facets || !facets.pool) {
+      facetSummary.textContent = "";
+      facetSummary.classList.add("hidden");
+      return;
+    }
+    const restaurants = (facets.restaurants ?? [])
+      .slice(0, 5)
+      .map((entry) => `${entry.value ?? "Sin restaurante"} (${entry.count})`);
+    const available = (facets.availability ?? []).find((entry) => entry.value === true)?.count ?? 0;
+    facetSummary.textContent =
+      `${available} disponibles entre los primeros ${facets.pool} resultados` +
+      (restaurants.length ? ` · ${restaurants.join(", ")}` : "");
+    facetSummary.classList.remove("hidden");
+  };
+
   const renderResults = (items, mode, message) => {
     if (!resultsSection || !resultsList) {
       return;
@@ -190,8 +260,14 @@ document.addEventListener("DOMContentLoaded", () => {
       const payload = {
         mode: selectedMode,
         limit: 5,
+        profile: "card",
       };
 
+      // Facets cost an extra $facet stage over a larger candidate pool, so only ask when shown.
+      if (facetsCheckbox?.checked) {
+        payload.facets = true;
+      }
+
       if (selectedMode === "vector" || selectedMode === "hybrid") {
         payload.description = descriptionValue;
       }
@@ -227,10 +303,12 @@ document.addEventListener("DOMContentLoaded", () => {
           return response.json();
         })
         .then((data) => {
+          renderFacets(data.facets);
           renderResults(data.results ?? [], data.mode ?? selectedMode);
         })
         .catch((error) => {
           console.error(error);
+          renderFacets(null);
           renderResults([], selectedMode, error.message);
         });
     });
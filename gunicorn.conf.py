@@ -0,0 +1,36 @@
+"""Production settings for ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+Workers are forked before the app is imported (``preload_app = False``), so
+every worker opens its own MongoDB pool and embedding client and maps the
+local index itself; nothing network-bound is shared across a fork. Each
+worker warms up before it starts accepting requests.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# Searches mostly wait on Voyage and MongoDB, so threads keep a worker busy.
+# There are more threads than the admission limits (backend/admission.py) so
+# overload is shed with a 429 instead of waiting unseen in the socket backlog.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "48"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = False
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+
+def post_worker_init(worker):
+    from backend.warmup import start_warm_up
+
+    start_warm_up(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from backend.warmup import shutdown
+
+    shutdown(worker.wsgi)
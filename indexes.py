@@ -1,17 +1,27 @@
 import argparse
 import os
-from typing import Any, Dict
-
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from pymongo.errors import OperationFailure
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
 
 from utils.logger import get_logger
+from utils.search_config import (
+    PARTITION_FIELDS,
+    load_active_indexes,
+    load_partitions,
+    partition_collection_name,
+    partition_entries,
+    partition_index_name,
+    save_active_indexes,
+    save_partitions,
+)
+from utils.settings import connect, load_env, load_settings
 
 # Initialize module-level logger.
 logger = get_logger("indexes")
 
 def parse_args() -> argparse.Namespace:
+    load_env()
     parser = argparse.ArgumentParser(description="Create MongoDB search & vector indexes for the product detail collection.")
     parser.add_argument(
         "--num-dimensions",
@@ -35,23 +45,66 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Drop the existing index with the same name before creating a new one.",
     )
-    return parser.parse_args()
-
-
-def load_settings() -> Dict[str, str]:
-    load_dotenv()
-    mongo_uri = os.getenv("MONGODB_URI")
-    db_name = os.getenv("DB_NAME")
-    collection_name = os.getenv("PRODUCT_DETAIL_COLLECTION") or os.getenv("COLLECTION_NAME")
-
-    missing = [name for name, value in [("MONGODB_URI", mongo_uri), ("DB_NAME", db_name), ("COLLECTION_NAME", collection_name)] if not value]
-    if missing:
-        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
-
-    return {"mongo_uri": mongo_uri, "db_name": db_name, "collection_name": collection_name}
+    parser.add_argument(
+        "--text-name",
+        default=os.getenv("FULL_TEXT_INDEX_NAME", "full-text-search"),
+        help="Name of the full-text search index to create.",
+    )
+    parser.add_argument(
+        "--partition-by",
+        choices=sorted(PARTITION_FIELDS),
+        help="Materialize one collection per distinct value of this field, index each one and "
+        "register the partitions so the API routes scoped searches to them. Partitions are copies: "
+        "after embed.py or transform-seed.py writes, run --refresh-partitions or they serve stale data.",
+    )
+    parser.add_argument(
+        "--refresh-partitions",
+        action="store_true",
+        help="Re-copy the collection into its registered partitions without touching any index, "
+        "so routed searches see new embeddings, prices and availability.",
+    )
+    parser.add_argument(
+        "--max-partitions",
+        type=int,
+        default=64,
+        help="Refuse --partition-by when the field has more distinct values than this (default: 64); "
+        "every partition costs a collection, two search indexes and a leg of each unscoped search.",
+    )
+    parser.add_argument(
+        "--blue-green",
+        action="store_true",
+        help="Build new versioned indexes next to the live ones, switch the API to them once they are "
+        "queryable and only then drop the previous indexes.",
+    )
+    parser.add_argument(
+        "--build-timeout",
+        type=float,
+        default=3600,
+        help="Seconds to wait for blue/green indexes to become queryable.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=15,
+        help="Seconds between index status checks during a blue/green build.",
+    )
+    parser.add_argument(
+        "--drain-seconds",
+        type=float,
+        default=float(os.getenv("SEARCH_CONFIG_TTL", "30")),
+        help="Seconds to keep the previous indexes after the switch so every API worker picks it up.",
+    )
+    args = parser.parse_args()
+    if args.blue_green and args.replace:
+        parser.error("--blue-green and --replace are mutually exclusive.")
+    if args.refresh_partitions and (args.partition_by or args.blue_green or args.replace):
+        parser.error("--refresh-partitions only copies data; it cannot be combined with index builds.")
+    return args
 
 
-def build_index_definitions(name: str, num_dimensions: int, similarity: str) -> list[Dict[str, Any]]:
+def build_index_definitions(
+    name: str, num_dimensions: int, similarity: str, text_name: str = "full-text-search"
+) -> list[Dict[str, Any]]:
     vector_index = {
         "name": name,
         "type": "vectorSearch",
@@ -66,20 +119,29 @@ def build_index_definitions(name: str, num_dimensions: int, similarity: str) ->
                 {"type": "filter", "path": "product.available"},
                 {"type": "filter", "path": "product.price.amount"},
                 {"type": "filter", "path": "restaurantName"},
+                {"type": "filter", "path": "countryCode"},
             ]
         },
     }
 
     full_text_index = {
-        "name": "full-text-search",
+        "name": text_name,
         "type": "search",
         "definition": {
             "mappings": {
                 "dynamic": False,
                 "fields": {
-                    "title": {
-                        "type": "string",
-                    }
+                    # Indexed twice: as text for $search and as edge grams for /api/autocomplete.
+                    "title": [
+                        {"type": "string"},
+                        {
+                            "type": "autocomplete",
+                            "tokenization": "edgeGram",
+                            "minGrams": 2,
+                            "maxGrams": 15,
+                            "foldDiacritics": True,
+                        },
+                    ]
                 },
             }
         },
@@ -88,35 +150,289 @@ def build_index_definitions(name: str, num_dimensions: int, similarity: str) ->
     return [vector_index, full_text_index]
 
 
+def drop_search_index(collection, index_name: str) -> None:
+    from pymongo.errors import OperationFailure
+
+    try:
+        collection.drop_search_index(index_name)
+        logger.info("Dropped existing index '%s'.", index_name)
+    except OperationFailure as exc:
+        if exc.code == 27 or "index not found" in str(exc).lower():
+            logger.info("No existing index named '%s' to drop.", index_name)
+        else:
+            raise
+
+
+def create_indexes(collection, index_definitions: List[Dict[str, Any]], replace: bool) -> None:
+    for definition in index_definitions:
+        index_name = definition["name"]
+
+        if replace:
+            drop_search_index(collection, index_name)
+
+        result = collection.create_search_index(definition)
+        logger.info("Created search index '%s' on '%s'. Response: %s", index_name, collection.name, result)
+
+
+def materialize_partition(collection, match: Dict[str, Any], target: str) -> int:
+    """Copy the documents matching ``match`` into ``target`` and drop the ones that left it.
+
+    ``$merge`` keeps the target collection (and its search indexes) in place,
+    unlike ``$out`` which would replace it.
+    """
+    refreshed_at = datetime.now(timezone.utc)
+    collection.aggregate(
+        [
+            {"$match": match},
+            {"$set": {"partitionRefreshedAt": refreshed_at}},
+            {"$merge": {"into": target, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ],
+        allowDiskUse=True,
+    )
+    partition = collection.database[target]
+    removed = partition.delete_many({"partitionRefreshedAt": {"$lt": refreshed_at}}).deleted_count
+    logger.info("Materialized partition %s into '%s' (%d stale documents removed).", match, target, removed)
+    return partition.estimated_document_count()
+
+
+def unassigned_match(field: str) -> Dict[str, Any]:
+    """Documents whose ``field`` is missing, null or empty: the catch-all partition."""
+    return {field: {"$in": [None, ""]}}
+
+
+def versioned_name(name: str, version: Optional[str]) -> str:
+    return f"{name}-{version}" if version else name
+
+
+def wait_until_queryable(collection, names: Iterable[str], timeout: float, interval: float) -> None:
+    """Poll ``list_search_indexes`` until every index in ``names`` reports ``queryable``."""
+    pending = set(names)
+    deadline = time.monotonic() + timeout
+    while pending:
+        for name in sorted(pending):
+            status = next(iter(collection.list_search_indexes(name)), None) or {}
+            if status.get("status") == "FAILED":
+                raise RuntimeError(f"Search index '{name}' on '{collection.name}' failed to build.")
+            if status.get("queryable"):
+                logger.info("Index '%s' on '%s' is queryable.", name, collection.name)
+                pending.discard(name)
+        if not pending:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Indexes {sorted(pending)} on '{collection.name}' not queryable after {timeout:.0f}s.")
+        logger.info("Waiting for %d indexes on '%s' to become queryable.", len(pending), collection.name)
+        time.sleep(interval)
+
+
+def create_partitions(
+    collection,
+    field: str,
+    name: str,
+    text_name: str,
+    num_dimensions: int,
+    similarity: str,
+    replace: bool,
+    max_partitions: int,
+    version: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Materialize and index one collection per value of ``field``, plus a catch-all for documents without one.
+
+    Returns ``{"partitions": {value: entry}, "unassigned": entry or None}``. Unscoped
+    searches fan out to the catch-all too, so products with a missing or empty
+    ``field`` stay searchable; it is only built when such products exist.
+    """
+    values = sorted(value for value in collection.distinct(field) if value not in (None, ""))
+    if len(values) > max_partitions:
+        raise ValueError(
+            f"'{field}' has {len(values)} distinct values, more than --max-partitions ({max_partitions}); "
+            "partition by a lower-cardinality field."
+        )
+    targets: Dict[str, Any] = {}
+    for value in values:
+        # A versioned build materializes into fresh collections so the live ones stay untouched.
+        target = versioned_name(partition_collection_name(collection.name, value), version)
+        if target in targets:
+            raise RuntimeError(f"Partition values {targets[target]!r} and {value!r} map to the same name '{target}'.")
+        targets[target] = value
+    unassigned_count = collection.count_documents(unassigned_match(field))
+    if unassigned_count:
+        logger.info("%d documents have no %s; they go to the catch-all partition.", unassigned_count, field)
+        targets[versioned_name(partition_collection_name(collection.name, None), version)] = None
+
+    partitions: Dict[str, Dict[str, str]] = {}
+    unassigned: Optional[Dict[str, str]] = None
+    for target, value in targets.items():
+        materialize_partition(collection, {field: value} if value is not None else unassigned_match(field), target)
+        entry = {
+            "collection": target,
+            "vectorIndex": versioned_name(partition_index_name(name, value), version),
+            "textIndex": versioned_name(partition_index_name(text_name, value), version),
+        }
+        create_indexes(
+            collection.database[target],
+            build_index_definitions(entry["vectorIndex"], num_dimensions, similarity, entry["textIndex"]),
+            replace,
+        )
+        if value is None:
+            unassigned = entry
+        else:
+            partitions[str(value)] = entry
+    return {"partitions": partitions, "unassigned": unassigned}
+
+
+def drop_stale_partitions(db, previous: Dict[str, Any], registry: Dict[str, Any]) -> None:
+    """Drop the collections of ``previous`` registry entries that ``registry`` no longer uses.
+
+    That covers values that disappeared from the source and, after a
+    blue/green build, every collection of the previous version; dropping a
+    collection drops its search indexes with it.
+    """
+    live = {entry["collection"] for entry in partition_entries(registry)}
+    for entry in partition_entries(previous):
+        if entry.get("collection") and entry["collection"] not in live:
+            db.drop_collection(entry["collection"])
+            logger.info("Dropped partition collection '%s'.", entry["collection"])
+
+
+def refresh_partitions(db, collection) -> int:
+    """Re-merge ``collection`` into the partitions registered for it; returns how many were refreshed.
+
+    Values that appeared since the last ``--partition-by`` have no partition
+    yet, so they are only reported: unscoped searches miss them until then.
+    """
+    registry = load_partitions(db, collection.name)
+    field = registry.get("field")
+    if not field:
+        raise RuntimeError(f"'{collection.name}' has no registered partitions; run --partition-by first.")
+    partitions = registry.get("partitions") or {}
+    for value, entry in sorted(partitions.items()):
+        materialize_partition(collection, {field: value}, entry["collection"])
+    if registry.get("unassigned"):
+        materialize_partition(collection, unassigned_match(field), registry["unassigned"]["collection"])
+
+    unregistered = sorted(
+        str(value) for value in collection.distinct(field) if value not in (None, "") and str(value) not in partitions
+    )
+    if not registry.get("unassigned") and collection.count_documents(unassigned_match(field)):
+        unregistered.append("<missing>")
+    if unregistered:
+        logger.warning(
+            "%s values without a partition: %s; run --partition-by %s again to include them.",
+            field,
+            ", ".join(unregistered),
+            field,
+        )
+    return len(partition_entries(registry))
+
+
+def blue_green_rebuild(db, collection, args: argparse.Namespace, num_dimensions: int) -> None:
+    """Build versioned indexes, switch ``search_config`` to them and drop the previous ones.
+
+    The API keeps querying the old indexes until the switch document is
+    written, so searches never hit an index that is still building. Partitions
+    are materialized into versioned collections, so the previous version keeps
+    serving its own copy of the data until it is dropped after the switch.
+    """
+    version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    vector_name = versioned_name(args.name, version)
+    text_name = versioned_name(args.text_name, version)
+    previous = load_active_indexes(db, collection.name)
+    old_names = {previous.get("vector", args.name), previous.get("text", args.text_name)}
+    previous_partitions = load_partitions(db, collection.name) if args.partition_by else {}
+
+    started = time.monotonic()
+    create_indexes(collection, build_index_definitions(vector_name, num_dimensions, args.similarity, text_name), False)
+    registry: Dict[str, Any] = {}
+    if args.partition_by:
+        registry = create_partitions(
+            collection,
+            args.partition_by,
+            args.name,
+            args.text_name,
+            num_dimensions,
+            args.similarity,
+            False,
+            args.max_partitions,
+            version,
+        )
+
+    wait_until_queryable(collection, [vector_name, text_name], args.build_timeout, args.poll_interval)
+    for entry in partition_entries(registry):
+        wait_until_queryable(
+            db[entry["collection"]], [entry["vectorIndex"], entry["textIndex"]], args.build_timeout, args.poll_interval
+        )
+    build_seconds = round(time.monotonic() - started, 1)
+
+    save_active_indexes(
+        db,
+        collection.name,
+        vector_name,
+        text_name,
+        version=version,
+        previous={"vector": previous.get("vector", args.name), "text": previous.get("text", args.text_name)},
+        buildSeconds=build_seconds,
+    )
+    if args.partition_by:
+        save_partitions(db, collection.name, args.partition_by, registry["partitions"], registry["unassigned"])
+    logger.info("Switched '%s' to indexes '%s' / '%s' after %.1fs.", collection.name, vector_name, text_name, build_seconds)
+
+    if args.drain_seconds > 0:
+        logger.info("Keeping the previous indexes for %.0fs while API workers refresh.", args.drain_seconds)
+        time.sleep(args.drain_seconds)
+    for old_name in sorted(old_names - {vector_name, text_name}):
+        drop_search_index(collection, old_name)
+    drop_stale_partitions(db, previous_partitions, registry)
+
+
 def main() -> None:
     args = parse_args()
-    settings = load_settings()
+    settings = load_settings(collection=True)
+
+    if args.refresh_partitions:
+        client = connect(settings)
+        try:
+            db = client[settings["db_name"]]
+            refreshed = refresh_partitions(db, db[settings["collection_name"]])
+            logger.info("Refreshed %d partitions of '%s'.", refreshed, settings["collection_name"])
+        finally:
+            client.close()
+        return
 
     num_dimensions = args.num_dimensions if args.num_dimensions is not None else 0
     if num_dimensions <= 0:
         raise ValueError("numDimensions must be a positive integer.")
 
-    index_definitions = build_index_definitions(args.name, num_dimensions, args.similarity)
+    index_definitions = build_index_definitions(args.name, num_dimensions, args.similarity, args.text_name)
 
-    client = MongoClient(settings["mongo_uri"])
+    client = connect(settings)
     try:
-        collection = client[settings["db_name"]][settings["collection_name"]]
-
-        for definition in index_definitions:
-            index_name = definition["name"]
-
-            if args.replace:
-                try:
-                    collection.drop_search_index(index_name)
-                    logger.info("Dropped existing index '%s'.", index_name)
-                except OperationFailure as exc:
-                    if exc.code == 27 or "index not found" in str(exc).lower():
-                        logger.info("No existing index named '%s' to drop.", index_name)
-                    else:
-                        raise
-
-            result = collection.create_search_index(definition)
-            logger.info("Created search index '%s'. Response: %s", index_name, result)
+        db = client[settings["db_name"]]
+        collection = db[settings["collection_name"]]
+        if args.blue_green:
+            blue_green_rebuild(db, collection, args, num_dimensions)
+            return
+        create_indexes(collection, index_definitions, args.replace)
+
+        if args.partition_by:
+            registry = create_partitions(
+                collection,
+                args.partition_by,
+                args.name,
+                args.text_name,
+                num_dimensions,
+                args.similarity,
+                args.replace,
+                args.max_partitions,
+            )
+            previous_partitions = load_partitions(db, collection.name)
+            save_partitions(db, collection.name, args.partition_by, registry["partitions"], registry["unassigned"])
+            logger.info(
+                "Registered %d partitions of '%s' by %s.",
+                len(partition_entries(registry)),
+                collection.name,
+                args.partition_by,
+            )
+            drop_stale_partitions(db, previous_partitions, registry)
     finally:
         client.close()
 
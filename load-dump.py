@@ -0,0 +1,130 @@
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import List, Set
+
+from utils.catalog import iter_product_documents
+from utils.dump import iter_dump_batches, open_dump
+from utils.logger import get_logger
+from utils.settings import connect, load_env, load_settings
+
+
+def parse_args() -> argparse.Namespace:
+    load_env()
+    parser = argparse.ArgumentParser(
+        description="Stream a mongodump BSON archive (optionally gzipped) into a MongoDB collection."
+    )
+    parser.add_argument(
+        "--path",
+        default=os.path.join("dump", "catalog", "products.bson.gz"),
+        help="Path to the .bson or .bson.gz file to load (default: dump/catalog/products.bson.gz).",
+    )
+    parser.add_argument(
+        "--target",
+        default=os.getenv("COLLECTION_NAME", "products"),
+        help="Target collection (default: value of COLLECTION_NAME env var).",
+    )
+    parser.add_argument(
+        "--flatten",
+        action="store_true",
+        help="Unwind catalog products while loading, producing product_detail documents directly.",
+    )
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        help="Drop the target collection before loading.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Number of documents per insert_many call (default: 1000).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of insert batches kept in flight concurrently (default: 4).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only decode the archive and report throughput; nothing is written.",
+    )
+    return parser.parse_args()
+
+
+def flatten_batch(batch: List[dict]) -> List[dict]:
+    return [product for document in batch for product in iter_product_documents(document)]
+
+
+def insert_batch(collection, documents: List[dict]) -> int:
+    return len(collection.insert_many(documents, ordered=False).inserted_ids)
+
+
+def main() -> None:
+    args = parse_args()
+    logger = get_logger("load-dump")
+
+    collection = None
+    client = None
+    if not args.dry_run:
+        settings = load_settings()
+        client = connect(settings, maxPoolSize=max(args.workers, 1) + 1)
+        collection = client[settings["db_name"]][args.target]
+        if args.drop:
+            collection.drop()
+            logger.info("Dropped target collection '%s'.", args.target)
+
+    total_bytes = os.path.getsize(args.path)
+    reader = open_dump(args.path)
+    started = time.perf_counter()
+    decoded = 0
+    loaded = 0
+
+    def report() -> None:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        logger.info(
+            "Read %.1f/%.1f MB, decoded %d documents, loaded %d (%.0f docs/s, %.1f MB/s).",
+            reader.bytes_read / 1e6,
+            total_bytes / 1e6,
+            decoded,
+            loaded,
+            loaded / elapsed if collection is not None else decoded / elapsed,
+            reader.bytes_read / 1e6 / elapsed,
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            pending: Set[Future] = set()
+            for batch in iter_dump_batches(reader, args.path.endswith(".gz"), args.batch_size):
+                decoded += len(batch)
+                documents = flatten_batch(batch) if args.flatten else batch
+                if collection is not None and documents:
+                    # Bound the in-flight batches so decoding cannot outrun the inserts.
+                    if len(pending) >= args.workers * 2:
+                        wait(pending, return_when=FIRST_COMPLETED)
+                    done = {future for future in pending if future.done()}
+                    loaded += sum(future.result() for future in done)
+                    pending -= done
+                    pending.add(executor.submit(insert_batch, collection, documents))
+                report()
+
+            for future in pending:
+                loaded += future.result()
+        report()
+        logger.info(
+            "Finished loading '%s' into '%s' in %.2fs.",
+            args.path,
+            args.target if collection is not None else "(dry run)",
+            time.perf_counter() - started,
+        )
+    finally:
+        reader.close()
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
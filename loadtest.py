@@ -0,0 +1,256 @@
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import get_logger
+from utils.metrics import latency_summary
+
+SEARCH_PATH = "/api/search"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay recorded /api/search payloads and report latency, errors and throughput per mode."
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="JSONL file with one {request_id, title, body} line per search (see SEARCH_RECORD_PATH).",
+    )
+    parser.add_argument(
+        "--url",
+        help="Base URL of a running app (e.g. http://localhost:5000). Without it the Flask test client is used.",
+    )
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--qps", type=float, help="Open-loop mode: send this many requests per second.")
+    load.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Closed-loop mode: number of clients sending back to back (default: 4).",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        help="Total requests to send, cycling through the recording (default: each recorded payload once).",
+    )
+    parser.add_argument("--duration", type=float, help="Stop sending after this many seconds.")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds for --url.")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=256,
+        help="Open-loop mode: cap on outstanding requests (default: 256).",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file as well.")
+    return parser.parse_args()
+
+
+def load_payloads(path: str, logger) -> List[Dict[str, Any]]:
+    payloads: List[Dict[str, Any]] = []
+    skipped = 0
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                body = json.loads(line).get("body")
+            except (json.JSONDecodeError, AttributeError):
+                body = None
+            if isinstance(body, dict):
+                payloads.append(body)
+            else:
+                skipped += 1
+    if skipped:
+        logger.warning("Skipped %d lines without a JSON object body.", skipped)
+    return payloads
+
+
+def http_sender(base_url: str, timeout: float) -> Callable[[Dict[str, Any]], int]:
+    url = base_url.rstrip("/") + SEARCH_PATH
+
+    def send(payload: Dict[str, Any]) -> int:
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    return send
+
+
+def test_client_sender() -> Callable[[Dict[str, Any]], int]:
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+
+    def send(payload: Dict[str, Any]) -> int:
+        return client.post(SEARCH_PATH, json=payload).status_code
+
+    return send
+
+
+class Recorder:
+    """Thread-safe collection of ``(mode, latency_ms, status)`` samples."""
+
+    def __init__(self):
+        self.samples: List[Tuple[str, float, Optional[int]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, mode: str, latency_ms: float, status: Optional[int]) -> None:
+        with self._lock:
+            self.samples.append((mode, latency_ms, status))
+
+
+def payload_mode(payload: Dict[str, Any]) -> str:
+    return str(payload.get("mode") or "vector").lower()
+
+
+def timed_send(send, payload: Dict[str, Any], started: float, recorder: Recorder, logger) -> None:
+    status: Optional[int]
+    try:
+        status = send(payload)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.debug("Request failed: %s", exc)
+        status = None
+    recorder.add(payload_mode(payload), (time.perf_counter() - started) * 1000, status)
+
+
+def schedule(payloads: List[Dict[str, Any]], total: Optional[int]) -> Iterator[Dict[str, Any]]:
+    stream = itertools.cycle(payloads) if total and total > len(payloads) else iter(payloads)
+    return itertools.islice(stream, total) if total else stream
+
+
+def run_open_loop(send, payloads, args, recorder: Recorder, logger) -> None:
+    """Send at a fixed rate regardless of response times.
+
+    Latency is measured from each request's scheduled time, so queueing
+    behind slow responses shows up in the percentiles instead of lowering
+    the offered load.
+    """
+    interval = 1.0 / args.qps
+    slots = threading.BoundedSemaphore(args.max_in_flight)
+    start = time.perf_counter()
+
+    def release_after(payload, scheduled):
+        try:
+            timed_send(send, payload, scheduled, recorder, logger)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+        for position, payload in enumerate(schedule(payloads, args.requests)):
+            scheduled = start + position * interval
+            if args.duration and scheduled - start >= args.duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not slots.acquire(blocking=False):
+                recorder.add(payload_mode(payload), 0.0, None)  # dropped: too many requests in flight
+                continue
+            executor.submit(release_after, payload, scheduled)
+
+
+def run_closed_loop(send, payloads, args, recorder: Recorder, logger) -> None:
+    stream = schedule(payloads, args.requests)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    def client():
+        while deadline is None or time.perf_counter() < deadline:
+            with lock:
+                payload = next(stream, None)
+            if payload is None:
+                return
+            timed_send(send, payload, time.perf_counter(), recorder, logger)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(max(1, args.concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def build_report(recorder: Recorder, elapsed: float, load: Dict[str, Any]) -> Dict[str, Any]:
+    by_mode: Dict[str, List[Tuple[float, Optional[int]]]] = {}
+    for mode, latency_ms, status in recorder.samples:
+        by_mode.setdefault(mode, []).append((latency_ms, status))
+    by_mode["all"] = [(latency_ms, status) for _, latency_ms, status in recorder.samples]
+
+    modes: Dict[str, Any] = {}
+    for mode, samples in sorted(by_mode.items()):
+        succeeded = [latency_ms for latency_ms, status in samples if status is not None and status < 400]
+        statuses: Dict[str, int] = {}
+        for _, status in samples:
+            key = str(status) if status is not None else "failed"
+            statuses[key] = statuses.get(key, 0) + 1
+        modes[mode] = {
+            "requests": len(samples),
+            "errorRate": 1 - len(succeeded) / len(samples) if samples else 0.0,
+            "throughput": len(samples) / elapsed if elapsed else 0.0,
+            "statuses": statuses,
+            **latency_summary(succeeded),
+        }
+    return {"load": load, "elapsedSeconds": elapsed, "modes": modes}
+
+
+def main() -> None:
+    args = parse_args()
+    logger = get_logger("loadtest")
+
+    payloads = load_payloads(args.input, logger)
+    if not payloads:
+        raise RuntimeError(f"No replayable payloads found in '{args.input}'.")
+
+    send = http_sender(args.url, args.timeout) if args.url else test_client_sender()
+    load = {"qps": args.qps} if args.qps else {"concurrency": args.concurrency}
+    logger.info(
+        "Replaying %d recorded payloads against %s (%s).",
+        len(payloads),
+        args.url or "the Flask test client",
+        ", ".join(f"{key}={value}" for key, value in load.items()),
+    )
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    if args.qps:
+        run_open_loop(send, payloads, args, recorder, logger)
+    else:
+        run_closed_loop(send, payloads, args, recorder, logger)
+    report = build_report(recorder, time.perf_counter() - started, load)
+
+    for mode, stats in report["modes"].items():
+        logger.info(
+            "%-8s n=%-6d err=%.2f%% %.1f req/s p50=%.1fms p95=%.1fms p99=%.1fms",
+            mode,
+            stats["requests"],
+            stats["errorRate"] * 100,
+            stats["throughput"],
+            stats["p50Ms"],
+            stats["p95Ms"],
+            stats["p99Ms"],
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        logger.info("Wrote report to '%s'.", args.output)
+
+
+if __name__ == "__main__":
+    main()
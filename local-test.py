@@ -3,12 +3,19 @@ import json
 import os
 from typing import Any, Dict, List
 
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from voyageai import Client
+from utils.candidates import DEFAULT_POLICY, estimate_selectivity, load_policy, num_candidates_for
+from utils.embeddings import create_embedding_client, extract_embeddings
+from utils.settings import connect, load_env, load_settings
+
+LOCAL_TEST_POLICY: Dict[str, Any] = {
+    **DEFAULT_POLICY,
+    "minimum": 200,
+    "rules": [{"maxSelectivity": 1.0, "multiplier": 5}],
+}
 
 
 def parse_args() -> argparse.Namespace:
+    load_env()
     parser = argparse.ArgumentParser(description="Execute a local vector search against the products collection.")
     parser.add_argument("query", help="Query string to embed and search for (wrap in quotes when calling from the terminal).")
     parser.add_argument("--k", type=int, default=5, help="Number of results to return from the vector search.")
@@ -37,51 +44,6 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def load_settings() -> Dict[str, str]:
-    load_dotenv()
-    mongo_uri = os.getenv("MONGODB_URI")
-    db_name = os.getenv("DB_NAME")
-    collection_name = os.getenv("PRODUCT_DETAIL_COLLECTION")
-    api_key = os.getenv("VOYAGE_API_KEY")
-    text_model = os.getenv("VOYAGE_TEXT_MODEL", "voyage-3.5")
-    index_name = os.getenv("VECTOR_INDEX_NAME") or os.getenv("ATLAS_SEARCH_INDEX") or "products_vector_index"
-
-    missing = [
-        name
-        for name, value in [
-            ("MONGODB_URI", mongo_uri),
-            ("DB_NAME", db_name),
-            ("COLLECTION_NAME", collection_name),
-            ("VOYAGE_API_KEY", api_key),
-        ]
-        if not value
-    ]
-    if missing:
-        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
-
-    return {
-        "mongo_uri": mongo_uri,
-        "db_name": db_name,
-        "collection_name": collection_name,
-        "api_key": api_key,
-        "text_model": text_model,
-        "index_name": index_name,
-    }
-
-
-def extract_embeddings(response) -> List[List[float]]:
-    embeddings = getattr(response, "embeddings", None)
-    if embeddings is None:
-        raise ValueError("Voyage response did not contain embeddings.")
-    vectors: List[List[float]] = []
-    for item in embeddings:
-        if hasattr(item, "embedding"):
-            vectors.append(item.embedding)  # type: ignore[attr-defined]
-        else:
-            vectors.append(item)
-    return vectors
-
-
 def build_filter_clause(args: argparse.Namespace) -> Dict[str, Any]:
     clauses: List[Dict[str, Any]] = []
 
@@ -127,10 +89,11 @@ def build_filter_clause(args: argparse.Namespace) -> Dict[str, Any]:
 
 def main() -> None:
     args = parse_args()
-    settings = load_settings()
+    settings = load_settings(collection=True, embedding=True)
+    index_name = os.getenv("VECTOR_INDEX_NAME") or os.getenv("ATLAS_SEARCH_INDEX") or "products_vector_index"
 
-    client = Client(api_key=settings["api_key"])
-    mongo_client = MongoClient(settings["mongo_uri"])
+    client = create_embedding_client(settings["provider"], settings["api_key"], settings["dimensions"])
+    mongo_client = connect(settings)
 
     try:
         # Generate embedding for the incoming query.
@@ -142,13 +105,20 @@ def main() -> None:
 
         # Build the pipeline using the new Atlas Vector Search stage.
         filter_param = build_filter_clause(args)
+        policy_path = os.getenv("CANDIDATE_POLICY_PATH")
+        # Without a tuned policy keep this script's historical max(k * 5, 200), not the API's k * 20.
+        policy = load_policy(policy_path) if policy_path else LOCAL_TEST_POLICY
+        available = args.filter_available.lower() == "true" if args.filter_available is not None else None
+        selectivity = estimate_selectivity(
+            policy.get("selectivity") or {}, available=available, min_price=args.min_price, max_price=args.max_price
+        )
         vector_search_stage: Dict[str, Any] = {
             "$vectorSearch": {
-                "index": settings["index_name"],
+                "index": index_name,
                 "path": "emb_description",
                 "queryVector": query_vector,
                 "limit": args.k,
-                "numCandidates": max(args.k * 5, 200),
+                "numCandidates": num_candidates_for(policy, args.k, selectivity),
             }
         }
         if filter_param:
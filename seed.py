@@ -1,15 +1,22 @@
 import argparse
+import gzip
+import json
 import os
 import random
+import shutil
 import string
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Iterable
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
-from bson import ObjectId
+from bson import ObjectId, encode
 from dotenv import load_dotenv
 from faker import Faker
 from pymongo import MongoClient
 
+from utils.logger import get_logger
+from utils.partition import run_partitioned
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Seed a MongoDB collection with mock restaurant catalog data.")
@@ -24,23 +31,94 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Generate the documents but do not insert them. Useful for validation.",
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Number of documents generated and written per chunk (default: 1000).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes generating documents in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Base random seed. Worker N uses seed + N, so the same arguments produce the same content.",
+    )
+    parser.add_argument(
+        "--reference-date",
+        type=lambda value: datetime.fromisoformat(value).replace(tzinfo=timezone.utc),
+        help="Date the generated createdAt/updatedAt values are relative to (default: today, UTC). "
+        "Fix it together with --seed to reproduce a dataset on another day.",
+    )
+    parser.add_argument(
+        "--id-time",
+        type=int,
+        help="Unix time stamped into the generated ObjectIds (default: now). "
+        "Fix it together with --seed to reproduce the identifiers as well; "
+        "runs that share it and a seed generate the same ids.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Write mongorestore-compatible BSON files to this directory instead of inserting into MongoDB.",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Gzip the BSON output (restore with mongorestore --gzip).",
+    )
     return parser.parse_args()
 
 
-def load_settings() -> tuple[str, str, str]:
+def load_settings(require_uri: bool = True) -> tuple[str, str, str]:
     load_dotenv()
 
     mongo_uri = os.getenv("MONGODB_URI")
     db_name = os.getenv("DB_NAME")
     collection_name = os.getenv("COLLECTION_NAME")
 
-    missing = [name for name, value in [("MONGODB_URI", mongo_uri), ("DB_NAME", db_name), ("COLLECTION_NAME", collection_name)] if not value]
+    required = [("DB_NAME", db_name), ("COLLECTION_NAME", collection_name)]
+    if require_uri:
+        required.insert(0, ("MONGODB_URI", mongo_uri))
+    missing = [name for name, value in required if not value]
     if missing:
         raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
 
     return mongo_uri, db_name, collection_name
 
 
+class SeededObjectIds:
+    """ObjectIds laid out like the driver's: timestamp, 5-byte random field, 3-byte counter.
+
+    The random field and the counter's start come from the seeded RNG and the
+    timestamp from the run, so ids stay ordered by creation and two runs with
+    the same or overlapping seeds do not collide unless they share ``timestamp``.
+    """
+
+    def __init__(self, timestamp: int):
+        self._timestamp = timestamp
+        self._random = random.getrandbits(40).to_bytes(5, "big")
+        self._counter = random.getrandbits(24)
+
+    def next(self) -> ObjectId:
+        self._counter += 1
+        if self._counter > 0xFFFFFF:
+            # Like the driver after 2^24 ids: move on to the next second.
+            self._counter = 0
+            self._timestamp += 1
+        return ObjectId(self._timestamp.to_bytes(4, "big") + self._random + self._counter.to_bytes(3, "big"))
+
+
+_object_ids: Optional[SeededObjectIds] = None
+
+
+def new_object_id() -> ObjectId:
+    return _object_ids.next() if _object_ids is not None else ObjectId()
+
+
 def random_catalog_id(country_code: str, area_type: str) -> str:
     suffix = "".join(random.choices(string.digits, k=6))
     return f"{country_code}-{area_type}-{suffix}"
@@ -53,9 +131,9 @@ def random_title(faker: Faker) -> str:
     return f"{base} {descriptor} {period}"
 
 
-def random_image_url(folder: str) -> str:
+def random_image_url(folder: str, reference: Optional[datetime] = None) -> str:
     code = "".join(random.choices(string.ascii_uppercase + string.digits, k=7))
-    date_tag = datetime.utcnow().strftime("%d%m%Y")
+    date_tag = (reference or datetime.utcnow()).strftime("%d%m%Y")
     return f"https://d2umxhib5z7frz.cloudfront.net/Peru/{folder}_{code}_{date_tag}.png"
 
 
@@ -96,7 +174,7 @@ def random_sizes() -> list[dict]:
     return random.sample(sizes, k=random.randint(2, len(sizes)))
 
 
-def random_product(faker: Faker) -> dict:
+def random_product(faker: Faker, reference: Optional[datetime] = None) -> dict:
     product_templates = [
         ("Hamburguesa con Queso", "Hamburguesa de res con queso cheddar y pepinillos."),
         ("Sándwich de Pollo con Queso", "Hamburguesa de pollo crujiente con lechuga y mayonesa."),
@@ -117,7 +195,7 @@ def random_product(faker: Faker) -> dict:
         "id": "".join(random.choices(string.digits, k=5)),
         "name": name,
         "description": description,
-        "imageUrl": random_image_url("DLV"),
+        "imageUrl": random_image_url("DLV", reference),
         "price": {
             "amount": amount,
             "formatted": format_price(amount),
@@ -125,7 +203,7 @@ def random_product(faker: Faker) -> dict:
         "available": random.choice([True, False]),
         "areas": random.sample(areas, k=random.randint(1, len(areas))),
         "combo": random.choice([True, False]),
-        "_id": ObjectId(),
+        "_id": new_object_id(),
     }
     if random.random() < 0.6:
         product["sizes"] = random_sizes()
@@ -134,12 +212,12 @@ def random_product(faker: Faker) -> dict:
     return product
 
 
-def random_catalog(faker: Faker) -> dict:
+def random_catalog(faker: Faker, reference: Optional[datetime] = None) -> dict:
     country_options = [
         ("62f4a5554ce4bb3644827e11", "PE"),
-        (str(ObjectId()), "CL"),
-        (str(ObjectId()), "CO"),
-        (str(ObjectId()), "MX"),
+        (str(new_object_id()), "CL"),
+        (str(new_object_id()), "CO"),
+        (str(new_object_id()), "MX"),
     ]
     country_id, country_code = random.choice(country_options)
     area_codes = ["MOP", "AUT", "CURB", "EALM"]
@@ -149,23 +227,29 @@ def random_catalog(faker: Faker) -> dict:
 
     catalog_id = random_catalog_id(country_code, area_type)
 
-    created_at = faker.date_time_between(start_date="-2y", end_date="now", tzinfo=timezone.utc)
+    if reference is None:
+        created_at = faker.date_time_between(start_date="-2y", end_date="now", tzinfo=timezone.utc)
+    else:
+        created_at = faker.date_time_between(
+            start_date=reference - timedelta(days=730), end_date=reference, tzinfo=timezone.utc
+        )
     updated_at = created_at + timedelta(days=random.randint(0, 120), hours=random.randint(0, 12))
 
     restaurant_name = faker.city().upper()
     doc = {
+        "_id": new_object_id(),
         "id": catalog_id,
         "title": random_title(faker),
-        "imageUrl": random_image_url("category"),
+        "imageUrl": random_image_url("category", reference),
         "countryId": country_id,
         "countryCode": country_code,
         "areaCode": area_code,
         "areaType": area_type,
-        "restaurant": ObjectId(),
+        "restaurant": new_object_id(),
         "restaurantCode": "".join(random.choices(string.ascii_uppercase, k=3)),
         "restaurantName": restaurant_name,
         "availability": random_availability(),
-        "products": [random_product(faker) for _ in range(random.randint(3, 8))],
+        "products": [random_product(faker, reference) for _ in range(random.randint(3, 8))],
         "createdAt": created_at,
         "updatedAt": updated_at,
         "__v": 0,
@@ -182,39 +266,170 @@ def create_faker(locales: Iterable[str]) -> Faker:
     raise RuntimeError(f"None of the requested Faker locales are available: {', '.join(locales)}")
 
 
-def main() -> None:
-    args = parse_args()
-    mongo_uri, db_name, collection_name = load_settings()
-
-    requested_locale = "es_ES"
-    locale_preferences = []
+def locale_preferences(requested_locale: Optional[str] = "es_ES") -> List[str]:
+    preferences = []
     if requested_locale:
-        locale_preferences.append(requested_locale)
-    locale_preferences.extend(["es_ES", "es_MX", "es_US", "en_US"])
-    unique_locales = []
-    for loc in locale_preferences:
+        preferences.append(requested_locale)
+    preferences.extend(["es_ES", "es_MX", "es_US", "en_US"])
+    unique_locales: List[str] = []
+    for loc in preferences:
         if loc not in unique_locales:
             unique_locales.append(loc)
+    return unique_locales
+
+
+def iter_catalog_chunks(
+    faker: Faker, count: int, chunk_size: int, reference: Optional[datetime] = None
+) -> Iterator[List[dict]]:
+    """Yield ``count`` generated catalogs in chunks so memory stays bounded."""
+    remaining = count
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield [random_catalog(faker, reference) for _ in range(size)]
+        remaining -= size
+
+
+def part_path(output_dir: str, collection_name: str, index: int, compress: bool) -> str:
+    suffix = ".bson.gz" if compress else ".bson"
+    return os.path.join(output_dir, f"{collection_name}.part{index:03d}{suffix}")
+
+
+def generate_partition(
+    index: int,
+    count: int,
+    options: Dict[str, Any],
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, int]:
+    global _object_ids
+
+    seed = options["seed"] + index
+    random.seed(seed)
+    _object_ids = SeededObjectIds(options["id_time"])
+    faker = create_faker(locale_preferences())
+    Faker.seed(seed)
+
+    chunks = iter_catalog_chunks(faker, count, options["chunk_size"], options["reference"])
+    written = 0
+
+    if options["dry_run"]:
+        for chunk in chunks:
+            written += len(chunk)
+            if progress:
+                progress(len(chunk))
+        return {"documents": written}
+
+    if options["output_dir"]:
+        path = part_path(options["output_dir"], options["collection_name"], index, options["gzip"])
+        opener = gzip.open if options["gzip"] else open
+        with opener(path, "wb") as handle:
+            for chunk in chunks:
+                for document in chunk:
+                    handle.write(encode(document))
+                written += len(chunk)
+                if progress:
+                    progress(len(chunk))
+        return {"documents": written}
+
+    client = MongoClient(options["mongo_uri"])
+    try:
+        collection = client[options["db_name"]][options["collection_name"]]
+        for chunk in chunks:
+            collection.insert_many(chunk, ordered=False)
+            written += len(chunk)
+            if progress:
+                progress(len(chunk))
+    finally:
+        client.close()
+    return {"documents": written}
+
+
+def seed_partition(index: int, bounds: Dict[str, int], options: Dict[str, Any], progress) -> Dict[str, int]:
+    """Worker entry point for ``--workers``."""
+    return generate_partition(index, bounds["count"], options, progress.put)
+
+
+def write_dump_files(options: Dict[str, Any], parts: int) -> str:
+    """Concatenate per-worker parts into ``<output>/<db>/<collection>.bson`` plus metadata."""
+    database_dir = os.path.join(options["output_dir"], options["db_name"])
+    os.makedirs(database_dir, exist_ok=True)
+    suffix = ".bson.gz" if options["gzip"] else ".bson"
+    collection_name = options["collection_name"]
+    target = os.path.join(database_dir, f"{collection_name}{suffix}")
+
+    # BSON documents and gzip members can both be concatenated as-is.
+    with open(target, "wb") as output:
+        for index in range(parts):
+            path = part_path(options["output_dir"], collection_name, index, options["gzip"])
+            with open(path, "rb") as part:
+                shutil.copyfileobj(part, output)
+            os.remove(path)
+
+    metadata = {
+        "indexes": [{"v": 2, "key": {"_id": 1}, "name": "_id_"}],
+        "collectionName": collection_name,
+        "type": "collection",
+    }
+    metadata_path = os.path.join(database_dir, f"{collection_name}.metadata.json")
+    payload = json.dumps(metadata).encode("utf-8")
+    if options["gzip"]:
+        with gzip.open(f"{metadata_path}.gz", "wb") as handle:
+            handle.write(payload)
+    else:
+        with open(metadata_path, "wb") as handle:
+            handle.write(payload)
+    return target
 
-    faker = create_faker(unique_locales)
-    Faker.seed(random.randint(0, 999999))
 
-    documents = [random_catalog(faker) for _ in range(args.count)]
+def main() -> None:
+    args = parse_args()
+    live_insert = not (args.dry_run or args.output_dir)
+    mongo_uri, db_name, collection_name = load_settings(require_uri=live_insert)
+
+    workers = max(1, args.workers)
+    options: Dict[str, Any] = {
+        "mongo_uri": mongo_uri,
+        "db_name": db_name,
+        "collection_name": collection_name,
+        "seed": args.seed if args.seed is not None else random.randint(0, 999999),
+        "id_time": args.id_time if args.id_time is not None else int(time.time()),
+        "chunk_size": max(1, args.chunk_size),
+        "dry_run": args.dry_run,
+        "output_dir": args.output_dir,
+        "gzip": args.gzip,
+        "reference": args.reference_date
+        or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
+    }
 
-    if args.dry_run:
-        print(f"Generated {len(documents)} documents (dry run, nothing inserted).")
-        return
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
 
-    client = MongoClient(mongo_uri)
-    try:
-        collection = client[db_name][collection_name]
-        if args.drop:
-            collection.drop()
+    if live_insert and args.drop:
+        client = MongoClient(mongo_uri)
+        try:
+            client[db_name][collection_name].drop()
+        finally:
+            client.close()
+
+    counts = [args.count // workers + (1 if index < args.count % workers else 0) for index in range(workers)]
+    if workers == 1:
+        totals = generate_partition(0, counts[0], options)
+    else:
+        totals = run_partitioned(
+            seed_partition,
+            [{"count": count} for count in counts],
+            options,
+            get_logger("seed"),
+            "seed",
+        )
+    generated = totals.get("documents", 0)
 
-        result = collection.insert_many(documents)
-        print(f"Inserted {len(result.inserted_ids)} documents into {db_name}.{collection_name}.")
-    finally:
-        client.close()
+    if args.dry_run:
+        print(f"Generated {generated} documents (dry run, nothing inserted, seed={options['seed']}).")
+    elif args.output_dir:
+        target = write_dump_files(options, workers)
+        print(f"Wrote {generated} documents to {target} (seed={options['seed']}).")
+    else:
+        print(f"Inserted {generated} documents into {db_name}.{collection_name} (seed={options['seed']}).")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.local_index import SIMILARITIES
+from utils.logger import get_logger
+from utils.settings import connect, load_env, load_settings
+from utils.snapshot import load_snapshot
+from utils.similar import snapshot_neighbours
+
+
+def parse_args() -> argparse.Namespace:
+    load_env()
+    parser = argparse.ArgumentParser(
+        description="Precompute the nearest neighbours of every product from an embedding snapshot."
+    )
+    parser.add_argument("--snapshot", required=True, help="Snapshot directory written by snapshot.py export.")
+    parser.add_argument("--top-n", type=int, default=10, help="Neighbours stored per product (default: 10).")
+    parser.add_argument(
+        "--similarity",
+        choices=SIMILARITIES,
+        default=os.getenv("VECTOR_INDEX_SIMILARITY", "cosine"),
+        help="Similarity function; use the one of the vector index (default: VECTOR_INDEX_SIMILARITY or cosine).",
+    )
+    parser.add_argument(
+        "--same-restaurant", action="store_true", help="Only consider products of the same restaurant."
+    )
+    parser.add_argument("--available-only", action="store_true", help="Only suggest products that are available.")
+    parser.add_argument(
+        "--block-rows", type=int, default=512, help="Products scored together per matmul block (default: 512)."
+    )
+    parser.add_argument(
+        "--block-cols",
+        type=int,
+        default=32768,
+        help="Candidate columns per block; bounds memory to block-rows x block-cols floats per worker (default: 32768).",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Threads scoring row blocks.")
+    parser.add_argument(
+        "--collection",
+        default=os.getenv("PRODUCT_SIMILAR_COLLECTION", "product_similar"),
+        help="Collection receiving the neighbour lists (default: product_similar).",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write (default: 1000).")
+    parser.add_argument("--dry-run", action="store_true", help="Compute and report without writing to MongoDB.")
+    return parser.parse_args()
+
+
+def write_neighbours(collection, snapshot, rows: np.ndarray, scores: np.ndarray, batch_size: int, logger) -> int:
+    """Replace one compact ``{_id, n, s}`` document per product; ``n`` and ``s`` are parallel, best first."""
+    from pymongo import ReplaceOne
+
+    computed_at = datetime.now(timezone.utc)
+    operations = []
+    written = 0
+    for row in range(len(snapshot)):
+        valid = rows[row] >= 0
+        operations.append(
+            ReplaceOne(
+                {"_id": snapshot.object_id(row)},
+                {
+                    "n": snapshot.object_ids(rows[row][valid]),
+                    "s": [round(float(score), 4) for score in scores[row][valid]],
+                    "computedAt": computed_at,
+                },
+                upsert=True,
+            )
+        )
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+            if written % (batch_size * 10) == 0:
+                logger.info("Wrote %d/%d neighbour lists.", written, len(snapshot))
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    # Products that left the snapshot keep no stale suggestions.
+    removed = collection.delete_many({"computedAt": {"$lt": computed_at}}).deleted_count
+    if removed:
+        logger.info("Removed %d neighbour lists of products no longer in the snapshot.", removed)
+    return written
+
+
+def main() -> None:
+    args = parse_args()
+    logger = get_logger("similar")
+
+    snapshot = load_snapshot(args.snapshot)
+    logger.info(
+        "Computing top-%d neighbours for %d products (%s, same restaurant=%s, available only=%s).",
+        args.top_n,
+        len(snapshot),
+        args.similarity,
+        args.same_restaurant,
+        args.available_only,
+    )
+    started = time.perf_counter()
+    rows, scores = snapshot_neighbours(
+        snapshot,
+        args.top_n,
+        args.similarity,
+        same_restaurant=args.same_restaurant,
+        available_only=args.available_only,
+        block_rows=args.block_rows,
+        block_cols=args.block_cols,
+        workers=args.workers,
+    )
+    elapsed = time.perf_counter() - started
+    found = int(np.count_nonzero(rows >= 0))
+    logger.info(
+        "Scored %d products in %.2fs (%.0f products/s); %.1f neighbours per product on average.",
+        len(snapshot),
+        elapsed,
+        len(snapshot) / elapsed if elapsed else 0.0,
+        found / len(snapshot) if len(snapshot) else 0.0,
+    )
+    if args.dry_run:
+        return
+
+    settings = load_settings()
+    client = connect(settings)
+    try:
+        collection = client[settings["db_name"]][args.collection]
+        written = write_neighbours(collection, snapshot, rows, scores, args.batch_size, logger)
+        logger.info("Stored %d neighbour lists in '%s'.", written, args.collection)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
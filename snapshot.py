@@ -0,0 +1,124 @@
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from utils.logger import get_logger
+from utils.settings import connect, load_env, load_settings
+from utils.snapshot import SNAPSHOT_PROJECTION, SnapshotWriter, deleted_ids, load_snapshot, read_manifest
+
+
+def parse_args() -> argparse.Namespace:
+    load_env()
+    parser = argparse.ArgumentParser(
+        description="Export product embeddings and filter fields into a memory-mappable columnar snapshot."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a full or delta snapshot from MongoDB.")
+    export_parser.add_argument("--output", required=True, help="Directory to write the snapshot into.")
+    export_parser.add_argument(
+        "--collection",
+        default=os.getenv("PRODUCT_DETAIL_COLLECTION", "product_detail"),
+        help="Collection holding the embedded products (default: product_detail).",
+    )
+    export_parser.add_argument(
+        "--since",
+        help="Existing snapshot directory; only products embedded or synced after it are exported as a delta.",
+    )
+    export_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=2000,
+        help="Cursor batch size used while scanning the collection (default: 2000).",
+    )
+
+    info_parser = subparsers.add_parser("info", help="Map a snapshot and print its shape and load time.")
+    info_parser.add_argument("path", help="Snapshot directory.")
+    return parser.parse_args()
+
+
+def export_snapshot(args: argparse.Namespace, logger) -> None:
+    settings = load_settings()
+    query: Dict[str, Any] = {"emb_description": {"$exists": True}}
+    manifest: Dict[str, Any] = {"collection": args.collection, "base": None}
+
+    base_ids = None
+    if args.since:
+        watermark = datetime.fromisoformat(read_manifest(args.since)["watermark"])
+        query["$or"] = [{"embeddedAt": {"$gt": watermark}}, {"syncedAt": {"$gt": watermark}}]
+        manifest["base"] = os.path.relpath(os.path.abspath(args.since), os.path.abspath(args.output))
+        base_ids = load_snapshot(args.since).ids
+
+    # Anything written while the export runs is picked up by the next delta.
+    manifest["watermark"] = datetime.now(timezone.utc).isoformat()
+
+    client = connect(settings)
+    try:
+        collection = client[settings["db_name"]][args.collection]
+        deleted = None
+        if base_ids is not None:
+            live = collection.find({"emb_description": {"$exists": True}}, {"_id": 1}, batch_size=args.batch_size)
+            deleted = deleted_ids(base_ids, (str(document["_id"]) for document in live))
+            logger.info("%d products of the base snapshot were deleted or lost their embedding.", len(deleted))
+        capacity = collection.count_documents(query)
+        sample = collection.find_one(query, {"emb_description": 1})
+        if sample is None and not deleted:
+            logger.info("No embedded products matched; nothing to export.")
+            return
+
+        started = time.perf_counter()
+        dimensions = len(sample["emb_description"]) if sample else read_manifest(args.since)["dimensions"]
+        writer = SnapshotWriter(args.output, capacity, dimensions)
+        cursor = collection.find(query, SNAPSHOT_PROJECTION, batch_size=args.batch_size)
+        for document in cursor:
+            writer.append(document)
+            if writer.rows and writer.rows % 10000 == 0:
+                logger.info("Exported %d/%d rows.", writer.rows, capacity)
+        if writer.skipped["dimensions"]:
+            logger.warning(
+                "Skipped %d products whose embedding does not have %d dimensions.",
+                writer.skipped["dimensions"],
+                dimensions,
+            )
+        if writer.skipped["capacity"]:
+            logger.warning(
+                "Skipped %d products embedded while the export ran; the next delta picks them up.",
+                writer.skipped["capacity"],
+            )
+        manifest = writer.close(manifest, deleted)
+        logger.info(
+            "Wrote %s snapshot with %d rows x %d dimensions to '%s' in %.2fs.",
+            "delta" if args.since else "full",
+            manifest["rows"],
+            manifest["dimensions"],
+            args.output,
+            time.perf_counter() - started,
+        )
+    finally:
+        client.close()
+
+
+def describe_snapshot(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    snapshot = load_snapshot(args.path)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"{args.path}: {len(snapshot)} rows x {snapshot.dimensions} dimensions, "
+        f"{len(snapshot.restaurants)} restaurants, loaded in {elapsed_ms:.1f} ms "
+        f"(watermark {snapshot.manifest.get('watermark')})."
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    logger = get_logger("snapshot")
+    if args.command == "export":
+        export_snapshot(args, logger)
+    else:
+        describe_snapshot(args)
+
+
+if __name__ == "__main__":
+    main()
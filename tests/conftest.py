@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+import backend.api
+import backend.partitions
+from app import create_app
+
+
+class FakeCollection:
+    """Returns canned ranked results and records the pipeline and options of each aggregation."""
+
+    def __init__(self, name, documents, calls):
+        self.name = name
+        self.documents = documents
+        self.calls = calls
+
+    def aggregate(self, pipeline, **options):
+        self.calls.append((self.name, pipeline, options))
+        return iter(self.documents)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.documents = {}
+        self.calls = []
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self.documents.get(name, []), self.calls)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A frozen ``time.monotonic``; advance it with ``clock[0] += seconds``."""
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """A :class:`FakeDatabase` behind ``get_db``; fill ``database.documents[collection]`` with ranked results."""
+    database = FakeDatabase()
+    monkeypatch.setattr(backend.api, "get_db", lambda: database)
+    monkeypatch.setattr(backend.partitions, "get_db", lambda: database)
+    return database
+
+
+@pytest.fixture
+def registry():
+    """Partition registry the app routes with, as written by ``indexes.py --partition-by countryCode``."""
+    return {
+        "field": "countryCode",
+        "partitions": {
+            "CL": {"collection": "product_detail__CL", "vectorIndex": "vector__CL", "textIndex": "text__CL"},
+            "PE": {"collection": "product_detail__PE", "vectorIndex": "vector__PE", "textIndex": "text__PE"},
+        },
+    }
+
+
+@pytest.fixture
+def app(monkeypatch, database, registry):
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost")
+    monkeypatch.setenv("DB_NAME", "test")
+    app = create_app()
+    # Seed the search_config caches so routing never reads MongoDB.
+    app.extensions["partition_registry"] = (time.monotonic(), registry)
+    app.extensions["active_indexes"] = (time.monotonic(), {})
+    return app
@@ -0,0 +1,87 @@
+import threading
+
+from backend.admission import ConcurrencyLimiter, admission_pool, build_limiter
+
+
+def make_limiter(**overrides):
+    options = {"initial_limit": 4, "max_limit": 8, "max_queue": 0, "latency_target_ms": 100}
+    return ConcurrencyLimiter("test", **{**options, **overrides})
+
+
+def test_admission_pools():
+    assert admission_pool("vector") == admission_pool("hybrid") == "embedding"
+    assert admission_pool("fulltext") == "fulltext"
+
+
+def test_requests_beyond_the_limit_are_shed_without_a_queue():
+    limiter = make_limiter(initial_limit=2)
+
+    assert limiter.acquire(0) and limiter.acquire(0)
+    assert not limiter.acquire(50)
+    limiter.release(10)
+    assert limiter.acquire(0)
+
+
+def test_queued_request_gets_the_released_slot():
+    limiter = make_limiter(initial_limit=1, max_queue=1)
+    limiter.acquire(0)
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire(5000)))
+    waiter.start()
+    while limiter.snapshot()["waiting"] == 0:
+        pass
+
+    assert not limiter.acquire(5000)  # the queue is full
+    limiter.release(10)
+    waiter.join()
+    assert admitted == [True]
+    assert limiter.snapshot()["inFlight"] == 1
+
+
+def test_slow_responses_decrease_the_limit_once_per_window(clock):
+    limiter = make_limiter(initial_limit=8, max_limit=8, latency_target_ms=100, backoff=0.5)
+    for _ in range(3):
+        limiter.acquire(0)
+        limiter.release(400)
+    assert limiter.limit == 4
+
+    clock[0] += 1
+    limiter.acquire(0)
+    limiter.release(400)
+    assert limiter.limit == 2
+
+
+def test_overload_decreases_the_limit_down_to_the_minimum(clock):
+    limiter = make_limiter(initial_limit=2, min_limit=1, backoff=0.5)
+    for _ in range(5):
+        clock[0] += 10
+        limiter.acquire(0)
+        limiter.release(10, overloaded=True)
+
+    assert limiter.limit == 1
+
+
+def test_saturated_fast_responses_increase_the_limit_up_to_the_maximum():
+    limiter = make_limiter(initial_limit=2, max_limit=3)
+    for _ in range(20):
+        limiter.acquire(0)
+        limiter.acquire(0)
+        limiter.release(10)
+        limiter.release(10)
+
+    assert limiter.limit == 3
+
+
+def test_idle_fast_responses_keep_the_limit():
+    limiter = make_limiter(initial_limit=4)
+    for _ in range(20):
+        limiter.acquire(0)
+        limiter.release(10)
+
+    assert limiter.limit == 4
+
+
+def test_build_limiter_reads_the_pool_config():
+    limiter = build_limiter({"ADMISSION_FULLTEXT_LIMIT": 5, "ADMISSION_QUEUE_SIZE": 3}, "fulltext")
+
+    assert (limiter.limit, limiter.max_limit, limiter.max_queue) == (5, 20, 3)
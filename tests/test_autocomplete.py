@@ -0,0 +1,88 @@
+import random
+
+from utils.autocomplete import TitleIndex, normalize, word_suffixes
+
+COUNTS = {
+    "Pollo a la Brasa": 5,
+    "Pollo Frito": 9,
+    "Sopa de Pollo": 50,
+    "Ají de Gallina": 3,
+    "Papas Fritas": 7,
+}
+
+
+def brute_force(counts, prefix, limit):
+    """Reference ranking: titles starting with the prefix first, then by product count."""
+    query = normalize(prefix)
+    ranked = []
+    for title, count in counts.items():
+        suffixes = word_suffixes(normalize(title))
+        if any(suffix.startswith(query) for suffix in suffixes):
+            ranked.append((not suffixes[0].startswith(query), -count, title))
+    return [title for _, _, title in sorted(ranked)[:limit]]
+
+
+def rank_of(counts, prefix, title):
+    return (not normalize(title).startswith(normalize(prefix)), -counts[title])
+
+
+def test_normalize_strips_case_accents_and_spacing():
+    assert normalize("  Ají   de GALLINA ") == "aji de gallina"
+    assert word_suffixes("aji de gallina") == ["aji de gallina", "de gallina", "gallina"]
+
+
+def test_titles_starting_with_the_prefix_outrank_inner_matches():
+    index = TitleIndex(COUNTS)
+
+    assert index.complete("pollo") == ["Pollo Frito", "Pollo a la Brasa", "Sopa de Pollo"]
+
+
+def test_matches_inside_titles_and_without_accents():
+    index = TitleIndex(COUNTS)
+
+    assert index.complete("gall") == ["Ají de Gallina"]
+    assert index.complete("AJI") == ["Ají de Gallina"]
+    assert index.complete("frit") == ["Pollo Frito", "Papas Fritas"]
+
+
+def test_limit_and_empty_queries():
+    index = TitleIndex(COUNTS)
+
+    assert index.complete("pollo", limit=1) == ["Pollo Frito"]
+    assert index.complete("   ") == []
+    assert index.complete("pollo", limit=0) == []
+    assert index.complete("pizza") == []
+
+
+def test_repeated_words_yield_one_suggestion():
+    index = TitleIndex({"Pollo Pollo": 2, "Pollo": 1})
+
+    assert index.complete("pol") == ["Pollo Pollo", "Pollo"]
+
+
+def test_added_titles_are_searchable_until_the_next_rebuild():
+    index = TitleIndex(COUNTS)
+
+    assert index.add(["Pollo Broaster", "Pollo Frito", ""]) == 1
+    assert "Pollo Broaster" in index.complete("pollo b")
+    index.rebuild(COUNTS)
+    assert index.complete("pollo b") == []
+
+
+def test_ranking_matches_a_brute_force_scan():
+    generator = random.Random(7)
+    words = ["pollo", "papa", "pan", "pasta", "sopa", "salsa", "arroz", "ají", "taco", "te"]
+    counts = {
+        " ".join(generator.choice(words) for _ in range(generator.randint(1, 4))): generator.randint(1, 100)
+        for _ in range(300)
+    }
+    index = TitleIndex(counts)
+
+    for prefix in ["p", "pa", "pol", "s", "sal", "a", "aji", "t", "te", "pollo p", "z"]:
+        expected = brute_force(counts, prefix, 8)
+        result = index.complete(prefix, limit=8)
+        # Titles tied on rank may be swapped, so compare ranks rather than titles.
+        assert set(result) <= set(brute_force(counts, prefix, len(counts)))
+        assert [rank_of(counts, prefix, title) for title in result] == [
+            rank_of(counts, prefix, title) for title in expected
+        ]
@@ -0,0 +1,93 @@
+from backend.facets import OTHER_BUCKET, count_facets, facet_projection, merge_facets
+
+BOUNDARIES = [0, 10, 20, 50]
+
+
+def product(restaurant, available, price):
+    return {
+        "_id": f"{restaurant}-{price}",
+        "restaurantName": restaurant,
+        "product": {"available": available, "price": {"amount": price}},
+    }
+
+
+def test_merge_sums_partitions_and_sorts_counts():
+    chile = {
+        "restaurants": [{"_id": "B", "count": 2}, {"_id": "A", "count": 1}],
+        "availability": [{"_id": True, "count": 2}, {"_id": False, "count": 1}],
+        "price": [{"_id": 0, "count": 1}, {"_id": 10, "count": 2}],
+        "pool": [{"count": 3}],
+    }
+    peru = {
+        "restaurants": [{"_id": "A", "count": 1}, {"_id": None, "count": 1}],
+        "availability": [{"_id": False, "count": 2}],
+        "price": [{"_id": OTHER_BUCKET, "count": 2}],
+        "pool": [{"count": 2}],
+    }
+
+    facets = merge_facets([chile, peru], BOUNDARIES)
+
+    assert facets["pool"] == 5
+    assert facets["restaurants"] == [
+        {"value": "A", "count": 2},
+        {"value": "B", "count": 2},
+        {"value": None, "count": 1},
+    ]
+    assert facets["availability"] == [{"value": False, "count": 3}, {"value": True, "count": 2}]
+    assert facets["price"] == [
+        {"min": 0, "max": 10, "count": 1},
+        {"min": 10, "max": 20, "count": 2},
+        {"min": 20, "max": 50, "count": 0},
+        {"min": None, "max": None, "count": 2},
+    ]
+
+
+def test_merge_of_empty_partitions():
+    facets = merge_facets([{}, {"pool": []}], BOUNDARIES)
+
+    assert facets["pool"] == 0
+    assert facets["restaurants"] == facets["availability"] == []
+    assert [bucket["count"] for bucket in facets["price"]] == [0, 0, 0]
+
+
+def test_count_facets_matches_the_facet_stage_shape():
+    documents = [product("A", True, 5), product("A", False, 15), product("B", True, 80), product("B", True, None)]
+
+    raw = count_facets(documents, {"_id": 1, "restaurantName": 1}, limit=2, boundaries=BOUNDARIES)
+    facets = merge_facets([raw], BOUNDARIES)
+
+    assert raw["results"] == [{"_id": "A-5", "restaurantName": "A"}, {"_id": "A-15", "restaurantName": "A"}]
+    assert facets["pool"] == 4
+    assert facets["availability"] == [{"value": True, "count": 3}, {"value": False, "count": 1}]
+    assert [bucket["count"] for bucket in facets["price"]] == [1, 1, 0, 2]
+
+
+def test_count_facets_projects_nested_paths():
+    raw = count_facets([product("A", True, 5)], {"product.price.amount": 1}, limit=5, boundaries=BOUNDARIES)
+
+    assert raw["results"] == [{"product": {"price": {"amount": 5}}}]
+
+
+def test_facet_projection_adds_facet_fields_once():
+    projection = facet_projection({"_id": 1, "product": 1, "score": {"$meta": "searchScore"}})
+
+    assert projection == {"_id": 1, "product": 1, "restaurantName": 1, "score": {"$meta": "searchScore"}}
+
+
+def test_fanned_out_search_counts_the_merged_top_of_the_pools(app, database):
+    app.config["FACET_POOL_SIZE"] = 3
+    database.documents = {
+        "product_detail__CL": [{**product("A", True, 5), "score": score} for score in (0.9, 0.8, 0.1)],
+        "product_detail__PE": [{**product("B", False, 15), "score": score} for score in (0.85, 0.2, 0.05)],
+    }
+
+    response = app.test_client().post(
+        "/api/search", json={"mode": "fulltext", "title": "pollo", "limit": 2, "facets": True}
+    )
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert [result["score"] for result in body["results"]] == [0.9, 0.85]
+    assert body["facets"]["pool"] == 3
+    assert body["facets"]["restaurants"] == [{"value": "A", "count": 2}, {"value": "B", "count": 1}]
+    assert not any("$facet" in stage for _, pipeline, _ in database.calls for stage in pipeline)
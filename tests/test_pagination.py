@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from backend import pagination
+from backend.pagination import RankedPool, RankedPoolCache, decode_cursor, encode_cursor
+
+SECRET = b"secret"
+QUERY = {"mode": "vector", "description": "pollo", "limit": 5}
+
+
+def test_cursor_round_trip():
+    token = encode_cursor(SECRET, QUERY, offset=10, limit=5, max_age=60)
+
+    assert decode_cursor(SECRET, token) == (QUERY, 10, 5)
+
+
+@pytest.mark.parametrize(
+    "token",
+    [None, 42, "", "no-dot", "a.b.c", "e30.bad-signature"],
+)
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(SECRET, token)
+
+
+def test_cursor_signed_with_another_secret_is_rejected():
+    token = encode_cursor(b"other", QUERY, offset=0, limit=5, max_age=60)
+
+    with pytest.raises(ValueError):
+        decode_cursor(SECRET, token)
+
+
+def test_tampered_cursor_is_rejected():
+    signature = encode_cursor(SECRET, QUERY, offset=0, limit=5, max_age=60).split(".")[1]
+    forged_body = encode_cursor(SECRET, QUERY, offset=100, limit=5, max_age=60).split(".")[0]
+
+    with pytest.raises(ValueError):
+        decode_cursor(SECRET, f"{forged_body}.{signature}")
+
+
+def test_expired_cursor_is_rejected(monkeypatch):
+    token = encode_cursor(SECRET, QUERY, offset=0, limit=5, max_age=60)
+    now = time.time()
+    monkeypatch.setattr(pagination.time, "time", lambda: now + 120)
+
+    with pytest.raises(ValueError):
+        decode_cursor(SECRET, token)
+
+
+def test_pool_cache_expires_entries(clock):
+    cache = RankedPoolCache(ttl=10)
+    cache.put("key", RankedPool(entries=[], mode="vector", created=clock[0]))
+
+    clock[0] += 5
+    assert cache.get("key") is not None
+    clock[0] += 10
+    assert cache.get("key") is None
+
+
+def test_pool_cache_evicts_least_recently_used():
+    cache = RankedPoolCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, RankedPool(entries=[], mode="vector"))
+    cache.get("a")
+    cache.put("c", RankedPool(entries=[], mode="vector"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
@@ -0,0 +1,102 @@
+import mongomock
+import pytest
+
+import indexes
+from backend.partitions import SearchTarget, route_targets
+from utils.search_config import partition_collection_name, save_partitions
+
+DEFAULT = SearchTarget("product_detail", "vector", "text")
+UNASSIGNED = {
+    "collection": "product_detail__unassigned",
+    "vectorIndex": "vector__unassigned",
+    "textIndex": "text__unassigned",
+}
+
+
+@pytest.fixture
+def materialized(monkeypatch):
+    """Record the partitions create_partitions builds; mongomock has no $merge or search indexes."""
+    matches = {}
+    monkeypatch.setattr(
+        indexes, "materialize_partition", lambda collection, match, target: matches.update({target: match})
+    )
+    monkeypatch.setattr(indexes, "create_indexes", lambda collection, definitions, replace: None)
+    return matches
+
+
+def test_unscoped_search_fans_out_to_the_catch_all(registry):
+    registry["unassigned"] = UNASSIGNED
+
+    targets = route_targets(registry, {"country": None}, DEFAULT)
+
+    assert [target.collection for target in targets] == [
+        "product_detail__CL",
+        "product_detail__PE",
+        "product_detail__unassigned",
+    ]
+    assert targets[-1].partition is None
+
+
+def test_scoped_search_skips_the_catch_all(registry):
+    registry["unassigned"] = UNASSIGNED
+
+    assert [target.collection for target in route_targets(registry, {"country": "PE"}, DEFAULT)] == [
+        "product_detail__PE"
+    ]
+    assert route_targets(registry, {"country": None}, DEFAULT, fanout=False) == [DEFAULT]
+
+
+def test_products_without_a_value_get_a_catch_all_partition(materialized):
+    collection = mongomock.MongoClient().db.product_detail
+    collection.insert_many([{"countryCode": "PE"}, {"countryCode": "CL"}, {"countryCode": ""}, {"title": "sin país"}])
+
+    registry = indexes.create_partitions(collection, "countryCode", "vector", "text", 4, "cosine", False, 8)
+
+    assert sorted(registry["partitions"]) == ["CL", "PE"]
+    assert registry["unassigned"]["collection"] == "product_detail__unassigned"
+    assert registry["unassigned"]["vectorIndex"] == "vector__unassigned"
+    assert materialized["product_detail__unassigned"] == {"countryCode": {"$in": [None, ""]}}
+    assert collection.count_documents(materialized["product_detail__unassigned"]) == 2
+
+
+def test_no_catch_all_when_every_product_has_a_value(materialized):
+    collection = mongomock.MongoClient().db.product_detail
+    collection.insert_many([{"countryCode": "PE"}, {"countryCode": "CL"}])
+
+    registry = indexes.create_partitions(collection, "countryCode", "vector", "text", 4, "cosine", False, 8)
+
+    assert registry["unassigned"] is None
+    assert sorted(materialized) == [
+        partition_collection_name("product_detail", "CL"),
+        partition_collection_name("product_detail", "PE"),
+    ]
+
+
+def test_unscoped_search_returns_a_product_without_a_country(app, database, registry):
+    registry["unassigned"] = UNASSIGNED
+    database.documents = {
+        "product_detail__PE": [{"_id": "pe-1", "title": "pollo", "score": 0.5}],
+        "product_detail__unassigned": [{"_id": "no-country", "title": "pollo", "score": 0.8}],
+    }
+    client = app.test_client()
+
+    unscoped = client.post("/api/search", json={"mode": "fulltext", "title": "pollo"}).get_json()
+    scoped = client.post("/api/search", json={"mode": "fulltext", "title": "pollo", "country": "PE"}).get_json()
+
+    assert [result["_id"] for result in unscoped["results"]] == ["no-country", "pe-1"]
+    assert [result["_id"] for result in scoped["results"]] == ["pe-1"]
+
+
+def test_refresh_re_merges_registered_partitions(materialized, registry, caplog):
+    collection = mongomock.MongoClient().db.product_detail
+    collection.insert_many([{"countryCode": "PE"}, {"countryCode": "CL"}, {"countryCode": "AR"}, {}])
+    registry["unassigned"] = UNASSIGNED
+    save_partitions(collection.database, "product_detail", "countryCode", registry["partitions"], UNASSIGNED)
+
+    assert indexes.refresh_partitions(collection.database, collection) == 3
+    assert materialized == {
+        "product_detail__CL": {"countryCode": "CL"},
+        "product_detail__PE": {"countryCode": "PE"},
+        "product_detail__unassigned": {"countryCode": {"$in": [None, ""]}},
+    }
+    assert "countryCode values without a partition: AR" in caplog.text
@@ -0,0 +1,62 @@
+import pytest
+
+from backend.resilience import CircuitBreaker, call_with_timeout
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_lets_one_trial_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock[0] += 30
+
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock[0] += 29
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+
+
+def test_call_with_timeout_returns_the_result():
+    assert call_with_timeout(lambda value: value * 2, 1000, 21) == 42
+
+
+def test_call_with_timeout_without_budget_does_not_call():
+    with pytest.raises(TimeoutError):
+        call_with_timeout(pytest.fail, 0)
@@ -0,0 +1,22 @@
+import json
+
+
+def test_stream_merges_every_partition(app, database):
+    app.config["SEARCH_STREAM_BATCH_SIZE"] = 7
+    database.documents = {
+        "product_detail__CL": [
+            {"_id": "cl-1", "title": "pollo", "score": 0.9},
+            {"_id": "cl-2", "title": "pollo", "score": 0.4},
+        ],
+        "product_detail__PE": [{"_id": "pe-1", "title": "pollo", "score": 0.7}],
+    }
+
+    response = app.test_client().post("/api/search", json={"mode": "fulltext", "title": "pollo", "stream": True})
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert [record["type"] for record in records] == ["header", "result", "result", "result", "trailer"]
+    assert [record["result"]["_id"] for record in records[1:-1]] == ["cl-1", "pe-1", "cl-2"]
+    assert "error" not in records[-1]
+    assert sorted(name for name, _, _ in database.calls) == ["product_detail__CL", "product_detail__PE"]
+    assert all(options["batchSize"] == 7 for _, _, options in database.calls)
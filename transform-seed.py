@@ -1,16 +1,22 @@
 import argparse
 import os
-from typing import Dict, Iterable, List
-
-from bson import ObjectId
-from dotenv import load_dotenv
-from pymongo import MongoClient
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
 
+from utils.catalog import build_product_document, iter_product_documents
 from utils.logger import get_logger
+from utils.partition import compute_id_ranges, run_partitioned
+from utils.settings import connect, load_env, load_settings
+from utils.sync import description_hash, load_state, save_state
+
+UNKEYED_BATCH_SIZE = 500
+# Change events that carry a documentKey, and those after which the stream is closed.
+DOCUMENT_OPERATIONS = {"insert", "update", "replace", "delete"}
+STREAM_END_OPERATIONS = {"drop", "rename", "dropDatabase", "invalidate"}
 
 
 def parse_args() -> argparse.Namespace:
-    load_dotenv()
+    load_env()
     parser = argparse.ArgumentParser(
         description="Transform catalog documents by unwinding products into a flattened collection."
     )
@@ -40,58 +46,415 @@ def parse_args() -> argparse.Namespace:
         default=500,
         help="Number of documents to insert per batch (default: 500).",
     )
+    parser.add_argument(
+        "--server-side",
+        action="store_true",
+        help="Run the transformation as an aggregation ($unwind + $merge) inside MongoDB. "
+        "Falls back to the Python transformation if the server rejects the pipeline.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the source collection into _id ranges and transform each in its own process (default: 1).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only sync catalogs whose updatedAt is newer than the stored watermark.",
+    )
+    parser.add_argument(
+        "--prune-deleted",
+        action="store_true",
+        help="With --incremental, also remove products whose catalog no longer exists in the source.",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Follow the source collection's change stream and sync every change (requires a replica set).",
+    )
     return parser.parse_args()
 
 
-def load_settings() -> Dict[str, str]:
-    load_dotenv()
-    mongo_uri = os.getenv("MONGODB_URI")
-    db_name = os.getenv("DB_NAME")
+def _unwind_stages(limit: Optional[int], query: Optional[dict]) -> List[dict]:
+    """One document per product, with ``productPosition`` and the ``productObjectId`` it converts to."""
+    stages: List[dict] = []
+    if query:
+        stages.append({"$match": query})
+    if limit:
+        # Sorted so the $merge pass and the unkeyed pass see the same catalogs.
+        stages.extend([{"$sort": {"_id": 1}}, {"$limit": limit}])
+    stages.extend(
+        [
+            {"$match": {"products": {"$type": "array"}}},
+            {"$unwind": {"path": "$products", "includeArrayIndex": "productPosition"}},
+            {"$match": {"products": {"$type": "object"}}},
+            {
+                "$replaceRoot": {
+                    "newRoot": {
+                        "$mergeObjects": [
+                            "$$ROOT",
+                            {"catalogId": "$_id", "product": "$products"},
+                        ]
+                    }
+                }
+            },
+            {"$unset": ["products", "description_embeddings", "image_embeddings"]},
+            {
+                "$set": {
+                    "productObjectId": {
+                        "$convert": {
+                            "input": "$product._id",
+                            "to": "objectId",
+                            "onError": None,
+                            "onNull": None,
+                        }
+                    }
+                }
+            },
+        ]
+    )
+    return stages
+
+
+def build_transform_pipeline(
+    target: str, limit: Optional[int] = None, query: Optional[dict] = None
+) -> List[dict]:
+    """Aggregation equivalent of ``iter_product_documents`` for products with a usable ``_id``.
+
+    The id of the others is a hash (``derive_product_id``), which the
+    aggregation language cannot compute; :func:`build_unkeyed_products_pipeline`
+    hands them to Python instead.
+    """
+    return _unwind_stages(limit, query) + [
+        {"$match": {"productObjectId": {"$ne": None}}},
+        {"$set": {"_id": "$productObjectId"}},
+        {"$unset": ["productObjectId", "productPosition"]},
+        {
+            "$merge": {
+                "into": target,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+
 
-    missing = [
-        name
-        for name, value in [("MONGODB_URI", mongo_uri), ("DB_NAME", db_name)]
-        if not value
+def build_unkeyed_products_pipeline(limit: Optional[int] = None, query: Optional[dict] = None) -> List[dict]:
+    """The products :func:`build_transform_pipeline` skips, each with its catalog's fields and ``_id``."""
+    return _unwind_stages(limit, query) + [
+        {"$match": {"productObjectId": None}},
+        {"$unset": ["productObjectId", "catalogId"]},
     ]
-    if missing:
-        raise RuntimeError(
-            f"Missing required environment variables: {', '.join(missing)}"
+
+
+def transform_server_side(
+    source_collection,
+    target_collection,
+    limit: Optional[int],
+    logger,
+    query: Optional[dict] = None,
+) -> Dict[str, int]:
+    pipeline = build_transform_pipeline(target_collection.name, limit, query)
+    logger.info("Executing server-side transform pipeline: %s", pipeline)
+    # $merge returns no documents; exhausting the cursor runs the pipeline.
+    for _ in source_collection.aggregate(pipeline, allowDiskUse=True):
+        pass
+
+    unkeyed: List[dict] = []
+    written = 0
+    for row in source_collection.aggregate(build_unkeyed_products_pipeline(limit, query), allowDiskUse=True):
+        product, position = row.pop("product"), row.pop("productPosition")
+        unkeyed.append(build_product_document(row, product, position))
+        if len(unkeyed) >= UNKEYED_BATCH_SIZE:
+            write_products(target_collection, unkeyed, upsert=True)
+            written += len(unkeyed)
+            unkeyed = []
+    if unkeyed:
+        write_products(target_collection, unkeyed, upsert=True)
+        written += len(unkeyed)
+    if written:
+        logger.info("Wrote %d products without a usable _id from Python.", written)
+    logger.info("Server-side transform finished for '%s'.", target_collection.name)
+    return {}
+
+
+def write_products(target_collection, batch: List[dict], upsert: bool) -> None:
+    """Insert ``batch``, or replace it by ``_id`` when the target may already hold some of it."""
+    from pymongo import ReplaceOne
+
+    if upsert:
+        target_collection.bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in batch], ordered=False
         )
+    else:
+        target_collection.insert_many(batch)
 
-    return {"mongo_uri": mongo_uri, "db_name": db_name}
 
+def transform_client_side(
+    source_collection,
+    target_collection,
+    limit: Optional[int],
+    batch_size: int,
+    logger,
+    query: Optional[dict] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    upsert: bool = False,
+) -> Dict[str, int]:
+    """Transform in Python; ``upsert`` makes the writes safe to repeat over a partly written target."""
+    cursor = source_collection.find(query or {})
+    if limit:
+        cursor = cursor.limit(limit)
 
-def iter_products(document: dict) -> Iterable[dict]:
-    products = document.get("products", [])
-    if not isinstance(products, list):
-        return []
-    return [product for product in products if isinstance(product, dict)]
+    batch: List[dict] = []
+    total_products = 0
+    total_documents = 0
 
+    for document in cursor:
+        total_documents += 1
+        for product_document in iter_product_documents(document):
+            batch.append(product_document)
+            total_products += 1
 
-def build_product_document(source: dict, product: dict) -> dict:
-    base = {
-        key: value
-        for key, value in source.items()
-        if key not in {"products", "description_embeddings", "image_embeddings"}
-    }
+            if len(batch) >= batch_size:
+                write_products(target_collection, batch, upsert)
+                if progress:
+                    progress(len(batch))
+                batch.clear()
+                logger.info(
+                    "Inserted %d product documents so far into '%s'.",
+                    total_products,
+                    target_collection.name,
+                )
+
+    if batch:
+        write_products(target_collection, batch, upsert)
+        if progress:
+            progress(len(batch))
+        logger.info(
+            "Inserted remaining %d product documents into '%s'.",
+            len(batch),
+            target_collection.name,
+        )
+
+    logger.info(
+        "Processed %d source documents and generated %d product documents into '%s'.",
+        total_documents,
+        total_products,
+        target_collection.name,
+    )
+    return {"documents": total_documents, "products": total_products}
 
-    catalog_id = source.get("_id")
-    if catalog_id is not None:
-        base["catalogId"] = catalog_id
 
-    product_id = product.get("_id")
-    if isinstance(product_id, ObjectId):
-        base["_id"] = product_id
-    elif isinstance(product_id, str):
+def run_transform(
+    db,
+    options: Dict[str, Any],
+    logger,
+    query: Optional[dict] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, int]:
+    from pymongo.errors import OperationFailure
+
+    source_collection = db[options["source"]]
+    target_collection = db[options["target"]]
+
+    fallback = False
+    if options["server_side"]:
         try:
-            base["_id"] = ObjectId(product_id)
-        except Exception:
-            base["_id"] = ObjectId()
-    else:
-        base["_id"] = ObjectId()
+            return transform_server_side(
+                source_collection, target_collection, options["limit"], logger, query
+            )
+        except OperationFailure as exc:
+            logger.warning(
+                "Server-side transform failed (%s); falling back to the Python transformation.",
+                exc,
+            )
+            # $merge may have written part of its output before failing.
+            fallback = True
 
-    base["product"] = product
-    return base
+    return transform_client_side(
+        source_collection,
+        target_collection,
+        options["limit"],
+        options["batch_size"],
+        logger,
+        query,
+        progress,
+        upsert=fallback,
+    )
+
+
+def transform_partition(index: int, query: dict, options: Dict[str, Any], progress) -> Dict[str, int]:
+    """Worker entry point for ``--workers``: transform one ``_id`` range with its own client."""
+    logger = get_logger("transform")
+    client = connect(options)
+    try:
+        logger.info("[worker %d] Transforming range %s.", index, query)
+        return run_transform(client[options["db_name"]], options, logger, query, progress.put)
+    finally:
+        client.close()
+
+
+def sync_state_key(source: str, target: str) -> str:
+    return f"transform:{source}->{target}"
+
+
+def ensure_sync_indexes(source_collection, target_collection) -> None:
+    from pymongo import ASCENDING
+
+    source_collection.create_index([("updatedAt", ASCENDING)])
+    target_collection.create_index([("catalogId", ASCENDING)])
+    target_collection.create_index(
+        [("embeddingStale", ASCENDING)],
+        partialFilterExpression={"embeddingStale": True},
+    )
+
+
+def sync_catalogs(target_collection, catalogs: List[dict]) -> Dict[str, int]:
+    """Upsert the products of ``catalogs`` and delete the ones that disappeared.
+
+    Existing embeddings are kept; a product whose description hash no longer
+    matches the ``embeddingHash`` written by ``embed.py`` is flagged with
+    ``embeddingStale`` so ``embed.py --stale-only`` re-embeds just those.
+    """
+    from pymongo import DeleteMany, UpdateOne
+
+    products = [document for catalog in catalogs for document in iter_product_documents(catalog)]
+    embedded_hashes = {
+        doc["_id"]: doc.get("embeddingHash")
+        for doc in target_collection.find(
+            {"_id": {"$in": [product["_id"] for product in products]}},
+            {"embeddingHash": 1},
+        )
+    }
+
+    operations: List[Any] = []
+    stale = 0
+    synced_at = datetime.now(timezone.utc)
+    for document in products:
+        fields = {key: value for key, value in document.items() if key != "_id"}
+        fields["syncedAt"] = synced_at
+        current_hash = description_hash(document["product"].get("description"))
+        if current_hash is not None and embedded_hashes.get(document["_id"]) != current_hash:
+            fields["embeddingStale"] = True
+            stale += 1
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": fields}, upsert=True))
+
+    for catalog in catalogs:
+        operations.append(
+            DeleteMany(
+                {
+                    "catalogId": catalog["_id"],
+                    "_id": {"$nin": [product["_id"] for product in products if product["catalogId"] == catalog["_id"]]},
+                }
+            )
+        )
+
+    result = target_collection.bulk_write(operations, ordered=False) if operations else None
+    return {
+        "catalogs": len(catalogs),
+        "upserted": len(products),
+        "stale": stale,
+        "deleted": result.deleted_count if result else 0,
+    }
+
+
+def prune_deleted_catalogs(source_collection, target_collection) -> int:
+    live_ids = set(source_collection.distinct("_id"))
+    orphaned = [catalog_id for catalog_id in target_collection.distinct("catalogId") if catalog_id not in live_ids]
+    if not orphaned:
+        return 0
+    return target_collection.delete_many({"catalogId": {"$in": orphaned}}).deleted_count
+
+
+def run_incremental(db, options: Dict[str, Any], logger) -> None:
+    from pymongo import ASCENDING
+
+    source_collection = db[options["source"]]
+    target_collection = db[options["target"]]
+    state_key = sync_state_key(options["source"], options["target"])
+    ensure_sync_indexes(source_collection, target_collection)
+
+    watermark = load_state(db, state_key).get("watermark")
+    query = {"updatedAt": {"$gte": watermark}} if watermark else {}
+    logger.info("Incremental sync of '%s' from watermark %s.", options["source"], watermark)
+
+    cursor = source_collection.find(query).sort("updatedAt", ASCENDING)
+    totals = {"catalogs": 0, "upserted": 0, "stale": 0, "deleted": 0}
+    batch: List[dict] = []
+    for catalog in cursor:
+        batch.append(catalog)
+        if len(batch) >= options["batch_size"]:
+            flush_incremental_batch(db, target_collection, state_key, batch, totals, logger)
+            batch = []
+    if batch:
+        flush_incremental_batch(db, target_collection, state_key, batch, totals, logger)
+
+    if options["prune_deleted"]:
+        totals["deleted"] += prune_deleted_catalogs(source_collection, target_collection)
+
+    logger.info(
+        "Incremental sync finished: %d catalogs, %d products upserted, %d flagged for re-embedding, %d removed.",
+        totals["catalogs"],
+        totals["upserted"],
+        totals["stale"],
+        totals["deleted"],
+    )
+
+
+def flush_incremental_batch(
+    db, target_collection, state_key: str, batch: List[dict], totals: Dict[str, int], logger
+) -> None:
+    counts = sync_catalogs(target_collection, batch)
+    for key, value in counts.items():
+        totals[key] += value
+    watermark = max((catalog.get("updatedAt") for catalog in batch if catalog.get("updatedAt")), default=None)
+    if watermark is not None:
+        save_state(db, state_key, watermark=watermark)
+    logger.info("Synced %d catalogs so far (watermark=%s).", totals["catalogs"], watermark)
+
+
+def follow_changes(db, options: Dict[str, Any], logger) -> None:
+    from pymongo.errors import OperationFailure
+
+    source_collection = db[options["source"]]
+    target_collection = db[options["target"]]
+    state_key = sync_state_key(options["source"], options["target"])
+    ensure_sync_indexes(source_collection, target_collection)
+
+    state = load_state(db, state_key)
+    resume_token = state.get("resumeToken")
+    watermark = state.get("watermark")
+    try:
+        # start_after (unlike resume_after) also accepts the token of an invalidate event.
+        stream = source_collection.watch(full_document="updateLookup", start_after=resume_token)
+    except OperationFailure as exc:
+        raise RuntimeError(f"Change streams are not available on this deployment: {exc}") from exc
+
+    logger.info("Following changes on '%s' (resume token: %s).", options["source"], bool(resume_token))
+    with stream:
+        for change in stream:
+            operation = change["operationType"]
+            if operation in STREAM_END_OPERATIONS:
+                # The stream is closing: keep the position so --incremental or a new --follow picks up from here.
+                save_state(db, state_key, resumeToken=stream.resume_token, watermark=watermark)
+                logger.warning("Collection '%s' received '%s'; stopped following.", options["source"], operation)
+                return
+            if operation not in DOCUMENT_OPERATIONS:
+                save_state(db, state_key, resumeToken=stream.resume_token)
+                continue
+            catalog_id = change["documentKey"]["_id"]
+            if operation == "delete":
+                deleted = target_collection.delete_many({"catalogId": catalog_id}).deleted_count
+                logger.info("Catalog %s deleted; removed %d products.", catalog_id, deleted)
+            elif change.get("fullDocument") is not None:
+                catalog = change["fullDocument"]
+                counts = sync_catalogs(target_collection, [catalog])
+                logger.info("Catalog %s %s; synced %s.", catalog_id, operation, counts)
+                if catalog.get("updatedAt") and (watermark is None or catalog["updatedAt"] > watermark):
+                    watermark = catalog["updatedAt"]
+            save_state(db, state_key, resumeToken=stream.resume_token, watermark=watermark)
 
 
 def main() -> None:
@@ -100,53 +463,51 @@ def main() -> None:
 
     logger = get_logger("transform")
 
-    client = MongoClient(settings["mongo_uri"])
+    if args.workers > 1 and args.limit:
+        raise ValueError("--limit cannot be combined with --workers.")
+    if args.workers > 1 and (args.incremental or args.follow):
+        raise ValueError("--incremental and --follow cannot be combined with --workers.")
+
+    options: Dict[str, Any] = {
+        **settings,
+        "source": args.source,
+        "target": args.target,
+        "limit": args.limit,
+        "batch_size": args.batch_size,
+        "server_side": args.server_side,
+        "prune_deleted": args.prune_deleted,
+    }
+
+    client = connect(settings)
     try:
         db = client[settings["db_name"]]
-        source_collection = db[args.source]
-        target_collection = db[args.target]
 
         if args.drop_target:
-            target_collection.drop()
+            db[args.target].drop()
             logger.info("Dropped target collection '%s'.", args.target)
 
-        cursor = source_collection.find({})
-        if args.limit:
-            cursor = cursor.limit(args.limit)
-
-        batch: List[dict] = []
-        total_products = 0
-        total_documents = 0
-
-        for document in cursor:
-            total_documents += 1
-            for product in iter_products(document):
-                batch.append(build_product_document(document, product))
-                total_products += 1
-
-                if len(batch) >= args.batch_size:
-                    target_collection.insert_many(batch)
-                    batch.clear()
-                    logger.info(
-                        "Inserted %d product documents so far into '%s'.",
-                        total_products,
-                        args.target,
-                    )
-
-        if batch:
-            target_collection.insert_many(batch)
+        if args.follow:
+            follow_changes(db, options, logger)
+            return
+
+        if args.incremental:
+            run_incremental(db, options, logger)
+            return
+
+        if args.workers <= 1:
+            run_transform(db, options, logger)
+            return
+
+        ranges = compute_id_ranges(db[args.source], args.workers)
+        logger.info("Transforming '%s' with %d workers.", args.source, len(ranges))
+        totals = run_partitioned(transform_partition, ranges, options, logger, "transform")
+        if totals:
             logger.info(
-                "Inserted remaining %d product documents into '%s'.",
-                len(batch),
+                "Workers processed %d source documents and generated %d product documents into '%s'.",
+                totals.get("documents", 0),
+                totals.get("products", 0),
                 args.target,
             )
-
-        logger.info(
-            "Processed %d source documents and generated %d product documents into '%s'.",
-            total_documents,
-            total_products,
-            args.target,
-        )
     finally:
         client.close()
 
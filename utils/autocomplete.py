@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Tuple
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip accents and collapse whitespace so "Pollo a la Brasa" matches "pollo a la bra"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
+def word_suffixes(normalized: str) -> List[str]:
+    """The title from each word on, so a prefix also matches words inside the title."""
+    words = normalized.split(" ")
+    return [" ".join(words[position:]) for position in range(len(words))]
+
+
+def _rank(at_start: bool, count: int) -> int:
+    # Titles that begin with the prefix outrank inner-word matches, then more products win.
+    return (1 << 40) * int(at_start) + count
+
+
+class TitleIndex:
+    """Sorted array of normalised title suffixes answering prefix queries with two bisects.
+
+    Every title contributes one key per word start. The matching range is
+    ranked with a sparse table of range maxima, so the top ``limit`` titles
+    come out in ``O(limit log limit)`` however many keys share the prefix.
+    :meth:`add` puts new titles in a small pending list scanned linearly
+    until the next :meth:`rebuild`, which is also how removed titles
+    disappear.
+    """
+
+    def __init__(self, counts: Dict[str, int] = None):
+        self._lock = threading.Lock()
+        self.rebuild(counts or {})
+
+    def rebuild(self, counts: Dict[str, int]) -> None:
+        import numpy as np
+
+        entries: List[Tuple[str, str, int]] = []
+        for title, count in counts.items():
+            for position, suffix in enumerate(word_suffixes(normalize(title))):
+                if suffix:
+                    entries.append((suffix, title, _rank(position == 0, count)))
+        entries.sort()
+        ranks = np.fromiter((entry[2] for entry in entries), dtype=np.int64, count=len(entries))
+        table = [np.arange(len(entries), dtype=np.int32)]
+        span = 1
+        while span * 2 <= len(entries):
+            previous = table[-1]
+            left, right = previous[: len(entries) - 2 * span + 1], previous[span : len(entries) - span + 1]
+            table.append(np.where(ranks[left] >= ranks[right], left, right))
+            span *= 2
+        with self._lock:
+            self._counts = dict(counts)
+            self._keys = [entry[0] for entry in entries]
+            self._titles = [entry[1] for entry in entries]
+            self._ranks = ranks
+            self._table = table
+            self._pending: List[Tuple[str, str, int]] = []
+
+    def add(self, titles: Iterable[str]) -> int:
+        """Make titles not seen yet searchable right away; returns how many were new."""
+        added = 0
+        with self._lock:
+            for title in titles:
+                if not title or title in self._counts:
+                    continue
+                self._counts[title] = 1
+                for position, suffix in enumerate(word_suffixes(normalize(title))):
+                    if suffix:
+                        self._pending.append((suffix, title, _rank(position == 0, 1)))
+                added += 1
+        return added
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _best(self, low: int, high: int) -> int:
+        level = (high - low).bit_length() - 1
+        left, right = self._table[level][low], self._table[level][high - (1 << level)]
+        return int(left if self._ranks[left] >= self._ranks[right] else right)
+
+    def complete(self, prefix: str, limit: int = 8) -> List[str]:
+        query = normalize(prefix)
+        if not query or limit <= 0:
+            return []
+        with self._lock:
+            low = bisect.bisect_left(self._keys, query)
+            high = bisect.bisect_left(self._keys, query + "￿", low)
+            candidates: List[Tuple[int, str]] = [
+                (-rank, title) for suffix, title, rank in self._pending if suffix.startswith(query)
+            ]
+            heap: List[Tuple[int, int, int, int]] = []
+            if low < high:
+                best = self._best(low, high)
+                heap.append((-int(self._ranks[best]), best, low, high))
+            seen: Dict[str, None] = {}
+            # Pop range maxima until ``limit`` distinct titles beat every pending match left.
+            while heap and len(seen) < limit:
+                negative_rank, position, range_low, range_high = heapq.heappop(heap)
+                candidates.append((negative_rank, self._titles[position]))
+                seen.setdefault(self._titles[position])
+                for sub_low, sub_high in ((range_low, position), (position + 1, range_high)):
+                    if sub_low < sub_high:
+                        best = self._best(sub_low, sub_high)
+                        heapq.heappush(heap, (-int(self._ranks[best]), best, sub_low, sub_high))
+        ranked: Dict[str, None] = {}
+        for _, title in sorted(candidates):
+            ranked.setdefault(title)
+            if len(ranked) == limit:
+                break
+        return list(ranked)
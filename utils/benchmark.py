@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+
+def _summarize(samples: List[float], loops: int) -> Dict[str, Any]:
+    median = statistics.median(samples)
+    return {
+        "medianUs": round(median, 3),
+        "minUs": round(min(samples), 3),
+        "meanUs": round(statistics.fmean(samples), 3),
+        "stdevUs": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "opsPerSec": round(1e6 / median, 1) if median else 0.0,
+        "loops": loops,
+        "repeat": len(samples),
+    }
+
+
+def calibrate(fn: Callable[[], Any], min_time: float) -> int:
+    """Smallest power-of-ten loop count whose run takes at least ``min_time`` seconds."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - started >= min_time or loops >= 10**7:
+            return loops
+        loops *= 10
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.05) -> Dict[str, Any]:
+    """Time ``fn`` in ``repeat`` samples of ``loops`` calls each; times are per call, in microseconds.
+
+    Comparisons use ``medianUs``: unlike the mean it ignores the odd sample
+    slowed down by the scheduler or the garbage collector.
+    """
+    loops = calibrate(fn, min_time)
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops * 1e6)
+    return _summarize(samples, loops)
+
+
+IMPORT_MARKER = "--benchmark-imports--"
+
+
+def import_time_us(statement: str, setup: str = "", cwd: str = None) -> float:
+    """Microseconds ``python -X importtime`` attributes to the imports ``statement`` triggers.
+
+    It runs in a fresh interpreter; what start-up and ``setup`` import is
+    logged before a marker and left out.
+    """
+    code = f"{setup}\nimport sys\nsys.stderr.write({IMPORT_MARKER!r} + '\\n')\n{statement}"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=cwd, capture_output=True, text=True, check=True
+    )
+    total = 0
+    for line in completed.stderr.split(IMPORT_MARKER, 1)[1].splitlines():
+        parts = line.split("|")
+        # Nested imports are indented and already counted in their parent's cumulative time.
+        if len(parts) == 3 and parts[1].strip().isdigit() and not parts[2].startswith("  "):
+            total += int(parts[1])
+    return float(total)
+
+
+def measure_import(statement: str, setup: str = "", repeat: int = 5, cwd: str = None) -> Dict[str, Any]:
+    """Cold import cost of ``statement``, one fresh interpreter per sample, in the :func:`measure` format."""
+    return _summarize([import_time_us(statement, setup, cwd) for _ in range(repeat)], loops=1)
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def save_results(path: str, results: Dict[str, Dict[str, Any]]) -> None:
+    document = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)["results"]
+
+
+def compare_results(
+    baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]], threshold: float
+) -> List[Dict[str, Any]]:
+    """One row per benchmark present in either run.
+
+    ``change`` is the relative change of the median time, so ``+0.25`` means
+    25 % slower. Rows slower than ``threshold`` are ``regression``, faster
+    than ``-threshold`` are ``improvement``.
+    """
+    rows: List[Dict[str, Any]] = []
+    for name in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(name), current.get(name)
+        if before is None or after is None:
+            rows.append({"name": name, "status": "added" if before is None else "removed"})
+            continue
+        change = after["medianUs"] / before["medianUs"] - 1 if before["medianUs"] else 0.0
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        rows.append(
+            {
+                "name": name,
+                "status": status,
+                "baselineUs": before["medianUs"],
+                "currentUs": after["medianUs"],
+                "change": round(change, 4),
+            }
+        )
+    return rows
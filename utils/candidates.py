@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import bisect
+import json
+import math
+from typing import Any, Dict, Optional
+
+POLICY_VERSION = 1
+# Atlas Vector Search rejects numCandidates above this value.
+MAX_NUM_CANDIDATES = 10000
+
+# Used until evaluate-candidates.py has produced a tuned policy: the previous fixed limit * 20.
+DEFAULT_POLICY: Dict[str, Any] = {
+    "version": POLICY_VERSION,
+    "minimum": 0,
+    "maximum": MAX_NUM_CANDIDATES,
+    "rules": [{"maxSelectivity": 1.0, "multiplier": 20}],
+    "selectivity": {},
+}
+
+
+def load_policy(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return DEFAULT_POLICY
+    with open(path, encoding="utf-8") as handle:
+        policy = json.load(handle)
+    if policy.get("version") != POLICY_VERSION:
+        raise ValueError(f"Unsupported candidate policy version in '{path}': {policy.get('version')}.")
+    policy["rules"] = sorted(policy.get("rules") or DEFAULT_POLICY["rules"], key=lambda rule: rule["maxSelectivity"])
+    return policy
+
+
+def save_policy(path: str, policy: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(policy, handle, indent=2, ensure_ascii=False)
+
+
+def _fraction_below(quantiles: list, value: float) -> float:
+    """Share of prices below ``value`` from evenly spaced quantiles (``quantiles[0]`` = min, ``[-1]`` = max)."""
+    if not quantiles:
+        return 1.0
+    steps = len(quantiles) - 1
+    position = bisect.bisect_left(quantiles, value)
+    if position == 0:
+        return 0.0
+    if position > steps:
+        return 1.0
+    low, high = quantiles[position - 1], quantiles[position]
+    within = (value - low) / (high - low) if high > low else 1.0
+    return (position - 1 + within) / steps
+
+
+def estimate_selectivity(
+    stats: Dict[str, Any],
+    available: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    restaurant: Optional[str] = None,
+    country: Optional[str] = None,
+) -> float:
+    """Estimate the share of documents matching the filters, assuming they are independent.
+
+    ``stats`` is the ``selectivity`` block written by evaluate-candidates.py. Unknown
+    restaurants or countries count as rare rather than absent, so the estimate
+    errs towards more candidates.
+    """
+    if not stats:
+        return 1.0
+    selectivity = 1.0
+    if available is not None and "available" in stats:
+        selectivity *= stats["available"] if available else 1.0 - stats["available"]
+    if (min_price is not None or max_price is not None) and stats.get("priceQuantiles"):
+        quantiles = stats["priceQuantiles"]
+        upper = _fraction_below(quantiles, max_price) if max_price is not None else 1.0
+        lower = _fraction_below(quantiles, min_price) if min_price is not None else 0.0
+        selectivity *= max(upper - lower, 0.0)
+    rare = 1.0 / max(stats.get("documents", 1), 1)
+    if restaurant and "restaurants" in stats:
+        selectivity *= stats["restaurants"].get(restaurant, rare)
+    if country and "countries" in stats:
+        selectivity *= stats["countries"].get(country, rare)
+    return min(max(selectivity, 0.0), 1.0)
+
+
+def num_candidates_for(policy: Dict[str, Any], limit: int, selectivity: float = 1.0) -> int:
+    """numCandidates for ``limit`` results from the first rule whose ``maxSelectivity`` covers ``selectivity``."""
+    rules = policy.get("rules") or DEFAULT_POLICY["rules"]
+    rule = next((rule for rule in rules if selectivity <= rule["maxSelectivity"]), rules[-1])
+    candidates = max(math.ceil(limit * rule["multiplier"]), policy.get("minimum", 0), limit)
+    return min(candidates, policy.get("maximum", MAX_NUM_CANDIDATES), MAX_NUM_CANDIDATES)
+
+
+def collect_selectivity_stats(collection, quantiles: int = 20) -> Dict[str, Any]:
+    """Summarise the filterable fields of ``collection`` for :func:`estimate_selectivity`."""
+    documents = collection.count_documents({})
+    if not documents:
+        return {"documents": 0}
+
+    def shares(field: str) -> Dict[str, float]:
+        pipeline = [{"$match": {field: {"$type": "string"}}}, {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+        return {group["_id"]: group["count"] / documents for group in collection.aggregate(pipeline)}
+
+    available = collection.count_documents({"product.available": True})
+    prices = sorted(
+        document["product"]["price"]["amount"]
+        for document in collection.find({"product.price.amount": {"$type": "number"}}, {"product.price.amount": 1})
+    )
+    price_quantiles = [prices[round(step * (len(prices) - 1) / quantiles)] for step in range(quantiles + 1)] if prices else []
+    return {
+        "documents": documents,
+        "available": available / documents,
+        "priceQuantiles": price_quantiles,
+        "restaurants": shares("restaurantName"),
+        "countries": shares("countryCode"),
+    }
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Iterable, Iterator, Optional
+
+from bson import ObjectId
+
+
+def iter_products(document: dict) -> Iterable[dict]:
+    products = document.get("products", [])
+    if not isinstance(products, list):
+        return []
+    return [product for product in products if isinstance(product, dict)]
+
+
+def derive_product_id(catalog_id, position: int) -> ObjectId:
+    """Stable id for a product without a usable ``_id``: the catalog id and its position, hashed.
+
+    Every sync of an unchanged catalog derives the same ids, so its products
+    are updated in place instead of re-inserted.
+    """
+    digest = hashlib.sha1(f"{catalog_id}:{int(position)}".encode("utf-8")).digest()
+    return ObjectId(digest[:12])
+
+
+def build_product_document(source: dict, product: dict, position: Optional[int] = None) -> dict:
+    base = {
+        key: value
+        for key, value in source.items()
+        if key not in {"products", "description_embeddings", "image_embeddings"}
+    }
+
+    catalog_id = source.get("_id")
+    if catalog_id is not None:
+        base["catalogId"] = catalog_id
+
+    product_id = product.get("_id")
+    if isinstance(product_id, str) and ObjectId.is_valid(product_id):
+        product_id = ObjectId(product_id)
+    if isinstance(product_id, ObjectId):
+        base["_id"] = product_id
+    elif catalog_id is not None and position is not None:
+        base["_id"] = derive_product_id(catalog_id, position)
+    else:
+        base["_id"] = ObjectId()
+
+    base["product"] = product
+    return base
+
+
+def iter_product_documents(source: dict) -> Iterator[dict]:
+    """``build_product_document`` for every product of ``source``, with its index in ``products``."""
+    products = source.get("products", [])
+    if not isinstance(products, list):
+        return
+    for position, product in enumerate(products):
+        if isinstance(product, dict):
+            yield build_product_document(source, product, position)
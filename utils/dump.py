@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import gzip
+from typing import IO, Iterator, List
+
+from bson import decode_file_iter
+
+
+class CountingReader:
+    """File wrapper that tracks how many raw (possibly compressed) bytes were read."""
+
+    def __init__(self, handle: IO[bytes]):
+        self._handle = handle
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._handle.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def open_dump(path: str) -> CountingReader:
+    return CountingReader(open(path, "rb"))
+
+
+def iter_dump_documents(reader: CountingReader, compressed: bool) -> Iterator[dict]:
+    """Decode documents one at a time from a mongodump ``.bson`` / ``.bson.gz`` stream.
+
+    Gzipped archives are decompressed on the fly, never to disk.
+    """
+    stream = gzip.GzipFile(fileobj=reader, mode="rb") if compressed else reader
+    yield from decode_file_iter(stream)
+
+
+def iter_dump_batches(reader: CountingReader, compressed: bool, batch_size: int) -> Iterator[List[dict]]:
+    batch: List[dict] = []
+    for document in iter_dump_documents(reader, compressed):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, List, Optional, Protocol, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDING_PROVIDERS = ("voyage", "local")
+
+
+@dataclass
+class EmbeddingResult:
+    """Mirrors the ``embeddings`` attribute of a Voyage ``EmbeddingsObject``."""
+
+    embeddings: List[List[float]]
+
+
+class EmbeddingProvider(Protocol):
+    def embed(self, texts: List[str], model: Optional[str] = None, **kwargs: Any) -> Any:
+        ...
+
+
+class HashingEmbeddingClient:
+    """Deterministic local embeddings: hashed word and character n-grams + random projection.
+
+    Each n-gram is hashed into one of ``buckets`` rows of a fixed Gaussian
+    projection matrix and the rows are summed, so texts sharing words or
+    fragments land close together. Vectors are L2-normalised, which keeps
+    cosine, dotProduct and euclidean indexes usable. The quality is far below
+    a real model; the point is to exercise the pipeline offline at memory speed.
+    """
+
+    def __init__(self, dimensions: int = 1024, seed: int = 0, buckets: int = 4096, ngram: int = 3):
+        if dimensions <= 0:
+            raise ValueError("dimensions must be a positive integer.")
+        self.dimensions = dimensions
+        self.buckets = buckets
+        self.ngram = ngram
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        self._projection = rng.standard_normal((buckets, dimensions), dtype=np.float32)
+
+    def _features(self, text: str) -> List[int]:
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+        words = re.findall(r"\w+", normalized)
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(f"c:{padded[i : i + self.ngram]}" for i in range(max(1, len(padded) - self.ngram + 1)))
+        return [zlib.crc32(feature.encode("utf-8")) % self.buckets for feature in features]
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text or "")
+            if features:
+                vectors[row] = self._projection[features].sum(axis=0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def embed(self, texts: List[str], model: Optional[str] = None, **kwargs: Any) -> EmbeddingResult:
+        return EmbeddingResult(embeddings=self.embed_array(texts).tolist())
+
+    def close(self) -> None:
+        pass
+
+
+def extract_embeddings(response) -> List[List[float]]:
+    """Vectors of a Voyage ``EmbeddingsObject`` or an :class:`EmbeddingResult`, as plain lists."""
+    embeddings = getattr(response, "embeddings", None)
+    if embeddings is None:
+        raise ValueError("Voyage response did not contain embeddings.")
+    vectors: List[List[float]] = []
+    for item in embeddings:
+        if hasattr(item, "embedding"):
+            vectors.append(item.embedding)  # type: ignore[attr-defined]
+        else:
+            vectors.append(item)
+    return vectors
+
+
+def create_embedding_client(
+    provider: str = "voyage", api_key: Optional[str] = None, dimensions: int = 1024
+) -> EmbeddingProvider:
+    provider = (provider or "voyage").lower()
+    if provider == "local":
+        return HashingEmbeddingClient(dimensions=dimensions)
+    if provider == "voyage":
+        if not api_key:
+            raise RuntimeError("VoyageAI API key not configured.")
+        from voyageai import Client
+
+        return Client(api_key=api_key)
+    raise ValueError(f"Unknown embedding provider '{provider}'. Expected one of: {', '.join(EMBEDDING_PROVIDERS)}.")
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from utils.snapshot import Snapshot, load_snapshot
+
+SIMILARITIES = ("cosine", "dotProduct", "euclidean")
+
+
+class FilterIndex:
+    """Precomputed structures for the filters supported by ``build_filter_components``.
+
+    * ``product.available`` -> boolean bitmap.
+    * ``product.price.amount < max`` -> price column sorted once, answered with
+      a binary search.
+    * ``restaurantName`` -> sorted row-id postings per restaurant.
+
+    :meth:`mask` ANDs the requested filters into one boolean row mask.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.rows = len(snapshot)
+        self.available = np.asarray(snapshot.available, dtype=bool)
+        price = np.asarray(snapshot.price, dtype=np.float32)
+        # NaN prices sort last and never satisfy a "< max" range.
+        self.price_order = np.argsort(price, kind="stable")
+        self.sorted_prices = price[self.price_order]
+        self.restaurant_ids: Dict[str, int] = {name: code for code, name in enumerate(snapshot.restaurants)}
+        codes = np.asarray(snapshot.restaurant)
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.searchsorted(codes[order], np.arange(len(snapshot.restaurants) + 1))
+        self.postings: List[np.ndarray] = [
+            order[boundaries[code] : boundaries[code + 1]] for code in range(len(snapshot.restaurants))
+        ]
+
+    def price_below(self, max_price: float) -> np.ndarray:
+        return self.price_order[: np.searchsorted(self.sorted_prices, max_price, side="left")]
+
+    def restaurant_rows(self, restaurant: str) -> np.ndarray:
+        code = self.restaurant_ids.get(restaurant)
+        return self.postings[code] if code is not None else np.empty(0, dtype=np.int64)
+
+    def mask(
+        self,
+        available: Optional[bool] = None,
+        max_price: Optional[float] = None,
+        restaurant: Optional[str] = None,
+    ) -> Optional[np.ndarray]:
+        """Return the combined row mask, or ``None`` when no filter applies."""
+        mask: Optional[np.ndarray] = None
+
+        def combine(current: Optional[np.ndarray], rows_or_mask: np.ndarray) -> np.ndarray:
+            if rows_or_mask.dtype != bool:
+                selected = np.zeros(self.rows, dtype=bool)
+                selected[rows_or_mask] = True
+                rows_or_mask = selected
+            return rows_or_mask if current is None else current & rows_or_mask
+
+        if available is not None:
+            mask = combine(mask, self.available if available else ~self.available)
+        if max_price is not None:
+            mask = combine(mask, self.price_below(max_price))
+        if restaurant:
+            mask = combine(mask, self.restaurant_rows(restaurant))
+        return mask
+
+
+@dataclass
+class SearchHit:
+    id: ObjectId
+    score: float
+
+
+class LocalVectorIndex:
+    """Exact, filtered vector search over a :class:`Snapshot`.
+
+    Scores follow Atlas Vector Search normalisation so results are comparable
+    with ``vectorSearchScore``. Filters are resolved through :class:`FilterIndex`;
+    selective filters score only the matching rows (pre-filter), broad ones
+    score every row and drop non-matching candidates (post-filter).
+    """
+
+    def __init__(self, snapshot: Snapshot, similarity: str = "cosine", prefilter_threshold: float = 0.3):
+        if similarity not in SIMILARITIES:
+            raise ValueError(f"Unsupported similarity '{similarity}'.")
+        self.snapshot = snapshot
+        self.similarity = similarity
+        self.prefilter_threshold = prefilter_threshold
+        self.filters = FilterIndex(snapshot)
+        self._norms: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_path(cls, path: str, similarity: str = "cosine") -> "LocalVectorIndex":
+        return cls(load_snapshot(path), similarity)
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    @property
+    def norms(self) -> np.ndarray:
+        if self._norms is None:
+            self._norms = np.linalg.norm(self.snapshot.vectors, axis=1).astype(np.float32)
+        return self._norms
+
+    def score_rows(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        vectors = self.snapshot.vectors if rows is None else self.snapshot.vectors[rows]
+        dots = vectors @ query
+        if self.similarity == "dotProduct":
+            return (1.0 + dots) / 2.0
+        norms = self.norms if rows is None else self.norms[rows]
+        query_norm = float(np.linalg.norm(query))
+        if self.similarity == "euclidean":
+            # |v - q|^2 = |v|^2 - 2 v.q + |q|^2 reuses the matmul instead of materialising v - q.
+            distances = np.sqrt(np.maximum(norms * norms - 2.0 * dots + query_norm * query_norm, 0.0))
+            return 1.0 / (1.0 + distances)
+        return (1.0 + dots / np.maximum(norms * (query_norm or 1.0), 1e-12)) / 2.0
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        if k >= scores.shape[0]:
+            return np.argsort(-scores, kind="stable")
+        candidates = np.argpartition(-scores, k)[:k]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def search(
+        self,
+        query_vector,
+        k: int,
+        available: Optional[bool] = None,
+        max_price: Optional[float] = None,
+        restaurant: Optional[str] = None,
+    ) -> Tuple[List[SearchHit], str]:
+        """Top ``k`` hits and the strategy that found them.
+
+        The strategy is ``unfiltered``, ``empty``, ``postfilter`` or
+        ``prefilter``; it is returned rather than stored because one index
+        serves concurrent requests.
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape[0] != self.snapshot.dimensions:
+            raise ValueError(
+                f"Query has {query.shape[0]} dimensions but the snapshot has {self.snapshot.dimensions}."
+            )
+        if k <= 0 or len(self) == 0:
+            return [], "empty"
+
+        mask = self.filters.mask(available, max_price, restaurant)
+        if mask is None:
+            scores = self.score_rows(query)
+            rows = self._top(scores, k)
+            return self._hits(rows, scores[rows]), "unfiltered"
+
+        matching = int(np.count_nonzero(mask))
+        if matching == 0:
+            return [], "empty"
+
+        selectivity = matching / len(self)
+        if selectivity > self.prefilter_threshold:
+            scores = self.score_rows(query)
+            # Oversample by the inverse selectivity so k matches survive the filter on average.
+            pool = self._top(scores, min(len(self), math.ceil(k / selectivity * 1.5)))
+            rows = pool[mask[pool]][:k]
+            if rows.shape[0] >= min(k, matching):
+                return self._hits(rows, scores[rows]), "postfilter"
+
+        candidate_rows = np.flatnonzero(mask)
+        scores = self.score_rows(query, candidate_rows)
+        order = self._top(scores, k)
+        return self._hits(candidate_rows[order], scores[order]), "prefilter"
+
+    def _hits(self, rows: np.ndarray, scores: np.ndarray) -> List[SearchHit]:
+        return [SearchHit(self.snapshot.object_id(int(row)), float(score)) for row, score in zip(rows, scores)]
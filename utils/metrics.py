@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least ``q`` % of ``values`` at or below it.
+
+    ``q`` is in [0, 100]; no interpolation, so the result is always one of ``values``.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        "p50Ms": percentile(latencies_ms, 50),
+        "p95Ms": percentile(latencies_ms, 95),
+        "p99Ms": percentile(latencies_ms, 99),
+        "maxMs": max(latencies_ms) if latencies_ms else 0.0,
+    }
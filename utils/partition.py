@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import multiprocessing
+import queue
+from typing import Any, Callable, Dict, List, Optional
+
+
+def compute_id_ranges(collection, parts: int, query: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Split ``collection`` into at most ``parts`` contiguous ``_id`` ranges.
+
+    Uses ``$bucketAuto`` so every range holds roughly the same number of
+    documents. Each range is returned as a filter document ready for ``find``
+    or ``$match``; ``query`` is AND-ed into every range.
+    """
+    pipeline: List[Dict[str, Any]] = []
+    if query:
+        pipeline.append({"$match": query})
+    pipeline.extend(
+        [
+            {"$project": {"_id": 1}},
+            {"$bucketAuto": {"groupBy": "$_id", "buckets": max(1, parts)}},
+        ]
+    )
+    buckets = list(collection.aggregate(pipeline, allowDiskUse=True))
+
+    ranges: List[Dict[str, Any]] = []
+    for position, bucket in enumerate(buckets):
+        bounds = bucket["_id"]
+        # $bucketAuto upper bounds are exclusive except for the last bucket.
+        upper_operator = "$lte" if position == len(buckets) - 1 else "$lt"
+        id_filter = {"_id": {"$gte": bounds["min"], upper_operator: bounds["max"]}}
+        ranges.append({"$and": [query, id_filter]} if query else id_filter)
+    return ranges
+
+
+def run_partitioned(
+    worker: Callable[..., Dict[str, int]],
+    ranges: List[Dict[str, Any]],
+    options: Dict[str, Any],
+    logger,
+    label: str,
+) -> Dict[str, int]:
+    """Run ``worker(index, bounds, options, progress)`` for every partition in its own process.
+
+    ``ranges`` are usually the filters from :func:`compute_id_ranges`, but any
+    picklable description of a partition works. Workers must open their own clients (nothing is
+    shared across processes) and push processed counts to ``progress``; the
+    parent merges those into a single progress log and sums the totals each
+    worker returns.
+    """
+    if not ranges:
+        return {}
+
+    context = multiprocessing.get_context("spawn")
+    totals: Dict[str, int] = {}
+    with context.Manager() as manager:
+        progress = manager.Queue()
+        with context.Pool(processes=len(ranges)) as pool:
+            pending = pool.starmap_async(
+                worker,
+                [(index, bounds, options, progress) for index, bounds in enumerate(ranges)],
+            )
+            processed = 0
+            while True:
+                try:
+                    processed += progress.get(timeout=0.5)
+                except queue.Empty:
+                    if pending.ready():
+                        break
+                    continue
+                logger.info("[%s] Processed %d documents across %d workers.", label, processed, len(ranges))
+
+            for result in pending.get():
+                for key, value in result.items():
+                    totals[key] = totals.get(key, 0) + value
+    return totals
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+SEARCH_CONFIG_COLLECTION = "search_config"
+
+# Payload key that scopes a search to one partition, per supported partition field.
+PARTITION_FIELDS = {"countryCode": "country", "restaurantName": "restaurant"}
+# Suffix of the catch-all partition for documents whose field is missing or empty.
+UNASSIGNED_SUFFIX = "unassigned"
+
+
+def partition_suffix(value: Any) -> str:
+    """A readable slug of ``value`` plus a hash of the raw value; :data:`UNASSIGNED_SUFFIX` for ``None``.
+
+    The slug alone is lossy ("New York" and "New_York" share it); the hash
+    keeps names of distinct values distinct, and apart from the catch-all.
+    """
+    if value is None:
+        return UNASSIGNED_SUFFIX
+    raw = str(value)
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", raw).strip("_")[:40] or "none"
+    return f"{slug}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:8]}"
+
+
+def partition_collection_name(collection: str, value: Any) -> str:
+    return f"{collection}__{partition_suffix(value)}"
+
+
+def partition_index_name(index_name: str, value: Any) -> str:
+    return f"{index_name}__{partition_suffix(value)}"
+
+
+def partitions_config_id(collection: str) -> str:
+    return f"partitions:{collection}"
+
+
+def indexes_config_id(collection: str) -> str:
+    return f"indexes:{collection}"
+
+
+def load_partitions(db, collection: str) -> Dict[str, Any]:
+    """Return ``{"field", "partitions": {value: entry}, "unassigned": entry or None}`` or ``{}``.
+
+    Each entry is ``{"collection", "vectorIndex", "textIndex"}``.
+    """
+    return db[SEARCH_CONFIG_COLLECTION].find_one({"_id": partitions_config_id(collection)}) or {}
+
+
+def save_partitions(
+    db,
+    collection: str,
+    field: str,
+    partitions: Dict[str, Dict[str, str]],
+    unassigned: Optional[Dict[str, str]] = None,
+) -> None:
+    db[SEARCH_CONFIG_COLLECTION].replace_one(
+        {"_id": partitions_config_id(collection)},
+        {"field": field, "partitions": partitions, "unassigned": unassigned, "updatedAt": datetime.now(timezone.utc)},
+        upsert=True,
+    )
+
+
+def partition_entries(registry: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Every entry of a partition registry, the catch-all included."""
+    entries = [entry for _, entry in sorted((registry.get("partitions") or {}).items())]
+    if registry.get("unassigned"):
+        entries.append(registry["unassigned"])
+    return entries
+
+
+def load_active_indexes(db, collection: str) -> Dict[str, Any]:
+    """Return the live ``{"vector", "text"}`` index names switched in by a blue/green build, or ``{}``."""
+    return db[SEARCH_CONFIG_COLLECTION].find_one({"_id": indexes_config_id(collection)}) or {}
+
+
+def save_active_indexes(db, collection: str, vector: str, text: str, **details: Any) -> None:
+    """Point searches on ``collection`` at new index names in a single document write."""
+    db[SEARCH_CONFIG_COLLECTION].replace_one(
+        {"_id": indexes_config_id(collection)},
+        {"vector": vector, "text": text, **details, "switchedAt": datetime.now(timezone.utc)},
+        upsert=True,
+    )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Load ``.env`` once per process; ``python-dotenv`` is only imported the first time."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def load_settings(collection: bool = False, embedding: bool = False) -> Dict[str, Any]:
+    """Connection settings shared by the CLI scripts.
+
+    Always returns ``mongo_uri`` and ``db_name``. ``collection`` adds
+    ``collection_name`` (``PRODUCT_DETAIL_COLLECTION``, else ``COLLECTION_NAME``);
+    ``embedding`` adds ``provider``, ``dimensions``, ``api_key`` and
+    ``text_model``. Raises ``RuntimeError`` listing every missing variable.
+    """
+    load_env()
+    settings: Dict[str, Any] = {"mongo_uri": os.getenv("MONGODB_URI"), "db_name": os.getenv("DB_NAME")}
+    required = [("MONGODB_URI", settings["mongo_uri"]), ("DB_NAME", settings["db_name"])]
+    if collection:
+        settings["collection_name"] = os.getenv("PRODUCT_DETAIL_COLLECTION") or os.getenv("COLLECTION_NAME")
+        required.append(("COLLECTION_NAME", settings["collection_name"]))
+    if embedding:
+        settings.update(
+            provider=os.getenv("EMBEDDING_PROVIDER", "voyage").lower(),
+            dimensions=int(os.getenv("EMBEDDING_DIMENSIONS", "1024")),
+            api_key=os.getenv("VOYAGE_API_KEY"),
+            text_model=os.getenv("VOYAGE_TEXT_MODEL", "voyage-3.5"),
+        )
+        if settings["provider"] == "voyage":
+            required.append(("VOYAGE_API_KEY", settings["api_key"]))
+
+    missing = [name for name, value in required if not value]
+    if missing:
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+    return settings
+
+
+def connect(settings: Dict[str, Any], **kwargs: Any) -> "MongoClient":
+    """A ``MongoClient`` for ``settings["mongo_uri"]``; pymongo is imported here, not by ``--help``."""
+    from pymongo import MongoClient
+
+    return MongoClient(settings["mongo_uri"], **kwargs)
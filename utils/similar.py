@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.local_index import SIMILARITIES
+from utils.snapshot import Snapshot
+
+
+def prepare_vectors(vectors: np.ndarray, similarity: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return float32 vectors ready for dot products, plus squared norms for euclidean scoring.
+
+    Cosine vectors are L2-normalised once so every block is a plain matmul.
+    """
+    if similarity not in SIMILARITIES:
+        raise ValueError(f"Unsupported similarity '{similarity}'.")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if similarity == "cosine":
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12), None
+    if similarity == "euclidean":
+        return vectors, np.einsum("ij,ij->i", vectors, vectors)
+    return vectors, None
+
+
+def block_scores(
+    left: np.ndarray,
+    right: np.ndarray,
+    similarity: str,
+    left_sq: Optional[np.ndarray] = None,
+    right_sq: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Atlas-normalised scores for every pair in ``left x right``, same scale as ``vectorSearchScore``."""
+    dots = left @ right.T
+    if similarity == "euclidean":
+        distances = np.sqrt(np.maximum(left_sq[:, None] - 2.0 * dots + right_sq[None, :], 0.0))
+        return 1.0 / (1.0 + distances)
+    return (1.0 + dots) / 2.0
+
+
+def _merge_top(
+    best_scores: np.ndarray, best_rows: np.ndarray, scores: np.ndarray, rows: np.ndarray, top_n: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    merged_scores = np.concatenate([best_scores, scores], axis=1)
+    merged_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+    if merged_scores.shape[1] > top_n:
+        keep = np.argpartition(-merged_scores, top_n - 1, axis=1)[:, :top_n]
+        merged_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        merged_rows = np.take_along_axis(merged_rows, keep, axis=1)
+    return merged_scores, merged_rows
+
+
+def top_neighbours(
+    vectors: np.ndarray,
+    top_n: int,
+    similarity: str = "cosine",
+    candidates: Optional[np.ndarray] = None,
+    block_rows: int = 512,
+    block_cols: int = 32768,
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top ``top_n`` neighbours of every row of ``vectors``, excluding the row itself.
+
+    Rows are processed in blocks of ``block_rows`` on a thread pool (the matmul
+    releases the GIL) and scored against ``block_cols`` columns at a time, so
+    peak memory per worker is ``block_rows x block_cols`` float32 scores
+    whatever the collection size. ``candidates`` restricts which rows may be
+    returned as neighbours. Returns ``(rows, scores)`` of shape
+    ``(len(vectors), top_n)``, best first, with ``-1`` / ``-inf`` padding.
+    """
+    prepared, squares = prepare_vectors(vectors, similarity)
+    total = prepared.shape[0]
+    columns = np.arange(total) if candidates is None else np.flatnonzero(candidates)
+    neighbour_rows = np.full((total, top_n), -1, dtype=np.int64)
+    neighbour_scores = np.full((total, top_n), -np.inf, dtype=np.float32)
+    if total == 0 or top_n <= 0 or columns.size == 0:
+        return neighbour_rows, neighbour_scores
+
+    def run_block(start: int) -> None:
+        stop = min(start + block_rows, total)
+        left = prepared[start:stop]
+        left_sq = squares[start:stop] if squares is not None else None
+        best_scores = np.full((stop - start, 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((stop - start, 0), dtype=np.int64)
+        for offset in range(0, columns.size, block_cols):
+            block = columns[offset : offset + block_cols]
+            scores = block_scores(
+                left, prepared[block], similarity, left_sq, squares[block] if squares is not None else None
+            ).astype(np.float32, copy=False)
+            # A product is not its own neighbour.
+            own_rows = np.arange(start, stop)
+            positions = np.minimum(np.searchsorted(block, own_rows), block.size - 1)
+            own = block[positions] == own_rows
+            scores[np.flatnonzero(own), positions[own]] = -np.inf
+            best_scores, best_rows = _merge_top(best_scores, best_rows, scores, block, top_n)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        width = order.shape[1]
+        neighbour_scores[start:stop, :width] = np.take_along_axis(best_scores, order, axis=1)
+        neighbour_rows[start:stop, :width] = np.take_along_axis(best_rows, order, axis=1)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        list(executor.map(run_block, range(0, total, block_rows)))
+    neighbour_rows[~np.isfinite(neighbour_scores)] = -1
+    return neighbour_rows, neighbour_scores
+
+
+def snapshot_neighbours(
+    snapshot: Snapshot,
+    top_n: int,
+    similarity: str = "cosine",
+    same_restaurant: bool = False,
+    available_only: bool = False,
+    block_rows: int = 512,
+    block_cols: int = 32768,
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Neighbour lists for every snapshot row, optionally limited to the same restaurant and/or available products.
+
+    With ``same_restaurant`` each restaurant is solved on its own, which only
+    scores pairs inside a group instead of masking the full matrix.
+    """
+    candidates = np.asarray(snapshot.available, dtype=bool) if available_only else None
+    if not same_restaurant:
+        return top_neighbours(snapshot.vectors, top_n, similarity, candidates, block_rows, block_cols, workers)
+
+    rows = np.full((len(snapshot), top_n), -1, dtype=np.int64)
+    scores = np.full((len(snapshot), top_n), -np.inf, dtype=np.float32)
+    codes = np.asarray(snapshot.restaurant)
+    for code in np.unique(codes):
+        if code < 0:
+            continue  # products without a restaurant have no same-restaurant neighbours
+        group = np.flatnonzero(codes == code)
+        group_rows, group_scores = top_neighbours(
+            snapshot.vectors[group],
+            top_n,
+            similarity,
+            candidates[group] if candidates is not None else None,
+            block_rows,
+            block_cols,
+            workers,
+        )
+        rows[group] = np.where(group_rows >= 0, group[np.maximum(group_rows, 0)], -1)
+        scores[group] = group_scores
+    return rows, scores
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from bson import ObjectId
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+RESTAURANTS_FILE = "restaurants.json"
+COLUMNS = ("ids", "vectors", "available", "price", "restaurant")
+# Delta snapshots only: ids of base rows that were deleted or lost their embedding.
+DELETED_FILE = "deleted.npy"
+
+# Only these fields are read from MongoDB when exporting.
+SNAPSHOT_PROJECTION = {
+    "emb_description": 1,
+    "restaurantName": 1,
+    "product.available": 1,
+    "product.price.amount": 1,
+}
+
+
+@dataclass
+class Snapshot:
+    """Columnar view of ``product_detail``: one row per product with an embedding.
+
+    ``ids`` holds hex ObjectIds (``S24``), ``vectors`` is a float32
+    ``(rows, dimensions)`` matrix, ``restaurant`` indexes into ``restaurants``
+    (-1 when missing) and ``price`` is NaN when missing. Columns loaded from a
+    single snapshot are read-only memory maps. ``deleted`` is only set on a
+    delta: the base rows it removes.
+    """
+
+    ids: np.ndarray
+    vectors: np.ndarray
+    available: np.ndarray
+    price: np.ndarray
+    restaurant: np.ndarray
+    restaurants: List[str]
+    manifest: Dict[str, Any] = field(default_factory=dict)
+    deleted: np.ndarray = field(default_factory=lambda: np.empty(0, dtype="S24"))
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0
+
+    def object_id(self, row: int) -> ObjectId:
+        return ObjectId(self.ids[row].decode("ascii"))
+
+    def object_ids(self, rows: Iterable[int]) -> List[ObjectId]:
+        return [self.object_id(int(row)) for row in rows]
+
+
+class SnapshotWriter:
+    """Streams rows into preallocated ``.npy`` memory maps, trimming on close."""
+
+    def __init__(self, path: str, capacity: int, dimensions: int):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.capacity = max(capacity, 1)
+        self.dimensions = dimensions
+        self.rows = 0
+        # Rows append() refused, by reason: a vector of another size or a full writer.
+        self.skipped = {"dimensions": 0, "capacity": 0}
+        self.restaurants: Dict[str, int] = {}
+        self._columns = {
+            "ids": self._open("ids", np.dtype("S24"), (self.capacity,)),
+            "vectors": self._open("vectors", np.float32, (self.capacity, dimensions)),
+            "available": self._open("available", np.bool_, (self.capacity,)),
+            "price": self._open("price", np.float32, (self.capacity,)),
+            "restaurant": self._open("restaurant", np.int32, (self.capacity,)),
+        }
+
+    def _open(self, name: str, dtype, shape) -> np.ndarray:
+        return np.lib.format.open_memmap(os.path.join(self.path, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+
+    def append(self, document: Dict[str, Any]) -> bool:
+        vector = document.get("emb_description")
+        if not isinstance(vector, list) or len(vector) != self.dimensions:
+            self.skipped["dimensions"] += 1
+            return False
+        if self.rows >= self.capacity:
+            self.skipped["capacity"] += 1
+            return False
+        product = document.get("product") if isinstance(document.get("product"), dict) else {}
+        price = product.get("price") if isinstance(product.get("price"), dict) else {}
+        restaurant_name = document.get("restaurantName")
+
+        row = self.rows
+        columns = self._columns
+        columns["ids"][row] = str(document["_id"]).encode("ascii")
+        columns["vectors"][row] = vector
+        columns["available"][row] = bool(product.get("available"))
+        amount = price.get("amount")
+        columns["price"][row] = float(amount) if isinstance(amount, (int, float)) else np.nan
+        if isinstance(restaurant_name, str):
+            columns["restaurant"][row] = self.restaurants.setdefault(restaurant_name, len(self.restaurants))
+        else:
+            columns["restaurant"][row] = -1
+        self.rows += 1
+        return True
+
+    def close(self, manifest: Dict[str, Any], deleted: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Trim the columns and write the manifest; ``deleted`` are hex ids a delta removes from its base."""
+        columns, self._columns = self._columns, {}
+        for name, column in columns.items():
+            column.flush()
+            if self.rows < self.capacity:
+                # Write the trimmed copy aside and swap it in; the old file is still mapped.
+                final_path = os.path.join(self.path, f"{name}.npy")
+                with open(f"{final_path}.tmp", "wb") as handle:
+                    np.save(handle, np.array(column[: self.rows]))
+                os.replace(f"{final_path}.tmp", final_path)
+
+        restaurants = sorted(self.restaurants, key=self.restaurants.get)
+        with open(os.path.join(self.path, RESTAURANTS_FILE), "w", encoding="utf-8") as handle:
+            json.dump(restaurants, handle, ensure_ascii=False)
+
+        deleted_ids = np.array([str(value).encode("ascii") for value in deleted or ()], dtype="S24")
+        if deleted is not None:
+            np.save(os.path.join(self.path, DELETED_FILE), deleted_ids)
+
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "rows": self.rows,
+            "deleted": int(deleted_ids.shape[0]),
+            "skipped": dict(self.skipped),
+            "dimensions": self.dimensions,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            **manifest,
+        }
+        with open(os.path.join(self.path, MANIFEST_FILE), "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2)
+        return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _load_single(path: str, mmap: bool) -> Snapshot:
+    manifest = read_manifest(path)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version in '{path}': {manifest.get('version')}.")
+    mode = "r" if mmap else None
+    columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in COLUMNS}
+    with open(os.path.join(path, RESTAURANTS_FILE), encoding="utf-8") as handle:
+        restaurants = json.load(handle)
+    deleted_path = os.path.join(path, DELETED_FILE)
+    if os.path.exists(deleted_path):
+        columns["deleted"] = np.load(deleted_path)
+    return Snapshot(restaurants=restaurants, manifest=manifest, **columns)
+
+
+def deleted_ids(base_ids: np.ndarray, live_ids: Iterable[str]) -> List[str]:
+    """Hex ids of ``base_ids`` missing from ``live_ids``, for the ``deleted`` list of a delta."""
+    live = np.array([value.encode("ascii") for value in live_ids], dtype="S24")
+    return [value.decode("ascii") for value in base_ids[~np.isin(base_ids, live)]]
+
+
+def _apply_delta(base: Snapshot, delta: Snapshot) -> Snapshot:
+    """Rows in ``delta`` replace rows with the same id in ``base``; ``delta.deleted`` ids are dropped."""
+    keep = ~np.isin(base.ids, delta.ids)
+    if len(delta.deleted):
+        keep &= ~np.isin(base.ids, delta.deleted)
+
+    restaurants = list(base.restaurants)
+    positions = {name: index for index, name in enumerate(restaurants)}
+    remap = np.empty(len(delta.restaurants) + 1, dtype=np.int32)
+    remap[-1] = -1
+    for index, name in enumerate(delta.restaurants):
+        remap[index] = positions.setdefault(name, len(restaurants))
+        if remap[index] == len(restaurants):
+            restaurants.append(name)
+
+    return Snapshot(
+        ids=np.concatenate([base.ids[keep], delta.ids]),
+        vectors=np.concatenate([base.vectors[keep], delta.vectors]),
+        available=np.concatenate([base.available[keep], delta.available]),
+        price=np.concatenate([base.price[keep], delta.price]),
+        restaurant=np.concatenate([base.restaurant[keep], remap[delta.restaurant]]),
+        restaurants=restaurants,
+        manifest=delta.manifest,
+    )
+
+
+def load_snapshot(path: str, mmap: bool = True) -> Snapshot:
+    """Load a snapshot, following ``base`` links of delta snapshots.
+
+    A full snapshot is mapped zero-copy; each delta in the chain costs one
+    concatenation, so rebuild a full snapshot when the chain grows long.
+    """
+    snapshot = _load_single(path, mmap)
+    base_path: Optional[str] = snapshot.manifest.get("base")
+    if not base_path:
+        return snapshot
+    if not os.path.isabs(base_path):
+        base_path = os.path.normpath(os.path.join(path, base_path))
+    return _apply_delta(load_snapshot(base_path, mmap), snapshot)
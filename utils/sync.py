@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+SYNC_STATE_COLLECTION = "sync_state"
+
+
+def description_hash(description: Optional[str]) -> Optional[str]:
+    """Stable fingerprint of the text that gets embedded for a product."""
+    if not isinstance(description, str) or not description.strip():
+        return None
+    return hashlib.sha1(description.strip().encode("utf-8")).hexdigest()
+
+
+def load_state(db, key: str) -> Dict[str, Any]:
+    return db[SYNC_STATE_COLLECTION].find_one({"_id": key}) or {}
+
+
+def save_state(db, key: str, **fields: Any) -> None:
+    db[SYNC_STATE_COLLECTION].update_one(
+        {"_id": key},
+        {"$set": {**fields, "savedAt": datetime.now(timezone.utc)}},
+        upsert=True,
+    )